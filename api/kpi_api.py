@@ -14,8 +14,11 @@ Usage:
 Endpoints:
     GET /api/stats - Database statistics
     GET /api/rates - Rate benchmarks with filters
-    GET /api/properties - Property list with KPIs
+    GET /api/properties - Property list with latest KPIs (?limit=&offset=)
     GET /api/kpis/<property> - KPIs for specific property
+    GET /api/analytics/rates - Precomputed rate statistics and monthly trend
+    GET /api/analytics/kpis - Precomputed portfolio KPIs per period
+    GET /api/db-metrics - Per-query timings (with DB_PROFILE=1)
 """
 
 import os
@@ -47,9 +50,15 @@ VALID_RATE_TYPES = {'haul_fee', 'disposal_per_ton', 'rental', 'fuel_surcharge',
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": ALLOWED_ORIGINS}})
 
-# Initialize database
-db = WastewiseDB()
-rate_rag = RateDatabaseRAG()
+# Initialize database. DB_SNAPSHOT=1 serves reads from an in-memory copy of
+# the database (refreshed in the background, so reads may briefly trail
+# writes). DB_PROFILE=1 times every statement for /api/db-metrics.
+DB_PATH = os.environ.get('DB_PATH')  # Default: data/wastewise.db
+DB_SNAPSHOT = os.environ.get('DB_SNAPSHOT', '0') == '1'
+DB_PROFILE = os.environ.get('DB_PROFILE', '0') == '1'
+db = WastewiseDB(DB_PATH, snapshot=DB_SNAPSHOT, profile=DB_PROFILE)
+# Benchmarks and trends are point lookups on the analytics_cache rollups
+rate_rag = RateDatabaseRAG(db=db, precomputed=True)
 
 
 def sanitize_string(value: str, max_length: int = 200) -> str:
@@ -69,6 +78,14 @@ def validate_positive_int(value: str, default: int, max_val: int = MAX_LIMIT) ->
         return default
 
 
+def validate_offset(value: str) -> int:
+    """Validate and convert to non-negative integer, defaulting to 0."""
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0
+
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get database statistics."""
@@ -106,27 +123,29 @@ def get_rates():
 
 @app.route('/api/properties', methods=['GET'])
 def get_properties():
-    """Get all properties with their latest KPIs."""
+    """Get properties with their latest KPIs, optionally paginated."""
     try:
-        properties = db.list_properties()
+        limit = None
+        if request.args.get('limit') is not None:
+            limit = validate_positive_int(request.args.get('limit'), default=MAX_LIMIT)
+        offset = validate_offset(request.args.get('offset'))
 
-        # Enrich with latest KPIs
-        result = []
-        for prop in properties:
-            kpis = db.get_property_kpis(prop['name'], limit=1)
-            latest_kpi = kpis[0] if kpis else {}
+        properties = db.get_properties_with_latest_kpis(limit=limit, offset=offset)
 
-            result.append({
+        result = [
+            {
                 'id': prop['id'],
                 'name': prop['name'],
-                'property_type': prop.get('property_type'),
-                'unit_count': prop.get('unit_count'),
-                'region': prop.get('region'),
-                'cost_per_door': latest_kpi.get('cost_per_door'),
-                'yards_per_door': latest_kpi.get('yards_per_door'),
-                'total_cost': latest_kpi.get('total_cost'),
-                'period': latest_kpi.get('period')
-            })
+                'property_type': prop['property_type'],
+                'unit_count': prop['unit_count'],
+                'region': prop['region'],
+                'cost_per_door': prop['cost_per_door'],
+                'yards_per_door': prop['yards_per_door'],
+                'total_cost': prop['total_cost'],
+                'period': prop['period']
+            }
+            for prop in properties
+        ]
 
         return jsonify(result)
     except Exception as e:
@@ -221,6 +240,72 @@ def compare_rate():
         return jsonify({'error': 'Internal server error'}), 500
 
 
+@app.route('/api/analytics/rates', methods=['GET'])
+def get_rate_analytics():
+    """Get precomputed rate statistics and monthly trend with optional filters."""
+    try:
+        vendor = sanitize_string(request.args.get('vendor'))
+        service_type = sanitize_string(request.args.get('service_type'))
+        rate_type = sanitize_string(request.args.get('rate_type'))
+        region = sanitize_string(request.args.get('region'))
+        months = validate_positive_int(request.args.get('months'), default=12, max_val=36)
+
+        if service_type and service_type not in VALID_SERVICE_TYPES:
+            return jsonify({'error': f'Invalid service_type. Must be one of: {", ".join(VALID_SERVICE_TYPES)}'}), 400
+        if rate_type and rate_type not in VALID_RATE_TYPES:
+            return jsonify({'error': f'Invalid rate_type. Must be one of: {", ".join(VALID_RATE_TYPES)}'}), 400
+
+        filters = {'vendor': vendor, 'service_type': service_type, 'rate_type': rate_type, 'region': region}
+        return jsonify({
+            'filters': filters,
+            'summary': db.get_rate_rollup(**filters),
+            'trend': db.get_rate_rollup_trend(**filters, months=months)
+        })
+    except Exception as e:
+        logger.error(f"Error getting rate analytics: {e}", exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@app.route('/api/analytics/kpis', methods=['GET'])
+def get_kpi_analytics():
+    """Get precomputed portfolio KPIs per period, by region or property type."""
+    try:
+        region = sanitize_string(request.args.get('region'))
+        property_type = sanitize_string(request.args.get('property_type'))
+        months = validate_positive_int(request.args.get('months'), default=12, max_val=36)
+
+        return jsonify({
+            'region': region,
+            'property_type': property_type,
+            'periods': db.get_kpi_rollups(region=region, property_type=property_type, months=months)
+        })
+    except Exception as e:
+        logger.error(f"Error getting KPI analytics: {e}", exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@app.route('/api/db-metrics', methods=['GET'])
+def get_db_metrics():
+    """Get per-query database timings, slowest first."""
+    try:
+        limit = validate_positive_int(request.args.get('limit'), default=20)
+        order_by = sanitize_string(request.args.get('order_by')) or 'total_ms'
+
+        try:
+            queries = db.get_query_stats(limit=limit, order_by=order_by)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid order_by: {e}'}), 400
+
+        return jsonify({
+            'enabled': db.profiler is not None,
+            'slow_query_ms': db.profiler.slow_ms if db.profiler else None,
+            'queries': queries
+        })
+    except Exception as e:
+        logger.error(f"Error getting database metrics: {e}", exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint."""
@@ -245,5 +330,8 @@ if __name__ == '__main__':
     print("  GET  /api/kpis/<property_name>")
     print("  GET  /api/trends/<vendor>")
     print("  POST /api/compare")
+    print("  GET  /api/analytics/rates?vendor=WM&months=12")
+    print("  GET  /api/analytics/kpis?region=Sacramento")
+    print("  GET  /api/db-metrics?limit=20&order_by=total_ms")
     print()
     app.run(host='0.0.0.0', port=port, debug=debug)
@@ -71,7 +71,7 @@ def validate_positive_int(value, default: int, max_val: int) -> int:
 def health_check():
     """Health check endpoint"""
     try:
-        embeddings_count = len(rag_manager.embeddings_cache.get('chunks', {}))
+        embeddings_count = rag_manager.cached_chunk_count()
         return jsonify({
             'status': 'ok',
             'service': 'WASTE Master Brain Semantic RAG',
@@ -174,7 +174,7 @@ def get_stats():
     """
     try:
         config = rag_manager.config
-        embeddings_count = len(rag_manager.embeddings_cache.get('chunks', {}))
+        embeddings_count = rag_manager.cached_chunk_count()
 
         total_size = sum(f.get('size_mb', 0) for f in config.get('files', []))
 
@@ -219,7 +219,7 @@ def build_embeddings():
         logger.info(f"Building embeddings (force={force})...")
         rag_manager.build_embeddings(force_rebuild=force)
 
-        embeddings_count = len(rag_manager.embeddings_cache.get('chunks', {}))
+        embeddings_count = rag_manager.cached_chunk_count()
 
         return jsonify({
             'status': 'success',
@@ -270,7 +270,7 @@ def get_example_queries():
 if __name__ == '__main__':
     port = int(os.environ.get('SEMANTIC_API_PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
-    embeddings_count = len(rag_manager.embeddings_cache.get('chunks', {}))
+    embeddings_count = rag_manager.cached_chunk_count()
 
     print("=" * 80)
     print("WASTE Master Brain - Semantic RAG API")
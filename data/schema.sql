@@ -42,7 +42,17 @@ CREATE TABLE IF NOT EXISTS rate_history (
     notes TEXT,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
-CREATE INDEX IF NOT EXISTS idx_rate_history_vendor ON rate_history(vendor);
+-- Covering indexes for the benchmark/trend queries, which filter on equality
+-- over a prefix of (vendor, service_type, rate_type, region) and only read
+-- effective_date and rate_value, so they never touch the table rows.
+-- Vendor-scoped lookups (incl. the rate_benchmarks view) use the first;
+-- market-wide lookups by service/rate type use the second.
+CREATE INDEX IF NOT EXISTS idx_rate_history_vendor_service
+    ON rate_history(vendor, service_type, rate_type, region, effective_date, rate_value);
+CREATE INDEX IF NOT EXISTS idx_rate_history_service_rate
+    ON rate_history(service_type, rate_type, region, effective_date, rate_value);
+-- Superseded by idx_rate_history_vendor_service (same leading column)
+DROP INDEX IF EXISTS idx_rate_history_vendor;
 CREATE INDEX IF NOT EXISTS idx_rate_history_property ON rate_history(property_id);
 CREATE INDEX IF NOT EXISTS idx_rate_history_date ON rate_history(effective_date);
 
@@ -143,6 +153,20 @@ CREATE TABLE IF NOT EXISTS email_index (
 CREATE INDEX IF NOT EXISTS idx_email_date ON email_index(date_sent);
 CREATE INDEX IF NOT EXISTS idx_email_thread ON email_index(thread_id);
 
+-- Conversation threads (maintained by scripts/aggregate_threads.py)
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,     -- Outlook conversation_id or normalized topic
+    topic TEXT,
+    participants TEXT,              -- JSON array of email addresses
+    message_count INTEGER NOT NULL DEFAULT 0,
+    first_message_date DATE,
+    last_message_date DATE,
+    status TEXT CHECK(status IN ('active', 'recent', 'aging', 'stale')),
+    projects_detected TEXT,         -- JSON array: ["Property: Avana", "Vendor: WM"]
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_threads_last_date ON threads(last_message_date);
+
 -- Analytics cache (pre-computed metrics)
 CREATE TABLE IF NOT EXISTS analytics_cache (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -154,6 +178,51 @@ CREATE TABLE IF NOT EXISTS analytics_cache (
     computed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(metric_type, dimension, period)
 );
+CREATE INDEX IF NOT EXISTS idx_analytics_cache_period ON analytics_cache(period);
+
+-- Rollup maintenance (see lib/analytics.py): every change to KPIs marks its
+-- period dirty as ('_dirty', 'kpi', 'YYYY-MM'), and the next analytics read
+-- recomputes only those periods. rate_history is append-only; new rates are
+-- found by ID instead, which keeps bulk inserts trigger-free.
+-- Markers are guarded with NOT EXISTS: an outer upsert would override OR IGNORE.
+CREATE TRIGGER IF NOT EXISTS trg_kpi_history_insert_analytics AFTER INSERT ON kpi_history
+BEGIN
+    INSERT INTO analytics_cache (metric_type, dimension, period)
+    SELECT '_dirty', 'kpi', NEW.period WHERE NOT EXISTS (
+        SELECT 1 FROM analytics_cache WHERE metric_type = '_dirty' AND dimension = 'kpi' AND period = NEW.period
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS trg_kpi_history_delete_analytics AFTER DELETE ON kpi_history
+BEGIN
+    INSERT INTO analytics_cache (metric_type, dimension, period)
+    SELECT '_dirty', 'kpi', OLD.period WHERE NOT EXISTS (
+        SELECT 1 FROM analytics_cache WHERE metric_type = '_dirty' AND dimension = 'kpi' AND period = OLD.period
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS trg_kpi_history_update_analytics AFTER UPDATE ON kpi_history
+BEGIN
+    INSERT INTO analytics_cache (metric_type, dimension, period)
+    SELECT '_dirty', 'kpi', OLD.period WHERE NOT EXISTS (
+        SELECT 1 FROM analytics_cache WHERE metric_type = '_dirty' AND dimension = 'kpi' AND period = OLD.period
+    );
+    INSERT INTO analytics_cache (metric_type, dimension, period)
+    SELECT '_dirty', 'kpi', NEW.period WHERE NOT EXISTS (
+        SELECT 1 FROM analytics_cache WHERE metric_type = '_dirty' AND dimension = 'kpi' AND period = NEW.period
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS trg_properties_update_analytics AFTER UPDATE OF region, property_type ON properties
+BEGIN
+    INSERT INTO analytics_cache (metric_type, dimension, period)
+    SELECT DISTINCT '_dirty', 'kpi', k.period FROM kpi_history k
+    WHERE k.property_id = NEW.id AND NOT EXISTS (
+        SELECT 1 FROM analytics_cache WHERE metric_type = '_dirty' AND dimension = 'kpi' AND period = k.period
+    );
+END;
+
+-- KPIs written before the triggers existed (no-op once rolled up)
+INSERT OR IGNORE INTO analytics_cache (metric_type, dimension, period)
+SELECT DISTINCT '_dirty', 'kpi', period FROM kpi_history
+WHERE NOT EXISTS (SELECT 1 FROM analytics_cache WHERE metric_type = 'kpi_properties');
 
 -- Views for common queries
 CREATE VIEW IF NOT EXISTS v_property_kpis AS
@@ -194,5 +263,5 @@ CREATE TABLE IF NOT EXISTS _metadata (
     value TEXT,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
-INSERT OR REPLACE INTO _metadata (key, value) VALUES ('schema_version', '1.0.0');
-INSERT OR REPLACE INTO _metadata (key, value) VALUES ('created_at', datetime('now'));
+INSERT OR REPLACE INTO _metadata (key, value) VALUES ('schema_version', '1.3.0');
+INSERT OR IGNORE INTO _metadata (key, value) VALUES ('created_at', datetime('now'));
@@ -2,5 +2,6 @@
 
 from .database import WastewiseDB, get_db
 from .rate_rag import RateDatabaseRAG
+from .async_db import AsyncWastewiseDB, AsyncRateDatabaseRAG
 
-__all__ = ['WastewiseDB', 'get_db', 'RateDatabaseRAG']
+__all__ = ['WastewiseDB', 'get_db', 'RateDatabaseRAG', 'AsyncWastewiseDB', 'AsyncRateDatabaseRAG']
@@ -0,0 +1,512 @@
+"""
+Materialized rate and KPI rollups in the analytics_cache table.
+
+Dashboards used to re-aggregate rate_history and kpi_history on every
+load. Rollups are stored as analytics_cache cells instead
+(metric_type, dimension, period) -> value:
+
+- Rates: rate_count, rate_sum, rate_min and rate_max for every
+  combination of vendor, service_type, rate_type and region, per month
+  (period "YYYY-MM") and overall (period "all").
+- KPIs: portfolio, per-region and per-property-type averages and totals
+  per period.
+
+Dimensions are written as "vendor:WM|service_type:compactor" (fields in
+that order), or "all" for no filter. '%' and '|' in values are
+percent-encoded, so every dimension splits back into its fields.
+
+Changed months are found whichever process wrote them: rate_history is
+append-only, so rates above the last rolled-up ID mark their month dirty
+(metric_type "_dirty"), and triggers in schema.sql mark the periods of
+KPI inserts, updates and deletes. refresh() recomputes only the dirty
+months; overall cells are adjusted by the months' differences. It runs
+before every read, so reads are point lookups on the
+(metric_type, dimension, period) key.
+
+Usage:
+    from lib.analytics import AnalyticsRollups
+
+    rollups = AnalyticsRollups(db.transaction, db._connect)
+    rollups.rate_summary(vendor="WM", service_type="compactor")
+    rollups.kpi_series(region="Sacramento", months=12)
+"""
+
+import itertools
+from typing import Callable, Dict, Iterable, List, Tuple
+from urllib.parse import unquote
+
+# Filters of rate rollups, in dimension order
+RATE_DIMENSIONS = ('vendor', 'service_type', 'rate_type', 'region')
+
+RATE_METRICS = ('rate_count', 'rate_sum', 'rate_min', 'rate_max')
+
+# KPI columns averaged per dimension; total_cost is also summed
+KPI_AVERAGES = ('cost_per_door', 'yards_per_door', 'contamination_rate', 'fee_burden_pct')
+
+KPI_METRICS = ('kpi_properties', 'kpi_total_cost') + tuple(f'kpi_{column}' for column in KPI_AVERAGES)
+
+# Property columns KPI rollups are broken down by
+KPI_DIMENSIONS = ('region', 'property_type')
+
+# Field order within dimension strings
+_DIMENSION_ORDER = RATE_DIMENSIONS + ('property_type',)
+
+DIRTY = '_dirty'
+WATERMARK = '_watermark'
+ALL = 'all'
+
+# Dimension of the watermark cell; the suffix changes with the dimension
+# format, so rate rollups written in an older format are recomputed
+_WATERMARK_DIMENSION = 'rate_history/2'
+
+# Dimension values per IN (...) query
+_CHUNK = 400
+
+
+def dimension_key(**filters) -> str:
+    """
+    Dimension string for a set of filters; empty filters are left out.
+
+    Args:
+        **filters: Rate or KPI filters, e.g. vendor="WM", region=None
+
+    Returns:
+        e.g. "vendor:WM|region:Sacramento", or "all" without filters
+    """
+    parts = [f"{field}:{_escape(filters[field])}" for field in _DIMENSION_ORDER if filters.get(field)]
+    return '|'.join(parts) or ALL
+
+
+def parse_dimension(dimension: str) -> Dict[str, str]:
+    """
+    Filters of a dimension string (the inverse of dimension_key).
+
+    Returns:
+        e.g. {'vendor': 'WM', 'region': 'Sacramento'}, or {} for "all"
+    """
+    if dimension == ALL:
+        return {}
+    return {field: unquote(value) for field, value in (part.split(':', 1) for part in dimension.split('|'))}
+
+
+def _escape(value) -> str:
+    """Percent-encode the characters that delimit dimension strings."""
+    return str(value).replace('%', '%25').replace('|', '%7C')
+
+
+class AnalyticsRollups:
+    """Maintains and reads the analytics_cache rollups."""
+
+    def __init__(self, transaction: Callable, connect: Callable):
+        """
+        Args:
+            transaction: Context manager factory for a write transaction
+                (WastewiseDB.transaction)
+            connect: Context manager factory for reads (WastewiseDB._connect)
+        """
+        self._transaction = transaction
+        self._connect = connect
+
+    # ==================== Maintenance ====================
+
+    def refresh(self) -> int:
+        """
+        Recompute the rollups of all dirty periods.
+
+        Whether anything changed is checked with a plain read first, so
+        clean refreshes (the common case on every dashboard read) never
+        take the write lock.
+
+        Returns:
+            Number of periods recomputed
+        """
+        with self._connect() as conn:
+            if not self._stale(conn):
+                return 0
+
+        with self._transaction() as conn:
+            # Another caller may have refreshed while this one waited for the lock
+            if not self._stale(conn):
+                return 0
+
+            self._mark_new_rates(conn)
+            dirty = conn.execute(
+                "SELECT dimension, period FROM analytics_cache WHERE metric_type = ?", (DIRTY,)
+            ).fetchall()
+
+            rate_periods = [row['period'] for row in dirty if row['dimension'] == 'rate']
+            if rate_periods:
+                self._refresh_rates(conn, rate_periods)
+            for row in dirty:
+                if row['dimension'] == 'kpi':
+                    self._refresh_kpis(conn, row['period'])
+
+            conn.execute("DELETE FROM analytics_cache WHERE metric_type = ?", (DIRTY,))
+            return len(dirty)
+
+    def rebuild(self) -> int:
+        """
+        Drop all rollups and recompute them from rate_history and kpi_history.
+
+        Returns:
+            Number of periods recomputed
+        """
+        with self._transaction() as conn:
+            metrics = RATE_METRICS + KPI_METRICS + (WATERMARK,)
+            conn.execute(
+                f"DELETE FROM analytics_cache WHERE metric_type IN ({', '.join('?' * len(metrics))})", metrics
+            )
+            conn.execute("""
+                INSERT OR IGNORE INTO analytics_cache (metric_type, dimension, period)
+                SELECT DISTINCT ?, 'kpi', period FROM kpi_history
+            """, (DIRTY,))
+        return self.refresh()
+
+    def _stale(self, conn) -> bool:
+        """Whether rates were added past the watermark or periods are marked dirty."""
+        max_id = conn.execute("SELECT MAX(id) FROM rate_history").fetchone()[0] or 0
+        if max_id != self._watermark(conn):
+            return True
+        return conn.execute(
+            "SELECT 1 FROM analytics_cache WHERE metric_type = ? LIMIT 1", (DIRTY,)
+        ).fetchone() is not None
+
+    def _watermark(self, conn) -> int:
+        """Highest rate_history ID included in the rate rollups."""
+        row = conn.execute(
+            "SELECT value FROM analytics_cache WHERE metric_type = ? AND dimension = ? AND period = ?",
+            (WATERMARK, _WATERMARK_DIMENSION, ALL)
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def _mark_new_rates(self, conn) -> None:
+        """Mark the months of rates added since the last refresh as dirty.
+
+        rate_history is append-only, so new rows are found by ID. If the
+        highest ID went down (rows deleted, database replaced), every month
+        is recomputed.
+        """
+        watermark = self._watermark(conn)
+        max_id = conn.execute("SELECT MAX(id) FROM rate_history").fetchone()[0] or 0
+        if max_id == watermark:
+            return
+
+        if max_id < watermark:
+            conn.execute(
+                f"DELETE FROM analytics_cache WHERE metric_type IN ({', '.join('?' * len(RATE_METRICS))})",
+                RATE_METRICS
+            )
+            watermark = 0
+
+        conn.execute("""
+            INSERT OR IGNORE INTO analytics_cache (metric_type, dimension, period)
+            SELECT DISTINCT ?, 'rate', substr(effective_date, 1, 7) FROM rate_history WHERE id > ?
+        """, (DIRTY, watermark))
+        conn.execute("""
+            INSERT INTO analytics_cache (metric_type, dimension, period, value) VALUES (?, ?, ?, ?)
+            ON CONFLICT(metric_type, dimension, period) DO UPDATE SET
+                value = excluded.value, computed_at = CURRENT_TIMESTAMP
+        """, (WATERMARK, _WATERMARK_DIMENSION, ALL, max_id))
+
+    def _refresh_rates(self, conn, periods: List[str]) -> None:
+        """Recompute the monthly cells of periods and update the overall cells from the difference."""
+        changes = {}  # dimension -> [(old month cell, new month cell)]
+
+        for period in periods:
+            old = _read_rate_cells(conn, "period = ?", (period,))
+
+            # The range lets the effective_date index narrow the scan
+            groups = conn.execute(f"""
+                SELECT {', '.join(RATE_DIMENSIONS)},
+                    COUNT(*) as count, SUM(rate_value) as total,
+                    MIN(rate_value) as low, MAX(rate_value) as high
+                FROM rate_history
+                WHERE effective_date >= ? AND effective_date < ? AND substr(effective_date, 1, 7) = ?
+                GROUP BY {', '.join(RATE_DIMENSIONS)}
+            """, (period, period + '\x7f', period)).fetchall()
+
+            # Only cells whose values changed are written
+            new = _rate_cells(groups)
+            removed = [dimension for dimension in old if dimension not in new]
+            changed = {
+                dimension: cell for dimension, cell in new.items()
+                if tuple(old.get(dimension, ())) != cell
+            }
+            _delete_rate_cells(conn, period, removed)
+            _write_rate_cells(conn, period, changed)
+            for dimension in itertools.chain(removed, changed):
+                changes.setdefault(dimension, []).append((old.get(dimension), new.get(dimension)))
+
+        # Counts and sums take the difference; a minimum or maximum that
+        # may have been removed is recomputed from the monthly cells
+        dimensions = sorted(changes)
+        overall = {}
+        for chunk in (dimensions[i:i + _CHUNK] for i in range(0, len(dimensions), _CHUNK)):
+            overall.update(_read_rate_cells(
+                conn, f"period = ? AND dimension IN ({', '.join('?' * len(chunk))})", (ALL, *chunk)
+            ))
+
+        updated, recompute = {}, []
+        for dimension in dimensions:
+            count, total, low, high = overall.get(dimension, (0, 0.0, float('inf'), float('-inf')))
+            stale = False
+            for old, new in changes[dimension]:
+                if old:
+                    count, total = count - old[0], total - old[1]
+                    if old[2] <= low and not (new and new[2] <= old[2]):
+                        stale = True
+                    if old[3] >= high and not (new and new[3] >= old[3]):
+                        stale = True
+                if new:
+                    count, total = count + new[0], total + new[1]
+                    low, high = min(low, new[2]), max(high, new[3])
+
+            if count > 0 and not stale:
+                updated[dimension] = (count, total, low, high)
+            else:
+                recompute.append(dimension)
+
+        _delete_rate_cells(conn, ALL, recompute)
+        for chunk in (recompute[i:i + _CHUNK] for i in range(0, len(recompute), _CHUNK)):
+            placeholders = ', '.join('?' * len(chunk))
+            for metric in RATE_METRICS:
+                combine = {'rate_min': 'MIN', 'rate_max': 'MAX'}.get(metric, 'SUM')
+                conn.execute(f"""
+                    INSERT INTO analytics_cache (metric_type, dimension, period, value)
+                    SELECT metric_type, dimension, ?, {combine}(value)
+                    FROM analytics_cache
+                    WHERE metric_type = ? AND dimension IN ({placeholders}) AND period != ?
+                    GROUP BY dimension
+                """, (ALL, metric, *chunk, ALL))
+
+        _write_rate_cells(conn, ALL, updated)
+
+    def _refresh_kpis(self, conn, period: str) -> None:
+        """Recompute the KPI cells of one period."""
+        conn.execute(
+            f"DELETE FROM analytics_cache WHERE period = ? AND metric_type IN ({', '.join('?' * len(KPI_METRICS))})",
+            (period, *KPI_METRICS)
+        )
+
+        rows = conn.execute(f"""
+            SELECT p.region, p.property_type, k.total_cost, {', '.join('k.' + c for c in KPI_AVERAGES)}
+            FROM kpi_history k
+            JOIN properties p ON k.property_id = p.id
+            WHERE k.period = ?
+        """, (period,)).fetchall()
+
+        totals = {}  # dimension -> {metric: [sum, count]}
+        for row in rows:
+            dimensions = [ALL] + [dimension_key(**{field: row[field]}) for field in KPI_DIMENSIONS if row[field]]
+            for dimension in dimensions:
+                metrics = totals.setdefault(dimension, {})
+                for metric, value in [('properties', 1), ('total_cost', row['total_cost'])] + [
+                    (column, row[column]) for column in KPI_AVERAGES
+                ]:
+                    if value is not None:
+                        entry = metrics.setdefault(metric, [0, 0])
+                        entry[0] += value
+                        entry[1] += 1
+
+        cells = []
+        for dimension, metrics in totals.items():
+            for metric, (total, count) in metrics.items():
+                if metric in ('properties', 'total_cost'):
+                    cells.append((f'kpi_{metric}', dimension, period, total))
+                else:
+                    cells.append((f'kpi_{metric}', dimension, period, total / count))
+        conn.executemany(
+            "INSERT INTO analytics_cache (metric_type, dimension, period, value) VALUES (?, ?, ?, ?)", cells
+        )
+
+    # ==================== Reads ====================
+
+    def rate_summary(self, period: str = ALL, **filters) -> Dict:
+        """
+        Rate statistics for one dimension and period.
+
+        Args:
+            period: "YYYY-MM" or "all"
+            **filters: vendor, service_type, rate_type, region
+
+        Returns:
+            Dict with avg_rate, min_rate, max_rate, sample_count (the shape
+            of WastewiseDB.get_rate_benchmarks without percentiles)
+        """
+        self.refresh()
+        with self._connect() as conn:
+            values = dict(conn.execute(f"""
+                SELECT metric_type, value FROM analytics_cache
+                WHERE metric_type IN ({', '.join('?' * len(RATE_METRICS))}) AND dimension = ? AND period = ?
+            """, (*RATE_METRICS, dimension_key(**filters), period)).fetchall())
+        return _rate_summary(values)
+
+    def rate_series(self, months: int = 12, **filters) -> List[Dict]:
+        """
+        Monthly rate statistics for one dimension, most recent first.
+
+        Args:
+            months: Number of months
+            **filters: vendor, service_type, rate_type, region
+
+        Returns:
+            Dicts with period plus the rate_summary() fields
+        """
+        self.refresh()
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT metric_type, period, value FROM analytics_cache
+                WHERE metric_type IN ({', '.join('?' * len(RATE_METRICS))}) AND dimension = ? AND period != ?
+            """, (*RATE_METRICS, dimension_key(**filters), ALL)).fetchall()
+
+        periods = {}
+        for row in rows:
+            periods.setdefault(row['period'], {})[row['metric_type']] = row['value']
+        return [
+            {'period': period, **_rate_summary(periods[period])}
+            for period in sorted(periods, reverse=True)[:months]
+        ]
+
+    def rate_breakdown(self, months: int = 12, vendor: str = None, service_type: str = None) -> List[Dict]:
+        """
+        Monthly average rate per service_type and rate_type, most recent first.
+
+        Args:
+            months: Maximum rows (one per period, service_type and rate_type)
+            vendor: Only this vendor's rates
+            service_type: Only this service type
+
+        Returns:
+            Dicts with period, service_type, rate_type and avg_rate (the
+            shape of WastewiseDB.get_rate_trends)
+        """
+        prefix = dimension_key(vendor=vendor, service_type=service_type)
+        prefix = '' if prefix == ALL else prefix + '|'
+
+        self.refresh()
+        with self._connect() as conn:
+            # The range narrows the scan to dimensions starting with prefix
+            rows = conn.execute("""
+                SELECT metric_type, dimension, period, value FROM analytics_cache
+                WHERE metric_type IN ('rate_count', 'rate_sum') AND dimension >= ? AND dimension < ? AND period != ?
+            """, (prefix, prefix + '\x7f', ALL)).fetchall()
+
+        # Cells broken down by exactly the filters plus service_type and rate_type
+        wanted = {'service_type', 'rate_type'} | ({'vendor'} if vendor else set())
+        cells = {}  # (period, service_type, rate_type) -> {metric: value}
+        for row in rows:
+            fields = parse_dimension(row['dimension'])
+            if set(fields) != wanted:
+                continue
+            key = (row['period'], fields['service_type'], fields['rate_type'])
+            cells.setdefault(key, {})[row['metric_type']] = row['value']
+
+        result = [
+            {'period': period, 'service_type': service, 'rate_type': rate_type,
+             'avg_rate': values['rate_sum'] / values['rate_count']}
+            for (period, service, rate_type), values in cells.items()
+            if values.get('rate_count')
+        ]
+        result.sort(key=lambda entry: (entry['service_type'], entry['rate_type']))
+        result.sort(key=lambda entry: entry['period'], reverse=True)
+        return result[:months]
+
+    def kpi_series(self, months: int = 12, region: str = None, property_type: str = None) -> List[Dict]:
+        """
+        Portfolio KPI rollups per period, most recent first.
+
+        Args:
+            months: Number of periods
+            region: Only properties in this region
+            property_type: Only properties of this type (ignored with region)
+
+        Returns:
+            Dicts with period, properties, total_cost and the averaged KPIs
+        """
+        dimension = dimension_key(region=region) if region else dimension_key(property_type=property_type)
+
+        self.refresh()
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT metric_type, period, value FROM analytics_cache
+                WHERE metric_type IN ({', '.join('?' * len(KPI_METRICS))}) AND dimension = ?
+            """, (*KPI_METRICS, dimension)).fetchall()
+
+        periods = {}
+        for row in rows:
+            periods.setdefault(row['period'], {})[row['metric_type'][4:]] = row['value']
+
+        result = []
+        for period in sorted(periods, reverse=True)[:months]:
+            values = periods[period]
+            entry = {'period': period, 'properties': int(values.get('properties', 0))}
+            for metric in ('total_cost',) + KPI_AVERAGES:
+                value = values.get(metric)
+                entry[metric] = round(value, 4) if value is not None else None
+            result.append(entry)
+        return result
+
+
+def _rate_cells(groups: Iterable) -> Dict[str, Tuple[float, float, float, float]]:
+    """Roll grouped (vendor, service_type, rate_type, region) stats up to every dimension subset."""
+    cells = {}
+    for group in groups:
+        values = {field: group[field] for field in RATE_DIMENSIONS}
+        fields = [field for field in RATE_DIMENSIONS if values[field]]
+
+        for size in range(len(fields) + 1):
+            for subset in itertools.combinations(fields, size):
+                dimension = dimension_key(**{field: values[field] for field in subset})
+                cell = cells.get(dimension)
+                if cell is None:
+                    cells[dimension] = (group['count'], group['total'], group['low'], group['high'])
+                else:
+                    cells[dimension] = (
+                        cell[0] + group['count'], cell[1] + group['total'],
+                        min(cell[2], group['low']), max(cell[3], group['high'])
+                    )
+    return cells
+
+
+def _read_rate_cells(conn, where: str, params: tuple) -> Dict[str, list]:
+    """Rate cells matching a condition, as dimension -> [count, sum, min, max]."""
+    cells = {}
+    for row in conn.execute(f"""
+        SELECT metric_type, dimension, value FROM analytics_cache
+        WHERE {where} AND metric_type IN ({', '.join('?' * len(RATE_METRICS))})
+    """, (*params, *RATE_METRICS)):
+        cells.setdefault(row['dimension'], [0, 0.0, None, None])[RATE_METRICS.index(row['metric_type'])] = row['value']
+    return cells
+
+
+def _delete_rate_cells(conn, period: str, dimensions: List[str]) -> None:
+    """Delete the rate cells of some dimensions in one period."""
+    conn.executemany(
+        f"DELETE FROM analytics_cache WHERE metric_type IN ({', '.join('?' * len(RATE_METRICS))}) "
+        "AND dimension = ? AND period = ?",
+        [(*RATE_METRICS, dimension, period) for dimension in dimensions]
+    )
+
+
+def _write_rate_cells(conn, period: str, cells: Dict[str, tuple]) -> None:
+    """Insert or overwrite the rate cells of one period."""
+    conn.executemany("""
+        INSERT INTO analytics_cache (metric_type, dimension, period, value) VALUES (?, ?, ?, ?)
+        ON CONFLICT(metric_type, dimension, period) DO UPDATE SET
+            value = excluded.value, computed_at = CURRENT_TIMESTAMP
+    """, [
+        (metric, dimension, period, value)
+        for dimension, values in cells.items()
+        for metric, value in zip(RATE_METRICS, values)
+    ])
+
+
+def _rate_summary(values: Dict[str, float]) -> Dict:
+    """Benchmark-shaped dict from rate_* cell values."""
+    count = int(values.get('rate_count') or 0)
+    return {
+        'avg_rate': round(values['rate_sum'] / count, 2) if count else None,
+        'min_rate': values.get('rate_min') if count else None,
+        'max_rate': values.get('rate_max') if count else None,
+        'sample_count': count
+    }
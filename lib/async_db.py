@@ -0,0 +1,188 @@
+"""
+Asyncio facade for WASTE Master Brain's blocking database and RAG calls.
+
+sqlite3 and the Gemini SDK block, so calling them from a coroutine stalls
+the event loop for every other task. These wrappers run each call on a
+bounded thread pool instead; the pool's threads are long-lived, so every
+worker keeps reusing its own WastewiseDB connection. Concurrent awaits
+overlap (reads run in parallel under WAL) while the number of threads and
+connections stays capped.
+
+Usage:
+    from lib.async_db import AsyncWastewiseDB, AsyncRateDatabaseRAG
+
+    async with AsyncWastewiseDB() as db:
+        benchmarks = await db.get_rate_benchmarks(vendor="WM")
+        await db.run_in_transaction(db.db.add_property, "Avana Sacramento", unit_count=240)
+
+    rag = AsyncRateDatabaseRAG()
+    comparison = await rag.compare_rate(125.00, "WM", "compactor", "haul_fee")
+"""
+
+import asyncio
+import contextvars
+import functools
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Add parent to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.database import WastewiseDB
+from lib.rate_rag import RateDatabaseRAG
+
+# Worker threads (and so connections) per facade. SQLite serializes writers,
+# so more threads mainly add contention.
+DEFAULT_MAX_WORKERS = 4
+
+
+class AsyncWastewiseDB:
+    """
+    Awaitable access to a WastewiseDB through a bounded thread pool.
+
+    Every public WastewiseDB method is available as a coroutine with the
+    same arguments, e.g. ``await adb.get_property("Avana")``.
+    """
+
+    def __init__(self, db: WastewiseDB = None, max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            db: Database to wrap. Defaults to WastewiseDB() on data/wastewise.db
+            max_workers: Maximum threads running database calls at once
+        """
+        self.db = db if db is not None else WastewiseDB()
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wastewise-db')
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the pool and await its result.
+
+        The caller's context variables are visible to func, as with
+        asyncio.to_thread().
+
+        Args:
+            func: Callable to run
+            *args, **kwargs: Passed to func
+
+        Returns:
+            func's return value (its exception is raised here)
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    async def run_in_transaction(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run func inside db.transaction() on a single worker thread.
+
+        Transactions are per thread, so awaiting several separate calls
+        cannot share one; group the work in func instead.
+        """
+        def call():
+            with self.db.transaction():
+                return func(*args, **kwargs)
+
+        return await self.run(call)
+
+    def __getattr__(self, name: str) -> Callable:
+        """Coroutine wrapper for a public WastewiseDB method."""
+        if name.startswith('_') or name in ('db', 'transaction'):
+            raise AttributeError(name)
+
+        method = getattr(self.db, name)
+        if not callable(method):
+            raise AttributeError(name)
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+
+        return wrapper
+
+    def close(self) -> None:
+        """Wait for running calls, stop the pool and close the connections."""
+        self._executor.shutdown(wait=True)
+        self.db.close()
+
+    async def aclose(self) -> None:
+        """close() without blocking the event loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def __aenter__(self) -> 'AsyncWastewiseDB':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+class AsyncRateDatabaseRAG:
+    """
+    Async variants of the RateDatabaseRAG methods.
+
+    Database queries and Gemini calls run on the pool of an
+    AsyncWastewiseDB over the RAG's own database.
+    """
+
+    def __init__(self, rag: RateDatabaseRAG = None, max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            rag: RAG to wrap. Defaults to RateDatabaseRAG()
+            max_workers: Maximum threads running calls at once
+        """
+        self.rag = rag if rag is not None else RateDatabaseRAG()
+        self.adb = AsyncWastewiseDB(self.rag.db, max_workers=max_workers)
+
+    async def get_rate_benchmark(
+        self,
+        vendor: str = None,
+        service_type: str = None,
+        rate_type: str = None,
+        region: str = None
+    ) -> Dict:
+        """See RateDatabaseRAG.get_rate_benchmark."""
+        return await self.adb.run(self.rag.get_rate_benchmark, vendor, service_type, rate_type, region)
+
+    async def get_pricing_trends(self, vendor: str, service_type: str = None, months: int = 12) -> Dict:
+        """See RateDatabaseRAG.get_pricing_trends."""
+        return await self.adb.run(self.rag.get_pricing_trends, vendor, service_type, months)
+
+    async def compare_rate(
+        self,
+        rate_value: float,
+        vendor: str,
+        service_type: str,
+        rate_type: str,
+        region: str = None
+    ) -> Dict:
+        """See RateDatabaseRAG.compare_rate."""
+        return await self.adb.run(self.rag.compare_rate, rate_value, vendor, service_type, rate_type, region)
+
+    async def query_rates(self, natural_language_query: str) -> Dict:
+        """See RateDatabaseRAG.query_rates."""
+        return await self.adb.run(self.rag.query_rates, natural_language_query)
+
+    async def save_rate_from_invoice(
+        self,
+        property_name: str,
+        vendor: str,
+        invoice_date: str,
+        rates: List[Dict],
+        region: str = None,
+        source_document: str = None
+    ) -> List[int]:
+        """See RateDatabaseRAG.save_rate_from_invoice."""
+        return await self.adb.run(
+            self.rag.save_rate_from_invoice, property_name, vendor, invoice_date, rates, region, source_document
+        )
+
+    def close(self) -> None:
+        """Stop the pool and close the connections."""
+        self.adb.close()
+
+    async def aclose(self) -> None:
+        """close() without blocking the event loop."""
+        await self.adb.aclose()
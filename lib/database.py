@@ -7,6 +7,16 @@ Provides clean interface for all database operations including:
 - KPI tracking
 - Hauler profiles
 - Invoice storage
+- Email thread index
+
+Each thread reuses one connection (WAL journaling, tuned PRAGMAs) for all
+calls; wrap several calls in db.transaction() to commit them together.
+
+With snapshot=True, reads are served from an in-memory copy of the file
+that is refreshed in the background after commits (see lib/snapshot.py);
+writes still go to the file. Reads may trail writes by up to one refresh.
+With profile=True, every statement is timed per normalized query (see
+get_query_stats() and lib/query_profiler.py).
 
 Usage:
     from lib.database import WastewiseDB
@@ -14,68 +24,306 @@ Usage:
     db = WastewiseDB()
     db.add_property("Avana Sacramento", property_type="garden", unit_count=240)
     db.add_rate_history("WM", "compactor", "haul_fee", 125.00, "2025-01-01", region="Sacramento")
+
+    with db.transaction():
+        db.add_rate_history("WM", "compactor", "rental", 95.00, "2025-01-01")
+        db.add_rate_history("WM", "compactor", "fuel_surcharge", 12.50, "2025-01-01")
+
+    dashboard_db = WastewiseDB(snapshot=True)
+    dashboard_db.get_properties_with_latest_kpis(limit=50)
 """
 
+import os
 import sqlite3
 import json
 import logging
+import threading
+import weakref
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from contextlib import contextmanager
 
+from lib.analytics import AnalyticsRollups
+from lib.query_profiler import SLOW_QUERY_MS, SORT_FIELDS, QueryProfiler
+from lib.rate_stats import RatePercentiles
+from lib.snapshot import DEFAULT_INTERVAL as SNAPSHOT_INTERVAL, DatabaseSnapshot
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Valid table names for stats queries (prevents SQL injection)
 VALID_TABLES = frozenset([
     'properties', 'rate_history', 'kpi_history',
-    'hauler_profiles', 'invoices', 'email_index', 'contracts'
+    'hauler_profiles', 'invoices', 'email_index', 'contracts', 'threads'
 ])
 
 # Default database path
 DEFAULT_DB_PATH = Path(__file__).parent.parent / "data" / "wastewise.db"
+DEFAULT_SCHEMA_PATH = DEFAULT_DB_PATH.parent / "schema.sql"
+
+# Must match the schema_version written by schema.sql
+SCHEMA_VERSION = '1.3.0'
+
+# Max bound parameters per IN (...) query (SQLite's historical limit is 999)
+MAX_QUERY_PARAMS = 500
+
+# Applied to every new connection. WAL lets readers run alongside a writer,
+# and with WAL, synchronous=NORMAL is still safe against corruption.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",  # KiB, i.e. 16 MB per connection
+    "PRAGMA mmap_size = 268435456",  # 256 MB
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Prepared statements kept per connection (sqlite3 default is 128)
+STATEMENT_CACHE_SIZE = 512
+
+# _metadata key holding when the thread index was last synced (Unix time)
+THREADS_SYNCED_KEY = 'threads_synced_at'
 
 
 class WastewiseDB:
     """Database access layer for WASTE Master Brain."""
 
-    def __init__(self, db_path: str = None):
+    def __init__(
+        self,
+        db_path: str = None,
+        snapshot: bool = False,
+        snapshot_interval: float = SNAPSHOT_INTERVAL,
+        profile: bool = False,
+        slow_query_ms: float = SLOW_QUERY_MS
+    ):
         """Initialize database connection.
 
         Args:
             db_path: Path to SQLite database. Defaults to data/wastewise.db
+            snapshot: Serve reads from an in-memory copy of the database
+            snapshot_interval: Seconds between checks for changes to refresh
+                the copy with (changes made through this instance are
+                checked for right after they commit)
+            profile: Time every statement (see get_query_stats())
+            slow_query_ms: With profile, statements slower than this get
+                their query plan captured
         """
         self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
+        self._local = threading.local()
+        self._connections = {}  # thread ident -> (thread weakref, connection)
+        self._connections_lock = threading.Lock()
+        self._pid = os.getpid()
+        self._property_ids = {}  # property name -> ID, filled as names are resolved
+        self._rate_stats = RatePercentiles(self._connect)
+        self._analytics = AnalyticsRollups(self.transaction, self._connect)
+        self.profiler = QueryProfiler(slow_ms=slow_query_ms) if profile else None
+        self._sqlite_connect = self.profiler.connect if profile else sqlite3.connect
+        self._snapshot = (
+            DatabaseSnapshot(self.db_path, snapshot_interval, connect=self._sqlite_connect) if snapshot else None
+        )
         self._ensure_db_exists()
 
     def _ensure_db_exists(self):
-        """Ensure database and schema exist."""
-        if not self.db_path.exists():
-            schema_path = self.db_path.parent / "schema.sql"
-            if schema_path.exists():
-                with self._connect() as conn:
-                    with open(schema_path, 'r') as f:
-                        conn.executescript(f.read())
+        """Ensure database and schema exist.
+
+        The schema is idempotent (CREATE ... IF NOT EXISTS), so it is also
+        re-applied to existing databases whose schema_version is older,
+        adding new tables without touching existing data.
+        """
+        schema_path = self.db_path.parent / "schema.sql"
+        if not schema_path.exists():
+            schema_path = DEFAULT_SCHEMA_PATH
+        if not schema_path.exists():
+            return
+
+        if self.db_path.exists() and self._schema_version() == SCHEMA_VERSION:
+            return
+
+        with self._connect() as conn:
+            with open(schema_path, 'r') as f:
+                conn.executescript(f.read())
+
+    def _schema_version(self) -> Optional[str]:
+        """Schema version recorded in the database, if any."""
+        with self._connect() as conn:
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '_metadata'"
+            ).fetchone():
+                return None
+            row = conn.execute("SELECT value FROM _metadata WHERE key = 'schema_version'").fetchone()
+            return row['value'] if row else None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited through fork() must not be used by the child
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = self._sqlite_connect(
+            str(self.db_path),
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False  # Only used by its thread; close() may run elsewhere
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._local.depth = 0
+
+        current = threading.current_thread()
+        with self._connections_lock:
+            # After fork() the parent's connections belong to the parent
+            if self._pid != os.getpid():
+                self._connections = {}
+                self._pid = os.getpid()
+
+            # Close connections of threads that have exited
+            for ident, (thread_ref, other) in list(self._connections.items()):
+                thread = thread_ref()
+                if ident == current.ident or thread is None or not thread.is_alive():
+                    if other is not conn:
+                        other.close()
+                    del self._connections[ident]
+            self._connections[current.ident] = (weakref.ref(current), conn)
+
+        return conn
 
     @contextmanager
     def _connect(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row
+        """Context manager for database operations on this thread's connection.
+
+        Commits on success and rolls back on error, unless an explicit
+        transaction() is open, which then commits or rolls back as a whole.
+        """
+        conn = self._get_connection()
+        if self._local.depth:
+            yield conn
+            return
+
+        changes = conn.total_changes
         try:
             yield conn
             conn.commit()
+            if conn.total_changes != changes:
+                self._committed()
         except sqlite3.Error as e:
             logger.error(f"Database error: {e}", exc_info=True)
             conn.rollback()
+            self._discard_caches()
             raise
         except Exception as e:
             logger.error(f"Unexpected error in database operation: {e}", exc_info=True)
             conn.rollback()
+            self._discard_caches()
+            raise
+
+    @contextmanager
+    def transaction(self):
+        """Run several operations in one transaction.
+
+        The outermost transaction() takes the write lock up front
+        (BEGIN IMMEDIATE) and commits once at the end; nested ones use
+        savepoints, so an error inside them only undoes their own work if
+        the caller handles it. Any error that escapes rolls back.
+
+        Yields:
+            This thread's connection
+        """
+        conn = self._get_connection()
+        depth = self._local.depth
+
+        if depth == 0:
+            if conn.in_transaction:
+                conn.commit()
+            changes = conn.total_changes
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            conn.execute(f"SAVEPOINT sp_{depth}")
+
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException as e:
+            self._local.depth = depth
+            if depth == 0:
+                logger.error(f"Transaction rolled back: {e}", exc_info=True)
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO SAVEPOINT sp_{depth}")
+                conn.execute(f"RELEASE SAVEPOINT sp_{depth}")
+            self._discard_caches()
             raise
-        finally:
-            conn.close()
+
+        self._local.depth = depth
+        if depth == 0:
+            conn.commit()
+            if conn.total_changes != changes:
+                self._committed()
+        else:
+            conn.execute(f"RELEASE SAVEPOINT sp_{depth}")
+
+    @contextmanager
+    def _read(self):
+        """Context manager for read-only queries.
+
+        In snapshot mode this yields the calling thread's connection to the
+        in-memory copy, except inside transaction(), whose own uncommitted
+        writes must stay visible. Otherwise it is the same as _connect().
+        """
+        if self._snapshot is None or getattr(self._local, 'depth', 0):
+            with self._connect() as conn:
+                yield conn
+            return
+
+        yield self._snapshot.connection()
+
+    def _committed(self) -> None:
+        """Called after this instance commits changes."""
+        if self._snapshot is not None:
+            self._snapshot.request_refresh()
+
+    def refresh_snapshot(self) -> bool:
+        """Bring the in-memory copy up to date before returning.
+
+        Reads in snapshot mode otherwise see commits once the background
+        refresh has run; call this when the next read must see them.
+
+        Returns:
+            True if the copy was rebuilt, False if it was current or
+            snapshot mode is off
+        """
+        if self._snapshot is None:
+            return False
+        self._snapshot.connection()  # Started on first use
+        return self._snapshot.refresh()
+
+    def _discard_caches(self) -> None:
+        """Forget cached rows after a rollback; the rolled back work may have added them."""
+        self._property_ids.clear()
+        self._rate_stats.clear()
+
+    def close(self) -> None:
+        """Close the connections of all threads and any snapshot.
+
+        Safe to call repeatedly; a later call on this instance reopens a
+        connection for the calling thread.
+        """
+        with self._connections_lock:
+            for _, conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+        if self._snapshot is not None:
+            self._snapshot.close()
+
+    def __enter__(self) -> 'WastewiseDB':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     # ==================== Properties ====================
 
@@ -108,11 +356,13 @@ class WastewiseDB:
                     updated_at = CURRENT_TIMESTAMP
                 RETURNING id
             """, (name, property_type, unit_count, address, city, state, region))
-            return cursor.fetchone()[0]
+            property_id = cursor.fetchone()[0]
+        self._property_ids[name] = property_id
+        return property_id
 
     def get_property(self, name: str) -> Optional[Dict]:
         """Get property by name."""
-        with self._connect() as conn:
+        with self._read() as conn:
             row = conn.execute(
                 "SELECT * FROM properties WHERE name = ?", (name,)
             ).fetchone()
@@ -120,14 +370,58 @@ class WastewiseDB:
 
     def get_property_id(self, name: str) -> Optional[int]:
         """Get property ID by name, creating if needed."""
-        prop = self.get_property(name)
-        if prop:
-            return prop['id']
-        return self.add_property(name)
+        return self.resolve_property_ids([name])[name]
+
+    def resolve_property_ids(self, names: List[str]) -> Dict[str, int]:
+        """Map property names to IDs, creating missing properties.
+
+        Resolved IDs are cached on the instance, so repeated names cost no
+        queries. Uncached names are looked up and created in bulk.
+
+        Returns:
+            Dict mapping each name to its property ID
+        """
+        missing = [n for n in dict.fromkeys(names) if n not in self._property_ids]
+        if missing:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO properties (name) VALUES (?) ON CONFLICT(name) DO NOTHING",
+                    [(name,) for name in missing]
+                )
+                for chunk in _chunks(missing, MAX_QUERY_PARAMS):
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT name, id FROM properties WHERE name IN ({placeholders})", chunk
+                    ).fetchall()
+                    self._property_ids.update((row['name'], row['id']) for row in rows)
+
+        return {name: self._property_ids[name] for name in names}
+
+    def _with_property_ids(self, records: List[Dict]) -> List[Dict]:
+        """Fill property_id from property_name where only the name is given."""
+        names = [r['property_name'] for r in records if r.get('property_name') and not r.get('property_id')]
+        if not names:
+            return records
+        ids = self.resolve_property_ids(names)
+        return [
+            {**r, 'property_id': ids[r['property_name']]}
+            if r.get('property_name') and not r.get('property_id') else r
+            for r in records
+        ]
+
+    def _insert_many(self, conn: sqlite3.Connection, sql: str, rows: List[tuple]) -> List[int]:
+        """executemany() a plain INSERT and return the new row IDs.
+
+        The caller holds the write lock (inside transaction()), so the rows
+        get consecutive IDs ending at last_insert_rowid().
+        """
+        conn.executemany(sql, rows)
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return list(range(last_id - len(rows) + 1, last_id + 1))
 
     def list_properties(self) -> List[Dict]:
         """List all properties."""
-        with self._connect() as conn:
+        with self._read() as conn:
             rows = conn.execute("SELECT * FROM properties ORDER BY name").fetchall()
             return [dict(row) for row in rows]
 
@@ -169,18 +463,65 @@ class WastewiseDB:
             """, (property_id, vendor, service_type, rate_type, rate_value, effective_date, region, source_document, notes))
             return cursor.lastrowid
 
+    def add_rates_bulk(self, rates: List[Dict]) -> List[int]:
+        """Add many rate history records in one transaction.
+
+        Args:
+            rates: Dicts with the add_rate_history() arguments (vendor,
+                service_type, rate_type, rate_value, effective_date and
+                optionally property_id, region, source_document, notes).
+                property_name may be given instead of property_id; missing
+                properties are created.
+
+        Returns:
+            Rate history IDs, in input order
+        """
+        if not rates:
+            return []
+
+        with self.transaction() as conn:
+            rates = self._with_property_ids(rates)
+            return self._insert_many(conn, """
+                INSERT INTO rate_history
+                (property_id, vendor, service_type, rate_type, rate_value, effective_date, region, source_document, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    r.get('property_id'), r['vendor'], r['service_type'], r['rate_type'], r['rate_value'],
+                    r['effective_date'], r.get('region'), r.get('source_document'), r.get('notes')
+                )
+                for r in rates
+            ])
+
     def get_rate_benchmarks(
         self,
         vendor: str = None,
         service_type: str = None,
         rate_type: str = None,
-        region: str = None
+        region: str = None,
+        precomputed: bool = False
     ) -> Dict:
         """Get rate benchmarks with statistics.
 
+        Args:
+            vendor, service_type, rate_type, region: Optional filters
+            precomputed: Read avg, min, max and count from the
+                analytics_cache rollups instead of aggregating rate_history
+
         Returns:
-            Dict with avg, min, max, count, percentiles
+            Dict with avg, min, max, count, and percentiles ({'p25', 'p50',
+            'p75'} interpolated, or None without data)
         """
+        if precomputed:
+            stats = self._analytics.rate_summary(
+                vendor=vendor, service_type=service_type, rate_type=rate_type, region=region
+            )
+            percentiles = self._rate_stats.quartiles(
+                vendor=vendor, service_type=service_type, rate_type=rate_type, region=region
+            )
+            stats['percentiles'] = {k: round(v, 2) for k, v in percentiles.items()} if percentiles else None
+            return stats
+
         # Build query with parameterized conditions
         base_query = """
             SELECT
@@ -206,23 +547,67 @@ class WastewiseDB:
             base_query += " AND region = ?"
             params.append(region)
 
-        with self._connect() as conn:
+        with self._read() as conn:
             row = conn.execute(base_query, params).fetchone()
 
+            percentiles = self._rate_stats.quartiles(
+                vendor=vendor, service_type=service_type, rate_type=rate_type, region=region
+            )
+
             return {
                 'avg_rate': round(row['avg_rate'], 2) if row['avg_rate'] else None,
                 'min_rate': row['min_rate'],
                 'max_rate': row['max_rate'],
-                'sample_count': row['sample_count']
+                'sample_count': row['sample_count'],
+                'percentiles': {k: round(v, 2) for k, v in percentiles.items()} if percentiles else None
             }
 
+    def get_rate_percentile_rank(
+        self,
+        rate_value: float,
+        vendor: str = None,
+        service_type: str = None,
+        rate_type: str = None,
+        region: str = None
+    ) -> Optional[float]:
+        """Get the exact percentile rank of a rate among matching rates.
+
+        Args:
+            rate_value: Rate to rank
+            vendor, service_type, rate_type, region: Same filters as
+                get_rate_benchmarks()
+
+        Returns:
+            Percentage of matching rates below rate_value (equal rates count
+            half), or None without data
+        """
+        return self._rate_stats.rank(
+            rate_value, vendor=vendor, service_type=service_type, rate_type=rate_type, region=region
+        )
+
     def get_rate_trends(
         self,
         vendor: str,
         service_type: str = None,
-        months: int = 12
+        months: int = 12,
+        precomputed: bool = False
     ) -> List[Dict]:
-        """Get rate trends over time."""
+        """Get rate trends over time.
+
+        Args:
+            vendor: Hauler name
+            service_type: Optional filter by service type
+            months: Maximum rows (one per month, service type and rate type)
+            precomputed: Read the monthly averages from the analytics_cache
+                rollups instead of aggregating rate_history
+
+        Returns:
+            Dicts with period, service_type, rate_type and avg_rate, most
+            recent first
+        """
+        if precomputed:
+            return self._analytics.rate_breakdown(months, vendor=vendor, service_type=service_type)
+
         base_query = """
             SELECT
                 strftime('%Y-%m', effective_date) as period,
@@ -245,7 +630,7 @@ class WastewiseDB:
         """
         params.append(months)
 
-        with self._connect() as conn:
+        with self._read() as conn:
             rows = conn.execute(base_query, params).fetchall()
             return [dict(row) for row in rows]
 
@@ -291,13 +676,50 @@ class WastewiseDB:
             """, (property_id, period, cost_per_door, yards_per_door, contamination_rate, fee_burden_pct, total_cost, source_invoice_id, notes))
             return cursor.lastrowid
 
+    def add_kpis_bulk(self, kpis: List[Dict]) -> int:
+        """Add or update many KPI history records in one transaction.
+
+        Existing (property, period) rows are merged like add_kpi_history().
+
+        Args:
+            kpis: Dicts with the add_kpi_history() arguments; property_name
+                may be given instead of property_id
+
+        Returns:
+            Number of records written
+        """
+        if not kpis:
+            return 0
+
+        with self.transaction() as conn:
+            kpis = self._with_property_ids(kpis)
+            conn.executemany("""
+                INSERT INTO kpi_history
+                (property_id, period, cost_per_door, yards_per_door, contamination_rate, fee_burden_pct, total_cost, source_invoice_id, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(property_id, period) DO UPDATE SET
+                    cost_per_door = COALESCE(excluded.cost_per_door, kpi_history.cost_per_door),
+                    yards_per_door = COALESCE(excluded.yards_per_door, kpi_history.yards_per_door),
+                    contamination_rate = COALESCE(excluded.contamination_rate, kpi_history.contamination_rate),
+                    fee_burden_pct = COALESCE(excluded.fee_burden_pct, kpi_history.fee_burden_pct),
+                    total_cost = COALESCE(excluded.total_cost, kpi_history.total_cost)
+            """, [
+                (
+                    k['property_id'], k['period'], k.get('cost_per_door'), k.get('yards_per_door'),
+                    k.get('contamination_rate'), k.get('fee_burden_pct'), k.get('total_cost'),
+                    k.get('source_invoice_id'), k.get('notes')
+                )
+                for k in kpis
+            ])
+        return len(kpis)
+
     def get_property_kpis(self, property_name: str, limit: int = 12) -> List[Dict]:
         """Get KPI history for a property."""
         prop = self.get_property(property_name)
         if not prop:
             return []
 
-        with self._connect() as conn:
+        with self._read() as conn:
             rows = conn.execute("""
                 SELECT * FROM kpi_history
                 WHERE property_id = ?
@@ -312,7 +734,7 @@ class WastewiseDB:
         if not period:
             period = datetime.now().strftime('%Y-%m')
 
-        with self._connect() as conn:
+        with self._read() as conn:
             rows = conn.execute("""
                 SELECT
                     p.name as property_name,
@@ -326,6 +748,51 @@ class WastewiseDB:
 
             return [dict(row) for row in rows]
 
+    def get_properties_with_latest_kpis(self, limit: int = None, offset: int = 0) -> List[Dict]:
+        """Get properties, ordered by name, each with its most recent KPI row.
+
+        One statement for the whole page: properties are paginated first,
+        and each one's latest period is a single seek on the
+        (property_id, period) unique index.
+
+        Args:
+            limit: Maximum properties to return (None for all)
+            offset: Properties to skip
+
+        Returns:
+            List of property dicts with the latest period's KPI columns
+            (None when a property has no KPIs)
+        """
+        with self._read() as conn:
+            rows = conn.execute("""
+                SELECT
+                    p.id,
+                    p.name,
+                    p.property_type,
+                    p.unit_count,
+                    p.region,
+                    k.period,
+                    k.cost_per_door,
+                    k.yards_per_door,
+                    k.contamination_rate,
+                    k.fee_burden_pct,
+                    k.total_cost
+                FROM (
+                    SELECT * FROM properties
+                    ORDER BY name
+                    LIMIT ? OFFSET ?
+                ) p
+                LEFT JOIN kpi_history k ON k.id = (
+                    SELECT id FROM kpi_history
+                    WHERE property_id = p.id
+                    ORDER BY period DESC
+                    LIMIT 1
+                )
+                ORDER BY p.name
+            """, (-1 if limit is None else limit, offset)).fetchall()
+
+            return [dict(row) for row in rows]
+
     # ==================== Hauler Profiles ====================
 
     def add_hauler_profile(
@@ -368,7 +835,7 @@ class WastewiseDB:
 
     def get_hauler_profile(self, vendor_name: str) -> Optional[Dict]:
         """Get hauler profile."""
-        with self._connect() as conn:
+        with self._read() as conn:
             row = conn.execute(
                 "SELECT * FROM hauler_profiles WHERE vendor_name = ?", (vendor_name,)
             ).fetchone()
@@ -421,13 +888,47 @@ class WastewiseDB:
             ))
             return cursor.lastrowid
 
+    def add_invoices_bulk(self, invoices: List[Dict]) -> List[int]:
+        """Add many invoice records in one transaction.
+
+        Args:
+            invoices: Dicts with the add_invoice() arguments; property_name
+                may be given instead of property_id
+
+        Returns:
+            Invoice IDs, in input order
+        """
+        if not invoices:
+            return []
+
+        with self.transaction() as conn:
+            invoices = self._with_property_ids(invoices)
+            return self._insert_many(conn, """
+                INSERT INTO invoices
+                (property_id, vendor, invoice_number, invoice_date, service_period_start, service_period_end,
+                 total_amount, haul_count, tons_total, base_service_cost, disposal_cost, fees_total,
+                 fees_breakdown, source_file, extraction_json)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    i.get('property_id'), i['vendor'], i.get('invoice_number'), i['invoice_date'],
+                    i.get('service_period_start'), i.get('service_period_end'), i['total_amount'],
+                    i.get('haul_count'), i.get('tons_total'), i.get('base_service_cost'),
+                    i.get('disposal_cost'), i.get('fees_total'),
+                    json.dumps(i['fees_breakdown']) if i.get('fees_breakdown') else None,
+                    i.get('source_file'),
+                    json.dumps(i['extraction_json']) if i.get('extraction_json') else None
+                )
+                for i in invoices
+            ])
+
     def get_property_invoices(self, property_name: str, limit: int = 12) -> List[Dict]:
         """Get invoices for a property."""
         prop = self.get_property(property_name)
         if not prop:
             return []
 
-        with self._connect() as conn:
+        with self._read() as conn:
             rows = conn.execute("""
                 SELECT * FROM invoices
                 WHERE property_id = ?
@@ -437,11 +938,249 @@ class WastewiseDB:
 
             return [dict(row) for row in rows]
 
+    # ==================== Email Threads ====================
+
+    def upsert_email_index(self, emails: List[Dict]) -> int:
+        """Insert or update email index rows in one transaction.
+
+        Args:
+            emails: Dicts with email_id and any of date_sent, subject, sender,
+                recipients, body_preview, thread_id, vendors_mentioned,
+                properties_mentioned, issue_types, action_required, source_file.
+                List values are stored as JSON.
+
+        Returns:
+            Number of rows written
+        """
+        rows = [
+            (
+                e['email_id'], e.get('date_sent'), e.get('subject'), e.get('sender'),
+                json.dumps(e['recipients']) if e.get('recipients') is not None else None,
+                e.get('body_preview'), e.get('thread_id'),
+                json.dumps(e['vendors_mentioned']) if e.get('vendors_mentioned') is not None else None,
+                json.dumps(e['properties_mentioned']) if e.get('properties_mentioned') is not None else None,
+                json.dumps(e['issue_types']) if e.get('issue_types') is not None else None,
+                int(bool(e.get('action_required'))), e.get('source_file')
+            )
+            for e in emails if e.get('email_id')
+        ]
+        if not rows:
+            return 0
+
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT INTO email_index
+                (email_id, date_sent, subject, sender, recipients, body_preview, thread_id,
+                 vendors_mentioned, properties_mentioned, issue_types, action_required, source_file)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(email_id) DO UPDATE SET
+                    date_sent = excluded.date_sent,
+                    subject = excluded.subject,
+                    sender = excluded.sender,
+                    recipients = excluded.recipients,
+                    body_preview = excluded.body_preview,
+                    thread_id = excluded.thread_id,
+                    vendors_mentioned = COALESCE(excluded.vendors_mentioned, email_index.vendors_mentioned),
+                    properties_mentioned = COALESCE(excluded.properties_mentioned, email_index.properties_mentioned),
+                    issue_types = COALESCE(excluded.issue_types, email_index.issue_types),
+                    action_required = excluded.action_required,
+                    source_file = excluded.source_file
+            """, rows)
+        return len(rows)
+
+    def delete_email_index(self, email_ids: List[str]) -> int:
+        """Delete email index rows by email ID.
+
+        Returns:
+            Number of rows deleted
+        """
+        deleted = 0
+        with self._connect() as conn:
+            for chunk in _chunks(list(email_ids), MAX_QUERY_PARAMS):
+                placeholders = ','.join('?' * len(chunk))
+                cursor = conn.execute(f"DELETE FROM email_index WHERE email_id IN ({placeholders})", chunk)
+                deleted += cursor.rowcount
+        return deleted
+
+    def upsert_threads(self, threads: List[Dict]) -> int:
+        """Insert or update thread rows in one transaction.
+
+        Args:
+            threads: Thread dicts as built by ThreadAggregator (thread_id, topic,
+                participants, message_count, first/last_message_date, status,
+                projects_detected)
+
+        Returns:
+            Number of rows written
+        """
+        rows = [
+            (
+                t['thread_id'], t.get('topic'), json.dumps(t.get('participants', [])),
+                t.get('message_count', 0), t.get('first_message_date') or None,
+                t.get('last_message_date') or None, t.get('status') or None,
+                json.dumps(t.get('projects_detected', []))
+            )
+            for t in threads
+        ]
+        if not rows:
+            return 0
+
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT INTO threads
+                (thread_id, topic, participants, message_count, first_message_date,
+                 last_message_date, status, projects_detected)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(thread_id) DO UPDATE SET
+                    topic = excluded.topic,
+                    participants = excluded.participants,
+                    message_count = excluded.message_count,
+                    first_message_date = excluded.first_message_date,
+                    last_message_date = excluded.last_message_date,
+                    status = excluded.status,
+                    projects_detected = excluded.projects_detected,
+                    updated_at = CURRENT_TIMESTAMP
+            """, rows)
+        return len(rows)
+
+    def delete_threads(self, thread_ids: List[str]) -> int:
+        """Delete threads and their email index rows.
+
+        Returns:
+            Number of threads deleted
+        """
+        deleted = 0
+        with self._connect() as conn:
+            for chunk in _chunks(list(thread_ids), MAX_QUERY_PARAMS):
+                placeholders = ','.join('?' * len(chunk))
+                conn.execute(f"DELETE FROM email_index WHERE thread_id IN ({placeholders})", chunk)
+                cursor = conn.execute(f"DELETE FROM threads WHERE thread_id IN ({placeholders})", chunk)
+                deleted += cursor.rowcount
+        return deleted
+
+    def has_threads(self) -> bool:
+        """Whether the thread index has been populated."""
+        with self._read() as conn:
+            return conn.execute("SELECT 1 FROM threads LIMIT 1").fetchone() is not None
+
+    def get_metadata(self, key: str) -> Optional[str]:
+        """Get a value from the _metadata table, or None if unset."""
+        with self._read() as conn:
+            row = conn.execute("SELECT value FROM _metadata WHERE key = ?", (key,)).fetchone()
+            return row['value'] if row else None
+
+    def set_metadata(self, key: str, value: str) -> None:
+        """Set a value in the _metadata table."""
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO _metadata (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+            """, (key, value))
+
+    def get_thread_ids(self) -> List[str]:
+        """List all thread IDs in the index."""
+        with self._read() as conn:
+            return [row[0] for row in conn.execute("SELECT thread_id FROM threads").fetchall()]
+
+    def get_threads(self, thread_ids: List[str]) -> Dict[str, Dict]:
+        """Get threads by ID.
+
+        Args:
+            thread_ids: Thread IDs to look up
+
+        Returns:
+            Dict mapping each found thread ID to its row, with participants
+            and projects_detected parsed from JSON
+        """
+        threads = {}
+        with self._read() as conn:
+            for chunk in _chunks(list(dict.fromkeys(thread_ids)), MAX_QUERY_PARAMS):
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT * FROM threads WHERE thread_id IN ({placeholders})", chunk
+                ).fetchall()
+                for row in rows:
+                    thread = dict(row)
+                    thread['participants'] = json.loads(thread['participants'] or '[]')
+                    thread['projects_detected'] = json.loads(thread['projects_detected'] or '[]')
+                    threads[thread['thread_id']] = thread
+        return threads
+
+    # ==================== Analytics ====================
+
+    def refresh_analytics(self) -> int:
+        """Update the analytics_cache rollups for rates and KPIs changed since the last refresh.
+
+        Reads refresh automatically; call this after a batch of writes to
+        take the cost up front.
+
+        Returns:
+            Number of periods recomputed
+        """
+        return self._analytics.refresh()
+
+    def rebuild_analytics(self) -> int:
+        """Recompute all analytics_cache rollups from scratch.
+
+        Returns:
+            Number of periods recomputed
+        """
+        return self._analytics.rebuild()
+
+    def get_rate_rollup(
+        self,
+        vendor: str = None,
+        service_type: str = None,
+        rate_type: str = None,
+        region: str = None,
+        period: str = 'all'
+    ) -> Dict:
+        """Get precomputed rate statistics.
+
+        Args:
+            vendor, service_type, rate_type, region: Same filters as
+                get_rate_benchmarks()
+            period: YYYY-MM, or 'all' for all time
+
+        Returns:
+            Dict with avg_rate, min_rate, max_rate, sample_count
+        """
+        return self._analytics.rate_summary(
+            period, vendor=vendor, service_type=service_type, rate_type=rate_type, region=region
+        )
+
+    def get_rate_rollup_trend(
+        self,
+        vendor: str = None,
+        service_type: str = None,
+        rate_type: str = None,
+        region: str = None,
+        months: int = 12
+    ) -> List[Dict]:
+        """Get precomputed monthly rate statistics, most recent month first."""
+        return self._analytics.rate_series(
+            months, vendor=vendor, service_type=service_type, rate_type=rate_type, region=region
+        )
+
+    def get_kpi_rollups(self, region: str = None, property_type: str = None, months: int = 12) -> List[Dict]:
+        """Get precomputed portfolio KPIs per period, most recent first.
+
+        Args:
+            region: Only properties in this region
+            property_type: Only properties of this type (ignored with region)
+            months: Number of periods
+
+        Returns:
+            Dicts with period, properties, total_cost (sum) and average
+            cost_per_door, yards_per_door, contamination_rate, fee_burden_pct
+        """
+        return self._analytics.kpi_series(months, region=region, property_type=property_type)
+
     # ==================== Statistics ====================
 
     def get_stats(self) -> Dict:
         """Get database statistics."""
-        with self._connect() as conn:
+        with self._read() as conn:
             stats = {}
 
             # Only query tables in the validated whitelist
@@ -463,6 +1202,54 @@ class WastewiseDB:
 
             return stats
 
+    def explain(self, query: str, params: tuple = ()) -> List[str]:
+        """Get the query plan for a statement.
+
+        Args:
+            query: SQL statement (not executed)
+            params: Bound parameters
+
+        Returns:
+            EXPLAIN QUERY PLAN detail lines, e.g.
+            "SEARCH rate_history USING COVERING INDEX idx_rate_history_vendor_service (vendor=?)"
+        """
+        with self._connect() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            return [row['detail'] for row in rows]
+
+    def get_query_stats(self, limit: int = None, order_by: str = 'total_ms') -> List[Dict]:
+        """Get timing statistics per normalized query.
+
+        Args:
+            limit: Maximum queries to return
+            order_by: Field to sort on, descending (total_ms, avg_ms, max_ms,
+                calls, rows or slow_calls)
+
+        Returns:
+            List of dicts with query, calls, rows, rows_changed, total_ms,
+            avg_ms, max_ms, slow_calls and plan; empty unless created with
+            profile=True
+
+        Raises:
+            ValueError: If order_by is not a sortable field
+        """
+        if order_by not in SORT_FIELDS:
+            raise ValueError(f"order_by must be one of: {', '.join(SORT_FIELDS)}")
+        if self.profiler is None:
+            return []
+        return self.profiler.stats(limit=limit, order_by=order_by)
+
+    def reset_query_stats(self) -> None:
+        """Forget the statistics collected so far."""
+        if self.profiler is not None:
+            self.profiler.reset()
+
+
+def _chunks(items: List, size: int):
+    """Split a list into consecutive chunks of at most size items."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
 
 # Convenience functions for quick access
 def get_db(db_path: str = None) -> WastewiseDB:
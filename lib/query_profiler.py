@@ -0,0 +1,314 @@
+"""
+Opt-in statement profiling for SQLite connections.
+
+Connections opened through QueryProfiler.connect() time every statement
+(execute plus the fetches that read its rows) and count the rows it
+returns and changes. Statistics are kept per normalized query: literals
+and IN lists are reduced to placeholders, so one entry covers every call
+of the same statement. The first time a query or DML statement takes
+longer than slow_ms, its EXPLAIN QUERY PLAN is captured and a warning is
+logged; other slow statements (DDL, PRAGMA, transaction control) are
+logged without a plan.
+
+Profiling adds a Python call per fetched row; leave it off unless the
+numbers are wanted.
+
+Usage:
+    from lib.query_profiler import QueryProfiler
+
+    profiler = QueryProfiler(slow_ms=50)
+    conn = profiler.connect("data/wastewise.db")
+    conn.execute("SELECT * FROM properties WHERE name = ?", ("Avana",)).fetchall()
+    profiler.stats()  # [{'query': 'SELECT * FROM properties WHERE name = ?', 'calls': 1, ...}]
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+from time import perf_counter
+from typing import Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Statements slower than this (milliseconds) get their query plan captured
+SLOW_QUERY_MS = 100.0
+
+# Distinct normalized queries tracked; later ones are counted under OTHER_QUERIES
+MAX_QUERIES = 500
+OTHER_QUERIES = '<other>'
+
+# Statements whose plan is captured when slow
+PLANNED_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+# Fields stats() can sort on
+SORT_FIELDS = ('total_ms', 'avg_ms', 'max_ms', 'calls', 'rows', 'slow_calls')
+
+# Normalized queries longer than this (e.g. scripts) are truncated
+MAX_QUERY_LENGTH = 500
+
+# Raw SQL strings whose normalized form is cached
+_NORMALIZED_CACHE_SIZE = 2048
+
+_COMMENT = re.compile(r"--[^\n]*")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(\(\?, \.\.\.\)|\(\?\))(?:\s*,\s*(?:\(\?, \.\.\.\)|\(\?\)))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(sql: str) -> str:
+    """
+    Reduce a statement to its shape: literals become ?, lists of
+    placeholders become (?, ...), comments are dropped and whitespace is
+    collapsed. Long statements are truncated to MAX_QUERY_LENGTH.
+
+    Args:
+        sql: SQL statement
+
+    Returns:
+        Normalized statement
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _COMMENT.sub('', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(?, ...)', sql)
+    sql = _VALUES_LIST.sub(r'\1, ...', sql)
+    return sql if len(sql) <= MAX_QUERY_LENGTH else sql[:MAX_QUERY_LENGTH] + '...'
+
+
+class QueryProfiler:
+    """
+    Per-query timing and row statistics for profiled connections.
+
+    Thread-safe; one profiler can serve the connections of every thread.
+    """
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, max_queries: int = MAX_QUERIES):
+        """
+        Args:
+            slow_ms: Duration above which a statement's plan is captured
+            max_queries: Distinct normalized queries tracked
+        """
+        self.slow_ms = slow_ms
+        self.max_queries = max_queries
+        self._stats = {}  # normalized query -> stats dict
+        self._normalized = {}  # raw SQL -> normalized query
+        self._lock = threading.Lock()
+
+    def connect(self, database: str, **kwargs) -> sqlite3.Connection:
+        """
+        Open a profiled connection; takes the same arguments as sqlite3.connect().
+        """
+        conn = sqlite3.connect(database, factory=ProfiledConnection, **kwargs)
+        conn.profiler = self
+        return conn
+
+    def stats(self, limit: int = None, order_by: str = 'total_ms') -> List[Dict]:
+        """
+        Statistics per normalized query, slowest first.
+
+        Args:
+            limit: Maximum entries to return
+            order_by: Field to sort on, descending (one of SORT_FIELDS)
+
+        Returns:
+            List of dicts with query, calls, rows, rows_changed, total_ms,
+            avg_ms, max_ms, slow_calls and plan (None unless slow)
+
+        Raises:
+            ValueError: If order_by is not a sortable field
+        """
+        if order_by not in SORT_FIELDS:
+            raise ValueError(f"order_by must be one of: {', '.join(SORT_FIELDS)}")
+
+        with self._lock:
+            entries = [dict(entry) for entry in self._stats.values()]
+
+        for entry in entries:
+            entry['avg_ms'] = entry['total_ms'] / entry['calls'] if entry['calls'] else 0.0
+            for field in ('total_ms', 'avg_ms', 'max_ms'):
+                entry[field] = round(entry[field], 3)
+            entry['plan'] = list(entry['plan']) if entry['plan'] is not None else None
+
+        entries.sort(key=lambda entry: entry[order_by], reverse=True)
+        return entries[:limit] if limit else entries
+
+    def reset(self) -> None:
+        """Forget all statistics."""
+        with self._lock:
+            self._stats.clear()
+
+    def _normalize(self, sql: str) -> str:
+        """normalize_query() with a cache of recent statements."""
+        query = self._normalized.get(sql)
+        if query is None:
+            query = normalize_query(sql)
+            if len(self._normalized) >= _NORMALIZED_CACHE_SIZE:
+                self._normalized.clear()
+            self._normalized[sql] = query
+        return query
+
+    def _record(self, query: str, elapsed: float, total: float, rows: int = 0,
+                changed: int = 0, call: bool = False) -> bool:
+        """
+        Add one step of a statement's execution to its query's statistics.
+
+        Args:
+            query: Normalized query
+            elapsed: Seconds spent in this step
+            total: Seconds spent on this execution so far
+            rows: Rows returned in this step
+            changed: Rows inserted, updated or deleted
+            call: Whether this step started the execution
+
+        Returns:
+            True if the query is slow and has no plan captured yet
+        """
+        total_ms = total * 1000
+        with self._lock:
+            entry = self._stats.get(query)
+            if entry is None:
+                if len(self._stats) >= self.max_queries:
+                    query = OTHER_QUERIES
+                    entry = self._stats.get(query)
+                if entry is None:
+                    entry = self._stats[query] = {
+                        'query': query, 'calls': 0, 'rows': 0, 'rows_changed': 0,
+                        'total_ms': 0.0, 'max_ms': 0.0, 'slow_calls': 0, 'plan': None,
+                    }
+
+            entry['calls'] += call
+            entry['rows'] += rows
+            entry['rows_changed'] += changed
+            entry['total_ms'] += elapsed * 1000
+            if total_ms > entry['max_ms']:
+                entry['max_ms'] = total_ms
+
+            crossed = total_ms > self.slow_ms and total_ms - elapsed * 1000 <= self.slow_ms
+            if crossed:
+                entry['slow_calls'] += 1
+            return crossed and entry['plan'] is None and query != OTHER_QUERIES
+
+    def _capture_plan(self, conn: sqlite3.Connection, query: str, sql: str, params, total: float) -> None:
+        """Store the plan of a slow statement and log it."""
+        if query.split(' ', 1)[0].upper() not in PLANNED_STATEMENTS:
+            logger.warning(f"Slow statement ({total * 1000:.1f} ms): {query}")
+            return
+
+        try:
+            rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            plan = [row[3] for row in rows]
+        except (sqlite3.Error, ValueError) as e:
+            plan = [f"unavailable: {e}"]
+
+        with self._lock:
+            entry = self._stats.get(query)
+            if entry is not None and entry['plan'] is None:
+                entry['plan'] = plan
+        logger.warning(f"Slow query ({total * 1000:.1f} ms): {query} | plan: {'; '.join(plan)}")
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's time and rows to its connection's profiler."""
+
+    _query = None
+    _sql = None
+    _params = ()
+    _total = 0.0
+
+    def execute(self, sql, parameters=()):
+        start = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._started(sql, parameters, perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        start = perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._started(sql, seq_of_parameters[0] if seq_of_parameters else (), perf_counter() - start)
+
+    def executescript(self, sql_script):
+        start = perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._started(sql_script, None, perf_counter() - start)
+
+    def fetchone(self):
+        start = perf_counter()
+        row = super().fetchone()
+        self._fetched(row is not None, perf_counter() - start)
+        return row
+
+    def fetchmany(self, size=None):
+        start = perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), perf_counter() - start)
+        return rows
+
+    def fetchall(self):
+        start = perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), perf_counter() - start)
+        return rows
+
+    def __next__(self):
+        start = perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(0, perf_counter() - start)
+            raise
+        self._fetched(1, perf_counter() - start)
+        return row
+
+    def _started(self, sql: str, params, elapsed: float) -> None:
+        """Record the execute step of a new statement."""
+        profiler = self.connection.profiler
+        self._query = profiler._normalize(sql)
+        self._sql = sql
+        self._params = params
+        self._total = elapsed
+        if profiler._record(self._query, elapsed, elapsed, changed=max(self.rowcount, 0), call=True):
+            self._slow(profiler)
+
+    def _fetched(self, rows: int, elapsed: float) -> None:
+        """Record a fetch step of the current statement."""
+        if self._query is None:
+            return
+        profiler = self.connection.profiler
+        self._total += elapsed
+        if profiler._record(self._query, elapsed, self._total, rows=rows):
+            self._slow(profiler)
+
+    def _slow(self, profiler: QueryProfiler) -> None:
+        """Capture the plan of the current statement (scripts have none)."""
+        if self._params is None:
+            return
+        profiler._capture_plan(self.connection, self._query, self._sql, self._params, self._total)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose statements run on ProfiledCursors."""
+
+    profiler: Optional[QueryProfiler] = None
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
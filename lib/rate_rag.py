@@ -18,6 +18,7 @@ Usage:
 import os
 import sys
 import logging
+import importlib.util
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -31,10 +32,10 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from lib.database import WastewiseDB
 
-# Try to import Gemini for semantic analysis
+# Check for Gemini without importing it; the SDK is only loaded when a
+# model is first needed (see RateDatabaseRAG.model)
 try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
+    GEMINI_AVAILABLE = importlib.util.find_spec('google.generativeai') is not None
 except ImportError:
     GEMINI_AVAILABLE = False
 
@@ -47,21 +48,35 @@ class RateDatabaseRAG:
     via Gemini for intelligent pricing analysis.
     """
 
-    def __init__(self, db_path: str = None, api_key: str = None):
+    def __init__(
+        self,
+        db_path: str = None,
+        api_key: str = None,
+        db: WastewiseDB = None,
+        precomputed: bool = False
+    ):
         """Initialize rate database RAG.
 
         Args:
             db_path: Path to SQLite database
             api_key: Google AI API key (optional, for semantic features)
+            db: Existing database to use instead of opening db_path
+            precomputed: Serve benchmark statistics and trends from the
+                analytics_cache rollups (see lib/analytics.py)
         """
-        self.db = WastewiseDB(db_path)
+        self.db = db if db is not None else WastewiseDB(db_path)
+        self.precomputed = precomputed
         self.api_key = api_key or os.environ.get('GOOGLE_API_KEY')
+        self._model = None
 
-        if GEMINI_AVAILABLE and self.api_key:
+    @property
+    def model(self):
+        """Gemini model, created on first use (None if Gemini is unavailable)."""
+        if self._model is None and GEMINI_AVAILABLE and self.api_key:
+            import google.generativeai as genai
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        else:
-            self.model = None
+            self._model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        return self._model
 
     def get_rate_benchmark(
         self,
@@ -89,7 +104,7 @@ class RateDatabaseRAG:
             - interpretation: Human-readable analysis
         """
         # Get basic statistics from database
-        stats = self.db.get_rate_benchmarks(vendor, service_type, rate_type, region)
+        stats = self.db.get_rate_benchmarks(vendor, service_type, rate_type, region, precomputed=self.precomputed)
 
         if not stats['sample_count']:
             return {
@@ -138,7 +153,7 @@ class RateDatabaseRAG:
             - percent_change: Total % change over period
             - analysis: AI-generated trend analysis
         """
-        trends = self.db.get_rate_trends(vendor, service_type, months)
+        trends = self.db.get_rate_trends(vendor, service_type, months, precomputed=self.precomputed)
 
         if not trends:
             return {
@@ -205,7 +220,7 @@ class RateDatabaseRAG:
         Returns:
             Dict containing:
             - position: "below_average", "average", "above_average", "significantly_above"
-            - percentile: Estimated percentile ranking
+            - percentile: Percentile rank among the benchmark rates (0-100)
             - savings_potential: Estimated potential savings
             - recommendation: Action recommendation
         """
@@ -214,7 +229,8 @@ class RateDatabaseRAG:
 
         if not benchmark.get('avg_rate'):
             # Fall back to broader comparison
-            benchmark = self.get_rate_benchmark(None, service_type, rate_type, region)
+            vendor = None
+            benchmark = self.get_rate_benchmark(vendor, service_type, rate_type, region)
 
         if not benchmark.get('avg_rate'):
             return {
@@ -230,19 +246,17 @@ class RateDatabaseRAG:
         # Calculate position
         if rate_value <= min_rate:
             position = 'excellent'
-            percentile = 10
         elif rate_value < avg * 0.9:
             position = 'below_average'
-            percentile = 25
         elif rate_value <= avg * 1.1:
             position = 'average'
-            percentile = 50
         elif rate_value < max_rate:
             position = 'above_average'
-            percentile = 75
         else:
             position = 'significantly_above'
-            percentile = 95
+
+        # Exact rank among the same rates the benchmark was computed from
+        percentile = self.db.get_rate_percentile_rank(rate_value, vendor, service_type, rate_type, region)
 
         # Calculate savings potential
         savings_potential = max(0, rate_value - avg)
@@ -252,7 +266,7 @@ class RateDatabaseRAG:
             'rate_value': rate_value,
             'benchmark': benchmark,
             'position': position,
-            'percentile': percentile,
+            'percentile': round(percentile, 1) if percentile is not None else None,
             'savings_potential': round(savings_potential, 2),
             'savings_potential_pct': round(savings_pct, 1)
         }
@@ -327,23 +341,19 @@ If the data is insufficient, say so clearly."""
         Returns:
             List of created rate IDs
         """
-        property_id = self.db.get_property_id(property_name)
-
-        rate_ids = []
-        for rate in rates:
-            rate_id = self.db.add_rate_history(
-                vendor=vendor,
-                service_type=rate['service_type'],
-                rate_type=rate['rate_type'],
-                rate_value=rate['rate_value'],
-                effective_date=invoice_date,
-                property_id=property_id,
-                region=region,
-                source_document=source_document
-            )
-            rate_ids.append(rate_id)
-
-        return rate_ids
+        return self.db.add_rates_bulk([
+            {
+                'vendor': vendor,
+                'service_type': rate['service_type'],
+                'rate_type': rate['rate_type'],
+                'rate_value': rate['rate_value'],
+                'effective_date': invoice_date,
+                'property_name': property_name,
+                'region': region,
+                'source_document': source_document
+            }
+            for rate in rates
+        ])
 
     def _build_rate_context(self) -> str:
         """Build context string from rate database for semantic queries."""
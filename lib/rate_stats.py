@@ -0,0 +1,197 @@
+"""
+Percentile statistics for rate benchmarks.
+
+SQLite has no percentile aggregate, so quartiles and percentile ranks need
+the sorted values of a benchmark segment (a vendor/service/rate type/region
+filter). RatePercentiles keeps those sorted values in memory per segment:
+a segment is loaded once with an indexed query, and afterwards only rows
+added since the last request are read (by rowid) and inserted in place.
+Quartiles are then O(1) and percentile ranks O(log n) with bisect, instead
+of a scan of every matching row per request.
+
+rate_history is append-only; if its highest ID ever goes down (rows
+deleted, database replaced) all segments are reloaded. Call clear() after
+a rollback of rate inserts.
+
+Usage:
+    from lib.rate_stats import RatePercentiles
+
+    stats = RatePercentiles(db._connect)
+    stats.quartiles(vendor="WM", service_type="compactor")  # {'p25': ..., 'p50': ..., 'p75': ...}
+    stats.rank(125.00, vendor="WM", rate_type="haul_fee")   # 0-100
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Columns a benchmark segment can be filtered on, in key order
+SEGMENT_FIELDS = ('vendor', 'service_type', 'rate_type', 'region')
+
+# Segments kept in memory; the least recently used is dropped beyond this
+MAX_SEGMENTS = 256
+
+# New rows matching a segment above which it is re-sorted instead of insort
+INSORT_MAX_ROWS = 32
+
+SegmentKey = Tuple[Optional[str], ...]
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """
+    Percentile of sorted values with linear interpolation between ranks.
+
+    Matches statistics.quantiles(method='inclusive') and numpy's default.
+
+    Args:
+        values: Values in ascending order
+        q: Percentile, 0-100
+
+    Returns:
+        Interpolated value, or None if values is empty
+    """
+    if not values:
+        return None
+
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    if lower + 1 >= len(values):
+        return values[-1]
+    return values[lower] + (values[lower + 1] - values[lower]) * (position - lower)
+
+
+def percentile_rank(values: Sequence[float], value: float) -> Optional[float]:
+    """
+    Percentage of sorted values below value, counting ties as half.
+
+    Args:
+        values: Values in ascending order
+        value: Value to rank
+
+    Returns:
+        Rank from 0 to 100, or None if values is empty
+    """
+    if not values:
+        return None
+
+    below = bisect_left(values, value)
+    ties = bisect_right(values, value, lo=below) - below
+    return (below + ties / 2) / len(values) * 100
+
+
+def segment_key(vendor: str = None, service_type: str = None, rate_type: str = None, region: str = None) -> SegmentKey:
+    """Segment key for benchmark filters; empty filters match everything."""
+    return tuple(value or None for value in (vendor, service_type, rate_type, region))
+
+
+class RatePercentiles:
+    """
+    Sorted rate values per benchmark segment, kept in sync incrementally.
+
+    Thread-safe; segments are shared by all threads of one database.
+    """
+
+    def __init__(self, connect: Callable, max_segments: int = MAX_SEGMENTS):
+        """
+        Args:
+            connect: Context manager factory yielding a sqlite3 connection
+                (e.g. WastewiseDB._connect)
+            max_segments: Segments kept in memory
+        """
+        self._connect = connect
+        self.max_segments = max_segments
+        self._segments = OrderedDict()  # segment key -> sorted values
+        self._last_id = 0  # highest rate_history ID reflected in the segments
+        self._lock = threading.RLock()  # clear() may run from a rollback inside values()
+
+    def clear(self) -> None:
+        """Drop all segments; they are reloaded on next use."""
+        with self._lock:
+            self._segments.clear()
+            self._last_id = 0
+
+    def values(self, **filters) -> List[float]:
+        """
+        Sorted rate values of a segment.
+
+        Args:
+            **filters: vendor, service_type, rate_type, region
+
+        Returns:
+            Copy of the values in ascending order
+        """
+        with self._lock:
+            return list(self._values(segment_key(**filters)))
+
+    def quartiles(self, **filters) -> Optional[Dict[str, float]]:
+        """25th, 50th and 75th percentiles of a segment, or None if it is empty."""
+        with self._lock:
+            values = self._values(segment_key(**filters))
+            if not values:
+                return None
+            return {f'p{q}': percentile(values, q) for q in (25, 50, 75)}
+
+    def rank(self, value: float, **filters) -> Optional[float]:
+        """Percentile rank (0-100) of value within a segment, or None if it is empty."""
+        with self._lock:
+            return percentile_rank(self._values(segment_key(**filters)), value)
+
+    def _values(self, key: SegmentKey) -> List[float]:
+        """A segment's sorted values, brought up to date (caller holds the lock)."""
+        with self._connect() as conn:
+            self._sync(conn)
+
+            values = self._segments.get(key)
+            if values is None:
+                values = self._load(conn, key)
+                self._segments[key] = values
+                while len(self._segments) > self.max_segments:
+                    self._segments.popitem(last=False)
+            else:
+                self._segments.move_to_end(key)
+
+            return values
+
+    def _sync(self, conn) -> None:
+        """Insert rows added since the last sync into the loaded segments."""
+        max_id = conn.execute("SELECT MAX(id) FROM rate_history").fetchone()[0] or 0
+        if max_id < self._last_id:
+            self._segments.clear()
+            self._last_id = 0
+        if max_id == self._last_id:
+            return
+
+        if self._segments:
+            rows = conn.execute(f"""
+                SELECT {', '.join(SEGMENT_FIELDS)}, rate_value
+                FROM rate_history
+                WHERE id > ? AND id <= ?
+            """, (self._last_id, max_id)).fetchall()
+
+            for key, values in self._segments.items():
+                new = [row[-1] for row in rows if _matches(key, row)]
+                if len(new) > INSORT_MAX_ROWS:
+                    values.extend(new)
+                    values.sort()
+                else:
+                    for value in new:
+                        insort(values, value)
+
+        self._last_id = max_id
+
+    def _load(self, conn, key: SegmentKey) -> List[float]:
+        """Read a segment's values up to the last synced ID."""
+        query = "SELECT rate_value FROM rate_history WHERE id <= ?"
+        params = [self._last_id]
+        for field, value in zip(SEGMENT_FIELDS, key):
+            if value is not None:
+                query += f" AND {field} = ?"
+                params.append(value)
+
+        return sorted(row[0] for row in conn.execute(query, params))
+
+
+def _matches(key: SegmentKey, row: Sequence) -> bool:
+    """Whether a (vendor, service_type, rate_type, region, ...) row belongs to a segment."""
+    return all(value is None or value == row[i] for i, value in enumerate(key))
@@ -0,0 +1,219 @@
+"""
+In-memory read snapshot of a SQLite database file.
+
+Read-heavy callers (the dashboard's KPI API) can serve queries from a
+copy of the database held in memory instead of the file: reads never
+touch the disk or wait on a writer's lock. The copy is made with the
+SQLite backup API into a fresh shared-cache in-memory database, then
+swapped in atomically; readers still inside a query on the old copy
+finish on it, and their next query uses the new one.
+
+A background thread checks PRAGMA data_version every `interval` seconds
+and rebuilds the copy when another connection has committed to the file,
+whichever process it belongs to. Call request_refresh() after a local
+write to have it checked right away, or refresh() to rebuild before
+returning. Reads may therefore trail writes by up to one refresh.
+
+Usage:
+    from lib.snapshot import DatabaseSnapshot
+
+    snapshot = DatabaseSnapshot("data/wastewise.db", interval=1.0)
+    rows = snapshot.connection().execute("SELECT * FROM properties").fetchall()
+    snapshot.close()
+"""
+
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from pathlib import Path
+from typing import Callable
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds between PRAGMA data_version checks
+DEFAULT_INTERVAL = 1.0
+
+# Distinguishes the in-memory databases of every snapshot in this process
+_generations = itertools.count(1)
+
+
+class DatabaseSnapshot:
+    """
+    Atomically refreshed in-memory copy of a database file.
+
+    Thread-safe; each thread reads through its own read-only connection.
+    Started on first use and again after close() or fork().
+    """
+
+    def __init__(self, db_path: str, interval: float = DEFAULT_INTERVAL, connect: Callable = sqlite3.connect):
+        """
+        Args:
+            db_path: Database file to copy
+            interval: Seconds between checks for changes to the file
+            connect: Opens the readers' connections (e.g. QueryProfiler.connect)
+        """
+        self.db_path = Path(db_path)
+        self.interval = interval
+        self._open_reader = connect
+        # Lock order: _refresh_lock, then _lock
+        self._refresh_lock = threading.Lock()  # one rebuild (or start/close) at a time
+        self._lock = threading.Lock()  # guards the live copy and reader registry
+        self._local = threading.local()
+        self._readers = {}  # thread ident -> (thread weakref, connection)
+        self._current = None  # (uri, keeper connection) of the live copy
+        self._source = None  # file connection the copies are made from
+        self._version = None  # data_version the live copy was made at
+        self._wake = None
+        self._stopped = None
+        self._pid = None
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's read-only connection to the current copy."""
+        while True:
+            with self._lock:
+                if self._current is not None and self._pid == os.getpid():
+                    return self._reader()
+            self._start()
+
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's connection, reopened on a new copy (caller holds _lock).
+
+        Opening under the lock guarantees the copy is not released first.
+        """
+        uri = self._current[0]
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.uri == uri:
+            return conn
+
+        if conn is not None:
+            conn.close()
+        conn = self._open_reader(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        self._local.conn = conn
+        self._local.uri = uri
+
+        current = threading.current_thread()
+        for ident, (thread_ref, other) in list(self._readers.items()):
+            thread = thread_ref()
+            if ident == current.ident or thread is None or not thread.is_alive():
+                if other is not conn:
+                    other.close()
+                del self._readers[ident]
+        self._readers[current.ident] = (weakref.ref(current), conn)
+        return conn
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Rebuild the copy now if the file changed since it was made.
+
+        Args:
+            force: Rebuild even if the file looks unchanged
+
+        Returns:
+            True if a new copy was swapped in
+        """
+        with self._refresh_lock:
+            return self._rebuild(force)
+
+    def request_refresh(self) -> None:
+        """Have the background thread check for changes without waiting for its timer."""
+        wake = self._wake
+        if wake is not None:
+            wake.set()
+
+    def close(self) -> None:
+        """Stop refreshing and release the copy and all connections."""
+        with self._refresh_lock, self._lock:
+            self._stop()
+
+    def _start(self) -> None:
+        """Make the first copy and start the background refresher."""
+        with self._refresh_lock:
+            with self._lock:
+                if self._current is not None and self._pid == os.getpid():
+                    return  # Started by another thread meanwhile
+                if self._pid != os.getpid():
+                    # Connections and threads inherited through fork() belong to the parent
+                    self._readers = {}
+                    self._current = self._source = self._wake = self._stopped = None
+                self._stop()
+                self._pid = os.getpid()
+                self._source = sqlite3.connect(str(self.db_path), check_same_thread=False)
+
+            self._rebuild(force=True)
+
+            with self._lock:
+                self._wake = threading.Event()
+                self._stopped = threading.Event()
+                threading.Thread(
+                    target=_refresh_loop, args=(weakref.ref(self), self._wake, self._stopped),
+                    name='wastewise-snapshot', daemon=True
+                ).start()
+
+    def _rebuild(self, force: bool) -> bool:
+        """Copy the file if it changed (caller holds _refresh_lock)."""
+        if self._source is None:
+            return False
+
+        version = self._source.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version and not force:
+            return False
+
+        uri = f"file:wastewise-snapshot-{os.getpid()}-{next(_generations)}?mode=memory&cache=shared"
+        keeper = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._source.backup(keeper)
+
+        with self._lock:
+            old, self._current = self._current, (uri, keeper)
+            self._version = version
+            # Readers mid-query on the old copy keep it alive until they switch
+            if old:
+                old[1].close()
+        logger.debug(f"Snapshot of {self.db_path} refreshed (data_version {version})")
+        return True
+
+    def _stop(self) -> None:
+        """Stop the refresher and close every connection (caller holds both locks)."""
+        if self._stopped is not None:
+            self._stopped.set()
+            self._wake.set()
+        self._wake = self._stopped = None
+
+        for _, conn in self._readers.values():
+            conn.close()
+        self._readers.clear()
+        self._local = threading.local()
+        if self._current:
+            self._current[1].close()
+        if self._source is not None:
+            self._source.close()
+        self._current = self._source = None
+        self._version = None
+
+
+def _refresh_loop(snapshot_ref: weakref.ref, wake: threading.Event, stopped: threading.Event) -> None:
+    """Background refresher; exits once the snapshot is closed or garbage collected."""
+    while not stopped.is_set():
+        snapshot = snapshot_ref()
+        if snapshot is None:
+            return
+        interval = snapshot.interval
+        del snapshot  # Don't keep the snapshot alive while waiting
+
+        wake.wait(interval)
+        wake.clear()
+        snapshot = snapshot_ref()
+        if snapshot is None or stopped.is_set():
+            return
+        try:
+            with snapshot._refresh_lock:
+                if not stopped.is_set():
+                    snapshot._rebuild(force=False)
+        except sqlite3.Error as e:
+            logger.warning(f"Snapshot refresh of {snapshot.db_path} failed: {e}")
+        del snapshot
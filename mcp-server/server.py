@@ -25,12 +25,16 @@ MCP Config (~/.claude/mcp_settings.json):
     }
 """
 
+import asyncio
+import functools
 import sys
 import os
 import json
 import sqlite3
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 import subprocess
@@ -43,6 +47,7 @@ logger = logging.getLogger(__name__)
 MAX_QUERY_LENGTH = 1000
 MAX_RESULTS_LIMIT = 50
 VALID_TABLES = frozenset(['properties', 'rate_history', 'kpi_history', 'invoices', 'contracts', 'hauler_profiles'])
+TOOL_WORKERS = 4  # Threads running blocking tool handlers
 
 # Add parent directories to path
 SCRIPT_DIR = Path(__file__).parent
@@ -71,17 +76,35 @@ except ImportError:
 DB_PATH = os.environ.get('DB_PATH', str(PROJECT_ROOT / "data" / "wastewise.db"))
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY', '')
 
+# DB_PROFILE=1 times every statement and logs slow ones with their query plan
+DB_PROFILE = os.environ.get('DB_PROFILE', '0') == '1'
+
 
 class WasteMasterBrainServer:
     """MCP Server for WASTE Master Brain."""
 
     def __init__(self):
         self.db_path = DB_PATH
+        self._local = threading.local()
+        self.profiler = None
+        if DB_PROFILE:
+            from lib.query_profiler import QueryProfiler
+            self.profiler = QueryProfiler()
 
     def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Get this thread's database connection, opening it on first use.
+
+        Tool handlers run on a small pool of long-lived threads (see main()),
+        so each thread keeps one connection. `with conn:` still commits or
+        rolls back per handler.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.path != self.db_path:
+            connect = self.profiler.connect if self.profiler else sqlite3.connect
+            conn = connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.path = self.db_path
         return conn
 
     # ==================== Tool Handlers ====================
@@ -575,6 +598,21 @@ def main():
     server = WasteMasterBrainServer()
     mcp_server = Server("waste-master-brain")
 
+    # Handlers block on SQLite and subprocesses; run them on a bounded pool
+    # so concurrent tool calls overlap instead of stalling the event loop
+    executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix='wastewise-mcp')
+
+    async def run_blocking(func, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, **kwargs))
+
+    handlers = {
+        'query_rates': server.query_rates,
+        'search_emails': server.search_emails,
+        'get_property_kpis': server.get_property_kpis,
+        'save_extraction': server.save_extraction,
+        'generate_kpi_chart': server.generate_kpi_chart,
+    }
+
     @mcp_server.list_tools()
     async def list_tools() -> list[Tool]:
         return [Tool(**t) for t in TOOLS]
@@ -582,16 +620,9 @@ def main():
     @mcp_server.call_tool()
     async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         try:
-            if name == 'query_rates':
-                result = server.query_rates(**arguments)
-            elif name == 'search_emails':
-                result = server.search_emails(**arguments)
-            elif name == 'get_property_kpis':
-                result = server.get_property_kpis(**arguments)
-            elif name == 'save_extraction':
-                result = server.save_extraction(**arguments)
-            elif name == 'generate_kpi_chart':
-                result = server.generate_kpi_chart(**arguments)
+            handler = handlers.get(name)
+            if handler:
+                result = await run_blocking(handler, **arguments)
             else:
                 result = {'error': f'Unknown tool: {name}'}
 
@@ -601,25 +632,36 @@ def main():
 
     @mcp_server.list_resources()
     async def list_resources() -> list[Resource]:
-        return [Resource(
+        resources = [Resource(
             uri='wastewise://stats',
             name='Database Statistics',
             description='Current counts of properties, rates, KPIs, and other data',
             mimeType='application/json'
         )]
+        if server.profiler:
+            resources.append(Resource(
+                uri='wastewise://db-metrics',
+                name='Database Query Metrics',
+                description='Per-query timings and plans of slow queries (DB_PROFILE=1)',
+                mimeType='application/json'
+            ))
+        return resources
 
     @mcp_server.read_resource()
     async def read_resource(uri: str) -> str:
         if uri == 'wastewise://stats':
-            return json.dumps(server.get_stats(), indent=2)
+            return json.dumps(await run_blocking(server.get_stats), indent=2)
+        if uri == 'wastewise://db-metrics' and server.profiler:
+            return json.dumps(server.profiler.stats(limit=50), indent=2)
         raise ValueError(f'Unknown resource: {uri}')
 
     # Run server with proper async context
-    import asyncio
-
     async def run_server():
-        async with stdio_server() as (read_stream, write_stream):
-            await mcp_server.run(read_stream, write_stream, mcp_server.create_initialization_options())
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                await mcp_server.run(read_stream, write_stream, mcp_server.create_initialization_options())
+        finally:
+            executor.shutdown(wait=False)
 
     asyncio.run(run_server())
 
@@ -4,6 +4,25 @@ Email Thread Aggregator
 
 Reads daily email exports and groups them into conversation threads.
 Identifies projects, tracks participants, and generates thread metadata.
+
+Thread state (per-thread participants, date bounds, projects and message
+refs) is persisted in warehouse/threads/thread_state.json. Each run merges
+only daily files that are new or changed since the last run, recomputes
+the threads they touch, refreshes statuses and evicts days that fell out
+of the retention window, then rewrites threads_current.json.
+
+Emails with an Outlook conversation_id are threaded by it. The rest are
+grouped by normalized topic and split into threads by shared participants
+and date proximity (see thread_linker); a topic is relinked whenever one
+of its emails is added or removed.
+
+Changed threads and their messages are also upserted into the threads and
+email_index tables of data/wastewise.db, so consumers can look up the few
+threads they need without parsing threads_current.json.
+
+Usage:
+    python aggregate_threads.py
+    python aggregate_threads.py --full  # Rebuild thread state from scratch
 """
 
 import json
@@ -12,8 +31,26 @@ import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 from collections import defaultdict
-from typing import Dict, List, Any, Set
-import re
+from typing import Dict, Iterable, List, Any, Set, Tuple
+
+# Add project root to path for lib imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from entity_matcher import EntityTagger
+from lib.database import THREADS_SYNCED_KEY, WastewiseDB
+from thread_linker import DEFAULT_LINK_WINDOW_DAYS, link_messages, normalize_subject
+from warehouse_io import file_digest, load_daily_records
+
+THREAD_STATE_VERSION = 2
+
+# Email fields needed to build threads
+THREAD_FIELDS = (
+    'id', 'date', 'type', 'subject', 'from', 'to', 'conversation_id',
+    'conversation_topic', 'body_preview', 'has_attachments',
+)
+
+# Message fields kept in the thread state only, not in threads_current.json
+STATE_ONLY_FIELDS = ('id', 'day', 'topic', 'participants', 'projects')
 
 
 class ThreadAggregator:
@@ -23,9 +60,18 @@ class ThreadAggregator:
         self.warehouse_path = Path(warehouse_path)
         self.config_path = Path(config_path)
         self.config = self._load_config()
+        self.tagger = EntityTagger.from_config(self.config)
         self.emails = []
         self.threads = {}
         self.projects = defaultdict(list)
+        self.days = {}  # daily file name -> fingerprint, for merged days
+        self.buckets = {}  # normalized topic -> IDs of its linked threads
+        self.link_window_days = self.config.get('threads', {}).get('link_window_days', DEFAULT_LINK_WINDOW_DAYS)
+        self._unlinked = defaultdict(list)  # normalized topic -> messages waiting for _link_buckets
+        # Pending database sync: threads to upsert, thread and message IDs to delete
+        self.changed_threads = set()
+        self.removed_threads = set()
+        self.removed_messages = set()
 
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration file."""
@@ -59,11 +105,10 @@ class ThreadAggregator:
                 if file_date < cutoff_date:
                     continue
 
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.emails.extend(data.get('emails', []))
+                file_emails = load_daily_records(json_file, fields=THREAD_FIELDS)
+                self.emails.extend(file_emails)
 
-                print(f"Loaded {len(data.get('emails', []))} emails from {json_file.name}")
+                print(f"Loaded {len(file_emails)} emails from {json_file.name}")
 
             except Exception as e:
                 print(f"Warning: Could not load {json_file}: {e}")
@@ -75,11 +120,8 @@ class ThreadAggregator:
         if not topic:
             return ""
 
-        # Remove RE:, FW:, FWD: prefixes
-        normalized = re.sub(r'^(RE:|Re:|FW:|Fw:|FWD:)\s*', '', topic, flags=re.IGNORECASE)
-        normalized = normalized.strip()
-
-        return normalized
+        # Remove RE:, FW:, FWD:, ... prefixes, however many are stacked
+        return normalize_subject(topic)
 
     def _detect_project(self, email: Dict[str, Any]) -> List[str]:
         """Detect projects/properties/vendors mentioned in email."""
@@ -90,26 +132,16 @@ class ThreadAggregator:
 
         # Combine subject and preview for detection
         text = f"{email.get('subject', '')} {email.get('body_preview', '')}"
-        text_lower = text.lower()
-
-        # Check for known properties
-        for prop in self.config['projects'].get('known_properties', []):
-            if prop.lower() in text_lower:
-                detected.append(f"Property: {prop}")
-
-        # Check for known vendors
-        for vendor in self.config['projects'].get('known_vendors', []):
-            if vendor.lower() in text_lower:
-                detected.append(f"Vendor: {vendor}")
+        sender_email = email.get('from', {}).get('email', '')
 
-        # Check for known contacts
-        sender_email = email.get('from', {}).get('email', '').lower()
-        sender_name = email.get('from', {}).get('name', '').lower()
+        # Properties and vendors mentioned in the text, contacts in the text
+        # or the sender address, in config order
+        matched = set(self.tagger.find(text))
+        matched.update(self.tagger.find(sender_email, kinds=('contact',)))
 
-        for contact_name, identifier in self.config['projects'].get('known_contacts', {}).items():
-            identifier_lower = identifier.lower()
-            if identifier_lower in sender_email or identifier_lower in text_lower:
-                detected.append(f"Contact: {contact_name}")
+        prefixes = {'property': 'Property', 'vendor': 'Vendor', 'contact': 'Contact'}
+        for entity in sorted(matched):
+            detected.append(f"{prefixes[entity.kind]}: {entity.label}")
 
         return detected
 
@@ -127,92 +159,344 @@ class ThreadAggregator:
         else:
             return "stale"
 
-    def aggregate_threads(self) -> None:
-        """Group emails into conversation threads."""
-        # Group by conversation_id and topic
-        conversation_groups = defaultdict(list)
-
-        for email in self.emails:
-            conv_id = email.get('conversation_id', '')
-            conv_topic = self._normalize_topic(email.get('conversation_topic', ''))
-
-            # Use conversation_id as primary key, fall back to topic
-            key = conv_id if conv_id else conv_topic
-
-            if key:
-                conversation_groups[key].append(email)
-            else:
-                # No grouping info, create individual thread
-                individual_key = f"single_{email.get('id', '')}"
-                conversation_groups[individual_key].append(email)
-
-        # Build thread objects
-        for thread_id, emails_in_thread in conversation_groups.items():
-            # Sort by date
-            emails_in_thread.sort(key=lambda x: x.get('date', ''))
-
-            # Extract participants
-            participants = set()
-            for email in emails_in_thread:
-                sender = email.get('from', {}).get('email', '')
-                if sender:
-                    participants.add(sender)
-
-                for recipient in email.get('to', []):
-                    if recipient:
-                        participants.add(recipient)
-
-            # Get dates
-            dates = [email.get('date', '') for email in emails_in_thread if email.get('date')]
-            first_date = min(dates)[:10] if dates else ''
-            last_date = max(dates)[:10] if dates else ''
-
-            # Detect projects
-            projects_detected = set()
-            for email in emails_in_thread:
-                projects_detected.update(self._detect_project(email))
-
-            # Build thread object
-            thread = {
-                'thread_id': thread_id,
-                'topic': self._normalize_topic(emails_in_thread[0].get('conversation_topic', '')),
-                'participants': sorted(list(participants)),
-                'message_count': len(emails_in_thread),
-                'first_message_date': first_date,
-                'last_message_date': last_date,
-                'status': '',  # Will be set below
-                'projects_detected': sorted(list(projects_detected)),
-                'messages': [
-                    {
-                        'date': email.get('date', ''),
-                        'from': email.get('from', {}).get('email', ''),
-                        'from_name': email.get('from', {}).get('name', ''),
-                        'subject': email.get('subject', ''),
-                        'preview': email.get('body_preview', '')[:200],
-                        'type': email.get('type', ''),
-                        'has_attachments': email.get('has_attachments', False)
-                    }
-                    for email in emails_in_thread
-                ]
-            }
+    def _bucket_key(self, message: Dict[str, Any]) -> str:
+        """Topic bucket of a message without conversation_id ('' if it has no topic)."""
+        return self._normalize_topic(message['topic'] or message['subject']).casefold()
+
+    def _merge_email(self, email: Dict[str, Any], day: str = '') -> Tuple[str, str]:
+        """
+        Add an email to its thread as a message ref.
+
+        Emails with a conversation_id join that thread directly. Others are
+        queued under their topic bucket until _link_buckets() runs; emails
+        with no topic at all get a thread of their own.
+
+        Returns:
+            (thread_id, '') or ('', bucket)
+        """
+        sender = email.get('from', {})
+        participants = [sender.get('email', '')] + list(email.get('to', []))
+
+        message = {
+            'date': email.get('date', ''),
+            'from': sender.get('email', ''),
+            'from_name': sender.get('name', ''),
+            'subject': email.get('subject', ''),
+            'preview': email.get('body_preview', '')[:200],
+            'type': email.get('type', ''),
+            'has_attachments': email.get('has_attachments', False),
+            'id': email.get('id', ''),
+            'day': day,
+            'topic': email.get('conversation_topic', ''),
+            'participants': [p for p in participants if p],
+            'projects': self._detect_project(email)
+        }
 
-            # Set status
-            thread['status'] = self._get_thread_status(thread)
+        conv_id = email.get('conversation_id', '')
+        bucket = '' if conv_id else self._bucket_key(message)
+        if bucket:
+            self._unlinked[bucket].append(message)
+            return '', bucket
+
+        thread_id = conv_id or f"single_{email.get('id', '')}"
+        thread = self.threads.setdefault(thread_id, {'thread_id': thread_id, 'messages': []})
+        thread['messages'].append(message)
+        return thread_id, ''
+
+    def _link_buckets(self, buckets: Iterable[str]) -> Set[str]:
+        """
+        Rebuild the threads of topic buckets from their current and queued messages.
+
+        Returns:
+            IDs of threads that were replaced or created (to be refreshed)
+        """
+        touched = set()
+
+        for bucket in buckets:
+            messages = self._unlinked.pop(bucket, [])
+            for thread_id in self.buckets.pop(bucket, []):
+                thread = self.threads.get(thread_id)
+                if thread is not None:
+                    messages.extend(thread['messages'])
+                    thread['messages'] = []
+                    touched.add(thread_id)
+
+            if not messages:
+                continue
+
+            groups = link_messages(messages, self.link_window_days)
+            first = messages[groups[0][0]]
+            topic = self._normalize_topic(first['topic'] or first['subject'])
+
+            thread_ids = []
+            for number, group in enumerate(groups, 1):
+                thread_id = topic if number == 1 else f"{topic} ({number})"
+                self.threads[thread_id] = {'thread_id': thread_id, 'messages': [messages[i] for i in group]}
+                thread_ids.append(thread_id)
+            touched.update(thread_ids)
+            self.buckets[bucket] = thread_ids
+
+        return touched
+
+    def _refresh_thread(self, thread_id: str) -> None:
+        """Recompute a thread's derived fields from its messages, or drop it if empty."""
+        thread = self.threads[thread_id]
+        messages = thread['messages']
+        if not messages:
+            del self.threads[thread_id]
+            self.changed_threads.discard(thread_id)
+            self.removed_threads.add(thread_id)
+            return
 
-            self.threads[thread_id] = thread
+        self.changed_threads.add(thread_id)
+        self.removed_threads.discard(thread_id)
+
+        # Sort by date
+        messages.sort(key=lambda m: m['date'])
+
+        participants = set()
+        projects_detected = set()
+        for message in messages:
+            participants.update(message['participants'])
+            projects_detected.update(message['projects'])
+
+        dates = [m['date'] for m in messages if m['date']]
+
+        self.threads[thread_id] = {
+            'thread_id': thread_id,
+            'topic': self._normalize_topic(messages[0]['topic'] or messages[0]['subject']),
+            'participants': sorted(participants),
+            'message_count': len(messages),
+            'first_message_date': min(dates)[:10] if dates else '',
+            'last_message_date': max(dates)[:10] if dates else '',
+            'status': thread.get('status', ''),  # Refreshed in _refresh_statuses
+            'projects_detected': sorted(projects_detected),
+            'messages': messages
+        }
 
-            # Map to projects
-            for project in projects_detected:
+    def _refresh_statuses(self) -> None:
+        """Recompute every thread's status and rebuild the project index."""
+        self.projects = defaultdict(list)
+        for thread_id, thread in self.threads.items():
+            status = self._get_thread_status(thread)
+            if status != thread['status']:
+                thread['status'] = status
+                self.changed_threads.add(thread_id)
+            for project in thread['projects_detected']:
                 self.projects[project].append(thread_id)
 
+    def aggregate_threads(self) -> None:
+        """Group the loaded emails into conversation threads."""
+        merged = [self._merge_email(email) for email in self.emails]
+        touched = {thread_id for thread_id, _ in merged if thread_id}
+        touched.update(self._link_buckets({bucket for _, bucket in merged if bucket}))
+        for thread_id in touched:
+            self._refresh_thread(thread_id)
+        self._refresh_statuses()
+
         print(f"\nThreads aggregated: {len(self.threads)}")
         print(f"Projects detected: {len(self.projects)}")
 
+    def load_state(self, state_path: Path) -> bool:
+        """Load persisted thread state; returns False if there is none usable."""
+        state_file = Path(state_path)
+        if not state_file.exists():
+            return False
+
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except json.JSONDecodeError:
+            print("Warning: Thread state corrupted, rebuilding from daily exports")
+            return False
+
+        if state.get('version') != THREAD_STATE_VERSION:
+            return False
+
+        # Threads linked with another window would not match a rebuild
+        if state.get('link_window_days') != self.link_window_days:
+            return False
+
+        self.days = state['days']
+        self.threads = state['threads']
+        self.buckets = state['buckets']
+        return True
+
+    def save_state(self, state_path: Path) -> None:
+        """Persist thread state for the next incremental run."""
+        state_file = Path(state_path)
+        state_file.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(state_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': THREAD_STATE_VERSION,
+                'updated_at': datetime.now().isoformat(),
+                'link_window_days': self.link_window_days,
+                'days': self.days,
+                'threads': self.threads,
+                'buckets': self.buckets
+            }, f, ensure_ascii=False)
+
+    def update_threads(self, days_back: int = 90) -> int:
+        """
+        Merge new or changed daily exports into the thread state.
+
+        Days whose fingerprint (size and mtime, or content digest) matches
+        the state are not read. Messages from changed, deleted or expired
+        days are removed first, using the thread IDs and topic buckets
+        recorded for each day; only threads that gained or lost messages,
+        and the buckets they belong to, are recomputed. Statuses are
+        refreshed for every thread.
+
+        Args:
+            days_back: Retention window in days
+
+        Returns:
+            Number of emails merged
+        """
+        daily_path = self.warehouse_path / 'daily'
+
+        if not daily_path.exists():
+            print(f"Error: Daily exports path not found: {daily_path}")
+            return 0
+
+        cutoff_date = datetime.now() - timedelta(days=days_back)
+
+        def in_window(name: str) -> bool:
+            try:
+                return datetime.strptime(Path(name).stem, '%Y-%m-%d') >= cutoff_date
+            except ValueError:
+                return False
+
+        # Classify daily files against the state
+        current = {f.name: f for f in sorted(daily_path.glob('*.json')) if in_window(f.name)}
+        to_merge = []
+        for name, json_file in current.items():
+            stat = json_file.stat()
+            entry = self.days.get(name)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+
+            digest = file_digest(json_file)
+            if entry and entry['digest'] == digest:
+                entry.update(size=stat.st_size, mtime=stat.st_mtime)
+                continue
+
+            to_merge.append((json_file, {'size': stat.st_size, 'mtime': stat.st_mtime, 'digest': digest}))
+
+        # Drop messages from changed, deleted and expired days
+        dropped = {name for name in self.days if name not in current}
+        dropped.update(json_file.name for json_file, _ in to_merge if json_file.name in self.days)
+        touched = set()
+        relink = set()
+
+        for name in dropped:
+            entry = self.days.pop(name)
+            relink.update(entry['buckets'])
+            bucket_threads = [tid for bucket in entry['buckets'] for tid in self.buckets.get(bucket, [])]
+            for thread_id in entry['threads'] + bucket_threads:
+                thread = self.threads.get(thread_id)
+                if thread is not None:
+                    kept = []
+                    for message in thread['messages']:
+                        if message['day'] != name:
+                            kept.append(message)
+                        elif message['id']:
+                            self.removed_messages.add(message['id'])
+                    thread['messages'] = kept
+                    touched.add(thread_id)
+
+        expired = sum(1 for name in dropped if name not in current)
+        print(f"Daily files in window: {len(current)}")
+        print(f"New or changed: {len(to_merge)}")
+        print(f"Expired or deleted: {expired}")
+
+        # Merge the new days
+        merged = 0
+        for json_file, fingerprint in to_merge:
+            try:
+                emails = load_daily_records(json_file, fields=THREAD_FIELDS)
+            except Exception as e:
+                print(f"Warning: Could not load {json_file}: {e}")
+                continue
+
+            merged_emails = [self._merge_email(email, json_file.name) for email in emails]
+            thread_ids = {thread_id for thread_id, _ in merged_emails if thread_id}
+            buckets = {bucket for _, bucket in merged_emails if bucket}
+            touched.update(thread_ids)
+            relink.update(buckets)
+            self.days[json_file.name] = {**fingerprint, 'threads': sorted(thread_ids), 'buckets': sorted(buckets)}
+            merged += len(emails)
+            print(f"Merged {len(emails)} emails from {json_file.name}")
+
+        touched.update(self._link_buckets(relink))
+        for thread_id in touched:
+            self._refresh_thread(thread_id)
+        self._refresh_statuses()
+
+        print(f"\nThreads updated: {len(touched)}")
+        print(f"Threads total: {len(self.threads)}")
+        print(f"Projects detected: {len(self.projects)}")
+        return merged
+
+    def save_to_database(self, db: WastewiseDB, full: bool = False) -> None:
+        """
+        Sync changed threads into the threads and email_index tables.
+
+        Only threads that were recomputed or changed status since the last
+        sync are written, both tables in one transaction so they never
+        disagree about which threads exist.
+
+        Args:
+            db: Database to write to
+            full: Also delete indexed threads that no longer exist (use
+                after rebuilding without saved state)
+        """
+        # A database that predates the thread index gets every thread
+        if not db.has_threads():
+            self.changed_threads.update(self.threads)
+
+        removed = set(self.removed_threads)
+        if full:
+            removed.update(set(db.get_thread_ids()) - set(self.threads))
+
+        changed = [self.threads[tid] for tid in sorted(self.changed_threads) if tid in self.threads]
+        emails = []
+        for thread in changed:
+            for message in thread['messages']:
+                projects = message['projects']
+                emails.append({
+                    'email_id': message['id'],
+                    'date_sent': message['date'],
+                    'subject': message['subject'],
+                    'sender': message['from'],
+                    'recipients': [p for p in message['participants'] if p != message['from']],
+                    'body_preview': message['preview'],
+                    'thread_id': thread['thread_id'],
+                    'vendors_mentioned': [p[len('Vendor: '):] for p in projects if p.startswith('Vendor: ')],
+                    'properties_mentioned': [p[len('Property: '):] for p in projects if p.startswith('Property: ')],
+                    'source_file': message['day'],
+                })
+
+        with db.transaction():
+            db.delete_threads(sorted(removed))
+            db.delete_email_index(sorted(self.removed_messages))
+            db.upsert_threads(changed)
+            db.upsert_email_index(emails)
+            db.set_metadata(THREADS_SYNCED_KEY, str(datetime.now().timestamp()))
+
+        print(f"Thread index: {len(changed)} threads and {len(emails)} emails written, "
+              f"{len(removed)} threads removed")
+
+        self.changed_threads.clear()
+        self.removed_threads.clear()
+        self.removed_messages.clear()
+
     def generate_statistics(self) -> Dict[str, Any]:
         """Generate statistics about threads and projects."""
         stats = {
             'total_threads': len(self.threads),
-            'total_emails': len(self.emails),
+            'total_emails': sum(t['message_count'] for t in self.threads.values()),
             'threads_by_status': defaultdict(int),
             'projects': {}
         }
@@ -231,10 +515,20 @@ class ThreadAggregator:
 
     def save_results(self, output_path: str) -> None:
         """Save aggregated threads to JSON file."""
+        threads = [
+            {
+                **thread,
+                'messages': [
+                    {k: v for k, v in message.items() if k not in STATE_ONLY_FIELDS}
+                    for message in thread['messages']
+                ]
+            }
+            for thread in self.threads.values()
+        ]
         output = {
             'generated_at': datetime.now().isoformat(),
             'statistics': self.generate_statistics(),
-            'threads': list(self.threads.values()),
+            'threads': threads,
             'projects': dict(self.projects)
         }
 
@@ -270,11 +564,19 @@ class ThreadAggregator:
 
 def main():
     """Main execution function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aggregate daily email exports into threads")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the saved thread state and rebuild from all daily exports")
+    args = parser.parse_args()
+
     # Determine paths
     script_dir = Path(__file__).parent
     warehouse_path = script_dir.parent / 'warehouse'
     config_path = script_dir.parent / 'config' / 'settings.json'
     output_path = warehouse_path / 'threads' / 'threads_current.json'
+    state_path = warehouse_path / 'threads' / 'thread_state.json'
 
     print("Email Thread Aggregator")
     print("="*60)
@@ -291,21 +593,29 @@ def main():
     if aggregator.config.get('outlook', {}).get('days_to_retain'):
         days_to_retain = aggregator.config['outlook']['days_to_retain']
 
-    # Load daily exports
-    print(f"Loading emails from last {days_to_retain} days...")
-    aggregator.load_daily_exports(days_back=days_to_retain)
+    full = args.full or not aggregator.load_state(state_path)
+    if not full:
+        print(f"Loaded thread state: {len(aggregator.threads)} threads, {len(aggregator.days)} days")
 
-    if not aggregator.emails:
+    # Merge new daily exports into threads
+    print(f"Updating threads from the last {days_to_retain} days...")
+    aggregator.update_threads(days_back=days_to_retain)
+
+    if not aggregator.threads:
         print("\nNo emails found. Run Export-DailyEmails.ps1 first to export emails.")
         sys.exit(1)
 
-    # Aggregate into threads
-    print("\nAggregating emails into threads...")
-    aggregator.aggregate_threads()
-
     # Save results
+    aggregator.save_state(state_path)
     aggregator.save_results(output_path)
 
+    # The JSON output is complete; a database problem should not fail the run
+    try:
+        with WastewiseDB() as db:
+            aggregator.save_to_database(db, full=full)
+    except Exception as e:
+        print(f"Warning: Could not update thread index in database: {e}")
+
     # Print summary
     aggregator.print_summary()
 
@@ -9,21 +9,42 @@ Usage:
     python convert_to_gemini_format.py
     python convert_to_gemini_format.py --start-date 2025-01-01 --end-date 2025-03-31
     python convert_to_gemini_format.py --batch-by topic --max-size 50
+    python convert_to_gemini_format.py --full  # Ignore the manifest and reconvert everything
+    python convert_to_gemini_format.py --workers 8  # Parse daily files in 8 processes
 """
 
 import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
 import re
 
+from entity_matcher import KeywordClassifier
+from warehouse_io import email_keys, file_digest, iter_daily_emails
+
 # Configuration
 DAILY_JSON_DIR = Path(__file__).parent.parent / "warehouse" / "daily"
 GEMINI_OUTPUT_DIR = Path(__file__).parent.parent / "warehouse" / "gemini"
 MAX_BATCH_SIZE_MB = 95  # Stay under 100MB limit with margin
 BATCH_BY = "month"  # Options: "month", "topic", "property", "all"
+MAX_OPEN_WRITERS = 32  # Batch files kept open at once while converting
+HEADER_COUNT_WIDTH = 10  # Characters reserved for the email count patched on close
+MANIFEST_NAME = "conversion_manifest.json"  # Converted-day manifest, kept in GEMINI_OUTPUT_DIR
+MANIFEST_VERSION = 2
+
+# Topic keywords, matched case-insensitively against subject and preview
+TOPIC_KEYWORDS = {
+    'contamination': ['contamination', 'contaminated', 'trash', 'recycle', 'sorting'],
+    'billing': ['invoice', 'bill', 'payment', 'charge', 'cost', 'pricing', 'rate'],
+    'vendor': ['vendor', 'service provider', 'contract', 'proposal', 'quote'],
+    'maintenance': ['repair', 'broken', 'damaged', 'fix', 'maintenance', 'service call'],
+    'compliance': ['compliance', 'regulation', 'permit', 'violation', 'inspection'],
+    'urgent': ['urgent', 'asap', 'emergency', 'critical', 'immediate'],
+}
+TOPIC_CLASSIFIER = KeywordClassifier(TOPIC_KEYWORDS)
 
 # Create output directory
 GEMINI_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -117,24 +138,9 @@ def detect_email_topics(email: dict) -> list:
     Returns:
         List of topic strings
     """
-    topics = []
-
     # Combine subject and body preview for analysis
-    text = f"{email.get('subject', '')} {email.get('body_preview', '')}".lower()
-
-    # Topic keywords
-    topic_keywords = {
-        'contamination': ['contamination', 'contaminated', 'trash', 'recycle', 'sorting'],
-        'billing': ['invoice', 'bill', 'payment', 'charge', 'cost', 'pricing', 'rate'],
-        'vendor': ['vendor', 'service provider', 'contract', 'proposal', 'quote'],
-        'maintenance': ['repair', 'broken', 'damaged', 'fix', 'maintenance', 'service call'],
-        'compliance': ['compliance', 'regulation', 'permit', 'violation', 'inspection'],
-        'urgent': ['urgent', 'asap', 'emergency', 'critical', 'immediate'],
-    }
-
-    for topic, keywords in topic_keywords.items():
-        if any(keyword in text for keyword in keywords):
-            topics.append(topic)
+    text = f"{email.get('subject', '')} {email.get('body_preview', '')}"
+    topics = TOPIC_CLASSIFIER.classify(text)
 
     # Check email importance
     if email.get('importance') == 'high':
@@ -182,14 +188,282 @@ def get_batch_key(email: dict, file_date: str, batch_by: str) -> str:
         return "all-emails"
 
 
-def process_json_files(start_date: str = None, end_date: str = None, batch_by: str = "month"):
+class _BatchFile:
+    """State of one numbered batch file being written."""
+
+    def __init__(self, batch_key: str, batch_num: int, path: Path):
+        self.batch_key = batch_key
+        self.batch_num = batch_num
+        self.path = path
+        self.handle = None
+        self.count_offset = 0
+        self.email_count = 0
+        self.size = 0
+
+
+class BatchWriter:
+    """
+    Writes markdown batches incrementally through open, rotating files.
+
+    Each batch key (e.g. "2025-06") gets a numbered file (batch_2025-06_001.md)
+    that is written as emails arrive. When adding an email would push a file
+    past the size limit it is closed and the next number is started. The
+    "Total Emails" header is written as a fixed-width placeholder and patched
+    with the real count when the file is closed, so memory use does not grow
+    with the corpus. At most max_open files are kept open; least recently
+    used ones are closed and reopened for append when needed.
+
+    Batch keys listed in `existing` (batch key -> last file record from the
+    conversion manifest) are appended to instead of starting at _001.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        max_size_bytes: int,
+        max_open: int = MAX_OPEN_WRITERS,
+        existing: dict = None
+    ):
+        self.output_dir = Path(output_dir)
+        self.max_size_bytes = max_size_bytes
+        self.max_open = max_open
+        self.existing = dict(existing or {})
+        self._current = {}  # batch_key -> _BatchFile
+        self._open = OrderedDict()  # path -> _BatchFile, in LRU order
+        self.completed = []  # finished _BatchFile objects
+
+    def add(self, batch_key: str, md_content: str) -> None:
+        """Append a formatted email to the batch for batch_key."""
+        md_size = len(md_content.encode('utf-8'))
+        batch = self._current.get(batch_key)
+
+        if batch is None:
+            batch = self._resume(batch_key) or self._start(batch_key, 1)
+
+        if batch.email_count and batch.size + md_size > self.max_size_bytes:
+            # Start a new batch with the next sequence number
+            self._finish(batch)
+            batch = self._start(batch_key, batch.batch_num + 1)
+
+        handle = self._handle(batch)
+        handle.write(md_content)
+        batch.size += md_size
+        batch.email_count += 1
+
+    def close(self) -> list:
+        """Close all batches, patch their headers and return them in creation order."""
+        for batch in list(self._current.values()):
+            self._finish(batch)
+        return self.completed
+
+    def _start(self, batch_key: str, batch_num: int) -> _BatchFile:
+        """Create a numbered batch file and write its header."""
+        name = f"{batch_key}_{batch_num:03d}"
+        batch = _BatchFile(batch_key, batch_num, self.output_dir / f"batch_{name}.md")
+        self._current[batch_key] = batch
+
+        handle = self._handle(batch, mode='w')
+        handle.write(f"# Email Batch: {name}\n")
+        handle.write(f"Generated: {datetime.now().isoformat()}\n")
+        handle.write("Total Emails: ")
+        batch.count_offset = handle.tell()
+        handle.write(" " * HEADER_COUNT_WIDTH + "\n")
+        handle.write("\n" + "=" * 80 + "\n\n")
+        return batch
+
+    def _resume(self, batch_key: str):
+        """Reopen the last existing file for batch_key, if there is one."""
+        record = self.existing.pop(batch_key, None)
+        if not record:
+            return None
+
+        path = self.output_dir / record['file']
+        if not path.exists():
+            return None
+
+        # Locate the count placeholder in the existing header
+        with open(path, 'rb') as f:
+            header = f.read(4096)
+        marker = header.find(b"Total Emails: ")
+        if marker == -1:
+            return None
+
+        batch = _BatchFile(batch_key, record['batch_num'], path)
+        batch.count_offset = marker + len(b"Total Emails: ")
+        batch.email_count = record['emails']
+        batch.size = record['size']
+        self._current[batch_key] = batch
+        return batch
+
+    def _handle(self, batch: _BatchFile, mode: str = 'a'):
+        """Return an open handle for the batch, evicting the least recently used."""
+        if batch.handle is not None:
+            self._open.move_to_end(batch.path)
+            return batch.handle
+
+        while len(self._open) >= self.max_open:
+            _, evicted = self._open.popitem(last=False)
+            evicted.handle.close()
+            evicted.handle = None
+
+        batch.handle = open(batch.path, mode, encoding='utf-8')
+        self._open[batch.path] = batch
+        return batch.handle
+
+    def _finish(self, batch: _BatchFile) -> None:
+        """Close a batch file and patch the email count into its header."""
+        if batch.handle is not None:
+            batch.handle.close()
+            batch.handle = None
+            del self._open[batch.path]
+
+        with open(batch.path, 'r+b') as f:
+            f.seek(batch.count_offset)
+            f.write(f"{batch.email_count:<{HEADER_COUNT_WIDTH}}".encode('utf-8'))
+
+        del self._current[batch.batch_key]
+        self.completed.append(batch)
+
+
+def load_manifest(batch_by: str) -> dict:
     """
-    Process all JSON files and create Gemini markdown batches.
+    Load the conversion manifest for a batching strategy.
+
+    The manifest records, per converted daily file, its size, mtime, digest,
+    the number of emails emitted and how many went to each batch key, the
+    dedupe keys of the emails it emitted and of the repeats it skipped, plus
+    the batch files written for each batch key and, after an interrupted
+    run, the batch keys left to rewrite. A manifest written with a
+    different strategy, size limit or format version is discarded along
+    with the batch files it lists; if the manifest is unreadable, every
+    batch file in the output directory is removed.
+    """
+    manifest_file = GEMINI_OUTPUT_DIR / MANIFEST_NAME
+    empty = {'version': MANIFEST_VERSION, 'batch_by': batch_by, 'max_size_mb': MAX_BATCH_SIZE_MB, 'days': {}, 'batches': {}}
+
+    if not manifest_file.exists():
+        return empty
+
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except json.JSONDecodeError:
+        print("Warning: Conversion manifest corrupted, reconverting everything")
+        for path in GEMINI_OUTPUT_DIR.glob("batch_*.md"):
+            path.unlink()
+        return empty
+
+    if (manifest.get('version') != MANIFEST_VERSION or manifest.get('batch_by') != batch_by
+            or manifest.get('max_size_mb') != MAX_BATCH_SIZE_MB):
+        print("Batch strategy, size or manifest format changed since last run, reconverting everything")
+        discard_batches(manifest)
+        return empty
+
+    return manifest
+
+
+def discard_batches(manifest: dict) -> None:
+    """Delete every batch file the manifest lists and forget them."""
+    for files in manifest.get('batches', {}).values():
+        for record in files:
+            (GEMINI_OUTPUT_DIR / record['file']).unlink(missing_ok=True)
+    manifest['batches'] = {}
+
+
+def save_manifest(manifest: dict) -> None:
+    """Save the conversion manifest."""
+    manifest['updated_at'] = datetime.now().isoformat()
+    with open(GEMINI_OUTPUT_DIR / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def convert_daily_file(json_file: Path, batch_by: str):
+    """
+    Convert one daily export.
+
+    Yields:
+        (batch_key, dedupe_keys, markdown) for each email in the file
+    """
+    file_date = json_file.stem
+
+    for email in iter_daily_emails(json_file):
+        md_content = format_email_as_markdown(email, file_date)
+        yield get_batch_key(email, file_date, batch_by), email_keys(email), md_content
+
+
+def _convert_daily_file_args(args) -> list:
+    """Process pool entry point: convert a whole day and return its records."""
+    return list(convert_daily_file(*args))
+
+
+def _replay(future):
+    """Yield a worker's records, raising its error when iterated like the serial path."""
+    yield from future.result()
+
+
+def iter_converted_days(json_files: list, batch_by: str, workers: int = 1):
+    """
+    Convert daily files, in worker processes when workers > 1.
+
+    Workers parse and format whole days and return (batch_key, dedupe_keys,
+    markdown) records; results are yielded in input order so batch assembly stays
+    deterministic. At most two days per worker are in flight, which bounds
+    the formatted markdown held in the parent.
+
+    Args:
+        json_files: Daily JSON files to convert
+        batch_by: Batching strategy
+        workers: Worker processes (0 = one per CPU, 1 = convert in-process)
+
+    Yields:
+        (json_file, records) where records iterates (batch_key, dedupe_keys,
+        markdown) and raises if the file could not be converted
+    """
+    workers = min(workers or os.cpu_count() or 1, len(json_files))
+
+    if workers <= 1:
+        for json_file in json_files:
+            yield json_file, convert_daily_file(json_file, batch_by)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for json_file in json_files:
+            pending.append((json_file, executor.submit(_convert_daily_file_args, (json_file, batch_by))))
+            if len(pending) >= workers * 2:
+                done_file, future = pending.popleft()
+                yield done_file, _replay(future)
+
+        while pending:
+            done_file, future = pending.popleft()
+            yield done_file, _replay(future)
+
+
+def process_json_files(
+    start_date: str = None,
+    end_date: str = None,
+    batch_by: str = "month",
+    full: bool = False,
+    workers: int = 1
+):
+    """
+    Process daily JSON files and create Gemini markdown batches.
+
+    Only daily files that are new or changed since the last run (per the
+    conversion manifest) are converted. Their emails are appended to the
+    existing batches, except for batch keys that a changed or deleted day
+    contributed to; those batches are rewritten from every day that feeds
+    them. An email already written by another day (same Outlook ID or same
+    content) is skipped, so each email appears once per batching strategy.
+    Batches are written incrementally, so memory use stays constant
+    regardless of how many days are processed.
 
     Args:
         start_date: Optional start date (YYYY-MM-DD)
         end_date: Optional end date (YYYY-MM-DD)
         batch_by: Batching strategy
+        full: Ignore the manifest and reconvert every file in range
+        workers: Worker processes for parsing daily files (0 = one per CPU)
     """
     print("=" * 80)
     print("Converting Email JSON to Gemini Markdown Format")
@@ -198,108 +472,201 @@ def process_json_files(start_date: str = None, end_date: str = None, batch_by: s
     print(f"Output: {GEMINI_OUTPUT_DIR}")
     print(f"Batch strategy: {batch_by}")
     print(f"Max batch size: {MAX_BATCH_SIZE_MB}MB")
+    print(f"Workers: {workers or os.cpu_count()}")
     print()
 
-    # Find all JSON files
-    json_files = sorted(DAILY_JSON_DIR.glob("*.json"))
+    def in_range(file_date: str) -> bool:
+        if start_date and file_date < start_date:
+            return False
+        if end_date and file_date > end_date:
+            return False
+        return True
+
+    # Find all JSON files in the date range
+    json_files = [f for f in sorted(DAILY_JSON_DIR.glob("*.json")) if in_range(f.stem)]
 
     if not json_files:
         print("ERROR: No JSON files found in daily export directory")
         return
 
-    # Filter by date range if specified
-    if start_date or end_date:
-        filtered_files = []
-        for json_file in json_files:
-            file_date = json_file.stem  # YYYY-MM-DD
-            if start_date and file_date < start_date:
-                continue
-            if end_date and file_date > end_date:
-                continue
-            filtered_files.append(json_file)
-        json_files = filtered_files
-
-    print(f"Processing {len(json_files)} JSON files...")
+    manifest = load_manifest(batch_by)
+    if full:
+        manifest['days'] = {}
+        discard_batches(manifest)
+    days = manifest['days']
+
+    # Classify days against the manifest; an interrupted run leaves the
+    # batch keys it had not finished writing
+    to_convert = {}
+    rewrite_keys = set(manifest.pop('rewrite', []) if not full else [])
+    released = set()
+    present = {f.name for f in json_files}
+
+    for json_file in json_files:
+        stat = json_file.stat()
+        entry = days.get(json_file.name)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            continue
+
+        digest = file_digest(json_file)
+        if entry and entry['digest'] == digest:
+            entry.update(size=stat.st_size, mtime=stat.st_mtime)
+            continue
+
+        if entry:
+            rewrite_keys.update(entry['batches'])
+            released.update(entry['emitted'])
+        to_convert[json_file] = (stat, digest)
+
+    removed = [name for name in days if in_range(Path(name).stem) and name not in present]
+    for name in removed:
+        entry = days.pop(name)
+        rewrite_keys.update(entry['batches'])
+        released.update(entry['emitted'])
+
+    # Days that skipped an email as a repeat of a changed or removed day
+    # may now have to emit it themselves
+    for name, entry in days.items():
+        json_file = DAILY_JSON_DIR / name
+        if (json_file not in to_convert and json_file.exists()
+                and released.intersection(entry['skipped'])):
+            rewrite_keys.update(entry['batches'])
+            stat = json_file.stat()
+            to_convert[json_file] = (stat, file_digest(json_file))
+
+    print(f"Daily files in range: {len(json_files)}")
+    print(f"New or changed: {len(to_convert)}")
+    print(f"Removed: {len(removed)}")
     print()
 
-    # Group emails by batch key
-    batches = defaultdict(list)
-    batch_sizes = defaultdict(int)
-    batch_counts = defaultdict(int)
+    if not to_convert and not removed and not rewrite_keys:
+        save_manifest(manifest)
+        print("All batches are up to date!")
+        return
 
-    total_emails = 0
-    skipped_emails = 0
+    # Remove batch files that are about to be rewritten
+    for batch_key in rewrite_keys:
+        for record in manifest['batches'].pop(batch_key, []):
+            (GEMINI_OUTPUT_DIR / record['file']).unlink(missing_ok=True)
 
-    for json_file in json_files:
-        file_date = json_file.stem
-        print(f"Processing {json_file.name}...", end=" ")
+    existing = {key: files[-1] for key, files in manifest['batches'].items() if files}
+    writer = BatchWriter(GEMINI_OUTPUT_DIR, MAX_BATCH_SIZE_MB * 1024 * 1024, existing=existing)
 
-        try:
-            # Use utf-8-sig to handle BOM from PowerShell
-            with open(json_file, 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
-
-            emails = data.get('emails', [])
-            print(f"{len(emails)} emails")
-
-            for email in emails:
-                total_emails += 1
-
-                # Convert to markdown
-                md_content = format_email_as_markdown(email, file_date)
-                md_size = len(md_content.encode('utf-8'))
-
-                # Determine batch
-                batch_key = get_batch_key(email, file_date, batch_by)
-
-                # Check if adding this email would exceed batch size
-                if batch_sizes[batch_key] + md_size > (MAX_BATCH_SIZE_MB * 1024 * 1024):
-                    # Start a new batch with a sequence number
-                    batch_num = batch_counts[batch_key] + 1
-                    batch_counts[batch_key] = batch_num
-                    batch_key_with_num = f"{batch_key}_{batch_num:03d}"
-
-                    batches[batch_key_with_num].append(md_content)
-                    batch_sizes[batch_key_with_num] = md_size
-                else:
-                    # Add to existing batch
-                    if batch_key not in batch_counts:
-                        batch_counts[batch_key] = 1
-                        batch_key_with_num = f"{batch_key}_001"
-                    else:
-                        batch_num = batch_counts[batch_key]
-                        batch_key_with_num = f"{batch_key}_{batch_num:03d}"
-
-                    batches[batch_key_with_num].append(md_content)
-                    batch_sizes[batch_key_with_num] += md_size
-
-        except Exception as e:
-            print(f"  ERROR: {e}")
-            skipped_emails += 1
+    # Emails already written by days that are not being reconverted
+    seen = set()
+    for json_file in to_convert:
+        days.pop(json_file.name, None)
+    for entry in days.values():
+        seen.update(entry['emitted'])
+
+    total_emails = 0
+    duplicate_emails = 0
+    skipped_files = 0
+    partial = set()  # Batch keys holding emails of a day not yet recorded
+    finished = False
+
+    try:
+        # Append emails from new and changed days
+        for json_file, records in iter_converted_days(sorted(to_convert), batch_by, workers):
+            stat, digest = to_convert[json_file]
+            print(f"Processing {json_file.name}...", end=" ")
+            batch_counts = defaultdict(int)
+            emitted = []
+            skipped = []
+            duplicates = 0
+            error = None
+
+            try:
+                for batch_key, keys, md_content in records:
+                    if seen.intersection(keys):
+                        skipped.extend(keys)
+                        duplicates += 1
+                        continue
+                    seen.update(keys)
+                    emitted.extend(keys)
+                    batch_counts[batch_key] += 1
+                    if batch_key not in rewrite_keys:
+                        writer.add(batch_key, md_content)
+                        partial.add(batch_key)
+            except Exception as e:
+                # Keep what was written so the manifest matches the batches;
+                # a corrected export will be picked up as changed
+                print(f"  ERROR: {e}")
+                error = str(e)
+                skipped_files += 1
+
+            email_count = sum(batch_counts.values())
+            total_emails += email_count
+            duplicate_emails += duplicates
+            if not error:
+                print(f"{email_count} emails ({duplicates} duplicates skipped)" if duplicates else f"{email_count} emails")
+            days[json_file.name] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'digest': digest,
+                'emails': email_count,
+                'batches': dict(batch_counts),
+                'emitted': emitted,
+                'skipped': sorted(set(skipped))
+            }
+            if error:
+                days[json_file.name]['error'] = error
+            partial.clear()
+
+        # Rewrite affected batches from every day that contributes to them
+        if rewrite_keys:
+            sources = sorted(name for name, entry in days.items() if rewrite_keys & set(entry['batches']))
+            print(f"\nRewriting {len(rewrite_keys)} batch key(s) from {len(sources)} daily file(s)...")
+
+            replayed = set()
+            source_files = [DAILY_JSON_DIR / name for name in sources]
+            for json_file, records in iter_converted_days(source_files, batch_by, workers):
+                owned = set(days[json_file.name]['emitted'])
+                try:
+                    for batch_key, keys, md_content in records:
+                        # Only the copy this day emitted, once
+                        if batch_key not in rewrite_keys or keys[0] not in owned or replayed.intersection(keys):
+                            continue
+                        replayed.update(keys)
+                        writer.add(batch_key, md_content)
+                except Exception as e:
+                    # Already reported; the emails before the error were replayed
+                    if 'error' not in days[json_file.name]:
+                        print(f"  ERROR rewriting from {json_file.name}: {e}")
+        finished = True
+    finally:
+        batches = writer.close()
+
+        # Record the files written for each batch key, even if interrupted
+        for batch in batches:
+            files = manifest['batches'].setdefault(batch.batch_key, [])
+            files[:] = [r for r in files if r['file'] != batch.path.name]
+            files.append({
+                'file': batch.path.name,
+                'batch_num': batch.batch_num,
+                'emails': batch.email_count,
+                'size': batch.size
+            })
+            files.sort(key=lambda r: r['batch_num'])
+
+        # Days not yet recorded are converted again by the next run, which
+        # must rebuild the batches holding part of one and those that were
+        # still being rewritten rather than append to them
+        if not finished:
+            manifest['rewrite'] = sorted(rewrite_keys | partial)
+        save_manifest(manifest)
 
     print()
     print("=" * 80)
-    print(f"Total emails processed: {total_emails}")
-    print(f"Total batches created: {len(batches)}")
+    print(f"Total emails converted: {total_emails}")
+    print(f"Duplicate emails skipped: {duplicate_emails}")
+    print(f"Files skipped (errors): {skipped_files}")
+    print(f"Batch files written: {len(batches)}")
     print()
 
-    # Write batches to files
-    for batch_key, emails_md in batches.items():
-        output_file = GEMINI_OUTPUT_DIR / f"batch_{batch_key}.md"
-
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # Write batch header
-            f.write(f"# Email Batch: {batch_key}\n")
-            f.write(f"Generated: {datetime.now().isoformat()}\n")
-            f.write(f"Total Emails: {len(emails_md)}\n")
-            f.write("\n" + "=" * 80 + "\n\n")
-
-            # Write all emails
-            for email_md in emails_md:
-                f.write(email_md)
-
-        file_size_mb = batch_sizes[batch_key] / (1024 * 1024)
-        print(f"Created: {output_file.name} ({len(emails_md)} emails, {file_size_mb:.2f}MB)")
+    for batch in batches:
+        file_size_mb = batch.size / (1024 * 1024)
+        print(f"Wrote: {batch.path.name} ({batch.email_count} emails, {file_size_mb:.2f}MB)")
 
     print()
     print("=" * 80)
@@ -319,6 +686,10 @@ if __name__ == "__main__":
                        help="Batching strategy")
     parser.add_argument("--max-size", type=int, default=95,
                        help="Maximum batch size in MB (default: 95)")
+    parser.add_argument("--full", action="store_true",
+                       help="Ignore the conversion manifest and reconvert every file")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Worker processes for parsing daily files (default: 1, 0 = one per CPU)")
 
     args = parser.parse_args()
 
@@ -328,5 +699,7 @@ if __name__ == "__main__":
     process_json_files(
         start_date=args.start_date,
         end_date=args.end_date,
-        batch_by=args.batch_by
+        batch_by=args.batch_by,
+        full=args.full,
+        workers=args.workers
     )
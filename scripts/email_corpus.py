@@ -0,0 +1,323 @@
+"""
+Shared loader for the markdown email batches in warehouse/gemini.
+
+Batch files are streamed one email at a time from a memory map
+(iter_batch_chunks) and parsed into compact chunk records (hash, byte
+offsets and a few header fields) instead of holding the full text of every
+email. Files are parsed in a process pool when the corpus is large enough
+to benefit, so corpus scans scale with the available cores. Chunk text is
+read back from disk on demand with read_chunk().
+
+Chunk text is newline-normalized before hashing, so hashes match the
+text-mode reads used to build existing embedding caches.
+
+The same email can appear in several batch files (e.g. a monthly batch and
+batch_all-emails). dedupe_records() keeps the first occurrence of each
+email ID (or, for chunks without one, each chunk hash) in path order.
+
+Usage:
+    from email_corpus import load_corpus, read_chunk
+
+    corpus = load_corpus(GEMINI_DIR.glob("*.md"), keywords=["contamination"])
+    for path, parsed in corpus.items():
+        for record in parsed.records:
+            text = read_chunk(path, record)
+"""
+
+import hashlib
+import mmap
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Emails in a batch file are separated by a line of 80 '=' characters
+SEPARATOR = "=" * 80
+SEPARATOR_BYTES = SEPARATOR.encode('utf-8')
+
+# Below this many bytes of input, parsing in-process beats pool startup
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+# Parsed files kept by load_corpus (one entry per file and keyword set)
+PARSE_CACHE_SIZE = 256
+
+# Header lines parsed into chunk records
+HEADER_FIELDS = {
+    '# Email ID:': 'email_id',
+    '**Date**:': 'date',
+    '**Subject**:': 'subject',
+}
+HEADER_SCAN_LINES = 20
+
+
+class ChunkRecord(NamedTuple):
+    """A single email chunk in a batch file, located by byte offsets."""
+    hash: str
+    start: int
+    end: int
+    email_id: str
+    date: str
+    subject: str
+    score: int
+
+
+class ParsedBatch(NamedTuple):
+    """Result of parsing one batch file."""
+    digest: str
+    records: List[ChunkRecord]
+
+
+def chunk_hash(text: str) -> str:
+    """Generate hash for a text chunk (for cache keying)."""
+    return hashlib.md5(text.encode('utf-8')).hexdigest()[:16]
+
+
+def normalize_newlines(text: str) -> str:
+    """Translate CRLF/CR line endings to LF, as text-mode reads do."""
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _parse_header(text: str) -> Dict[str, str]:
+    """Extract email ID, date and subject from the chunk's metadata block."""
+    fields = {'email_id': '', 'date': '', 'subject': ''}
+    for line in text.split('\n', HEADER_SCAN_LINES)[:HEADER_SCAN_LINES]:
+        for prefix, field in HEADER_FIELDS.items():
+            if line.startswith(prefix):
+                fields[field] = line[len(prefix):].strip()
+    return fields
+
+
+def iter_batch_chunks(path: Path, digest=None) -> Iterator[Tuple[int, int, str]]:
+    """
+    Stream the email chunks of a batch file one at a time.
+
+    The file is memory-mapped and scanned for separators, so only one email
+    is decoded at a time and peak memory is bounded by the largest email
+    rather than the batch size.
+
+    Args:
+        path: Batch file path
+        digest: Optional hashlib object updated with the raw file bytes
+
+    Yields:
+        (start, end, text) tuples: byte offsets of the stripped chunk in the
+        file and its newline-normalized text
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            size = len(mm)
+            while pos <= size:
+                idx = mm.find(SEPARATOR_BYTES, pos)
+                segment_end = idx if idx != -1 else size
+                raw_segment = mm[pos:segment_end]
+                if digest is not None:
+                    digest.update(raw_segment)
+                    if idx != -1:
+                        digest.update(SEPARATOR_BYTES)
+
+                segment = raw_segment.decode('utf-8')
+                stripped = segment.strip()
+                if stripped:
+                    lead = len(segment) - len(segment.lstrip())
+                    start = pos + len(segment[:lead].encode('utf-8'))
+                    end = start + len(stripped.encode('utf-8'))
+                    yield start, end, normalize_newlines(stripped)
+
+                if idx == -1:
+                    break
+                pos = idx + len(SEPARATOR_BYTES)
+
+
+def parse_batch_file(
+    path: Path,
+    keywords: Optional[List[str]] = None,
+    min_chars: int = 0
+) -> ParsedBatch:
+    """
+    Parse a markdown batch file into chunk records.
+
+    Args:
+        path: Batch file path
+        keywords: If given, score chunks by keyword hits and keep only hits
+        min_chars: Skip chunks shorter than this many characters
+
+    Returns:
+        ParsedBatch with the file's sha256 digest and its chunk records
+    """
+    digest = hashlib.sha256()
+    records = []
+
+    for start, end, text in iter_batch_chunks(path, digest):
+        if len(text) < min_chars:
+            continue
+
+        score = 0
+        if keywords:
+            text_lower = text.lower()
+            score = sum(1 for kw in keywords if kw in text_lower)
+            if not score:
+                continue
+
+        header = _parse_header(text)
+        records.append(ChunkRecord(
+            hash=chunk_hash(text),
+            start=start,
+            end=end,
+            email_id=header['email_id'],
+            date=header['date'],
+            subject=header['subject'],
+            score=score
+        ))
+
+    return ParsedBatch(digest.hexdigest(), records)
+
+
+def _parse_batch_file_args(args) -> ParsedBatch:
+    """Process pool entry point (arguments packed as a tuple)."""
+    return parse_batch_file(*args)
+
+
+_parse_cache: "OrderedDict[tuple, ParsedBatch]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _cache_key(path: Path, keywords: Optional[tuple], min_chars: int) -> tuple:
+    """Cache key for a parse: the file's identity and fingerprint plus the parse arguments."""
+    stat = path.stat()
+    return (str(path.resolve()), stat.st_size, stat.st_mtime_ns, keywords, min_chars)
+
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    """
+    The long-lived parse pool, started on first use.
+
+    Workers are started with forkserver (or spawn) rather than fork, which is
+    unsafe once a server has started threads. A pool inherited through
+    fork() belongs to the parent and is replaced; a pool with too few
+    workers is retired (its queued work still finishes) and replaced.
+    """
+    global _pool, _pool_pid, _pool_workers
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid() or _pool_workers < workers:
+            if _pool is not None and _pool_pid == os.getpid():
+                _pool.shutdown(wait=False)
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            _pool_pid = os.getpid()
+            _pool_workers = workers
+        return _pool
+
+
+def clear_parse_cache():
+    """Forget every parsed file (the next load_corpus() re-parses)."""
+    with _cache_lock:
+        _parse_cache.clear()
+
+
+def load_corpus(
+    paths: Iterable[Path],
+    keywords: Optional[List[str]] = None,
+    min_chars: int = 0,
+    workers: Optional[int] = None
+) -> Dict[Path, ParsedBatch]:
+    """
+    Parse many batch files, in parallel when worthwhile.
+
+    Files whose size and mtime match an earlier call with the same keywords
+    and min_chars are served from the parse cache.
+
+    Args:
+        paths: Batch files to parse
+        keywords: If given, score chunks by keyword hits and keep only hits
+        min_chars: Skip chunks shorter than this many characters
+        workers: Worker processes (default: CPU count; 1 disables the pool)
+
+    Returns:
+        Dict mapping each path to its ParsedBatch, in sorted path order
+    """
+    paths = sorted(Path(p) for p in paths)
+    if not paths:
+        return {}
+
+    keywords = tuple(keywords) if keywords else None
+    keys = {p: _cache_key(p, keywords, min_chars) for p in paths}
+
+    results = {}
+    with _cache_lock:
+        for p in paths:
+            if keys[p] in _parse_cache:
+                _parse_cache.move_to_end(keys[p])
+                results[p] = _parse_cache[keys[p]]
+
+    missing = [p for p in paths if p not in results]
+    if missing:
+        workers = min(workers or os.cpu_count() or 1, len(missing))
+        total_bytes = sum(keys[p][1] for p in missing)
+        tasks = [(p, keywords, min_chars) for p in missing]
+
+        if workers <= 1 or total_bytes < PARALLEL_MIN_BYTES:
+            parsed = list(map(_parse_batch_file_args, tasks))
+        else:
+            parsed = list(_executor(workers).map(_parse_batch_file_args, tasks))
+
+        with _cache_lock:
+            for p, batch in zip(missing, parsed):
+                results[p] = _parse_cache[keys[p]] = batch
+            while len(_parse_cache) > PARSE_CACHE_SIZE:
+                _parse_cache.popitem(last=False)
+
+    return {p: results[p] for p in paths}
+
+
+def record_key(email_id: str, hash: str) -> str:
+    """Deduplication key for a chunk: its email ID, or its hash if it has none."""
+    return f"id:{email_id}" if email_id else f"hash:{hash}"
+
+
+def dedupe_records(corpus: Dict[Path, ParsedBatch]) -> Tuple[List[Tuple[Path, ChunkRecord]], int]:
+    """
+    Drop repeated emails from a parsed corpus.
+
+    A chunk is a duplicate if an earlier chunk (in path order) has the same
+    email ID or the same hash.
+
+    Args:
+        corpus: Result of load_corpus()
+
+    Returns:
+        ((path, record) pairs for the first occurrence of each email,
+        number of duplicates dropped)
+    """
+    seen = set()
+    unique = []
+    duplicates = 0
+
+    for path, parsed in corpus.items():
+        for record in parsed.records:
+            keys = {record_key(record.email_id, record.hash), record_key('', record.hash)}
+            if keys & seen:
+                duplicates += 1
+                continue
+            seen.update(keys)
+            unique.append((path, record))
+
+    return unique, duplicates
+
+
+def read_chunk(path: Path, record: ChunkRecord) -> str:
+    """Read a chunk's text back from its batch file."""
+    with open(path, 'rb') as f:
+        f.seek(record.start)
+        return normalize_newlines(f.read(record.end - record.start).decode('utf-8'))
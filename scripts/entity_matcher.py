@@ -0,0 +1,165 @@
+"""
+Multi-pattern matching for known properties, vendors, contacts and topics.
+
+Detection used to test every known name with `name.lower() in text`, so
+tagging cost grew with the length of the entity lists. PatternMatcher
+compiles all patterns into one Aho-Corasick automaton and finds every
+match in a single pass over the text, independent of how many patterns
+there are. Matching is case-insensitive substring matching, exactly like
+the `in` tests it replaces.
+
+Usage:
+    from entity_matcher import EntityTagger
+
+    tagger = EntityTagger.from_config(config)
+    for entity in tagger.find(f"{subject} {preview}"):
+        print(entity.kind, entity.label)
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+
+class PatternMatcher:
+    """
+    Aho-Corasick automaton over lowercased patterns.
+
+    Patterns are added with an integer ID; find() returns the IDs of all
+    patterns that occur anywhere in the text. Several IDs may share one
+    pattern.
+    """
+
+    def __init__(self):
+        self._goto = [{}]  # state -> {char: next state}
+        self._fail = [0]
+        self._out = [[]]  # state -> pattern IDs ending here (incl. via fail links)
+        self._built = False
+
+    def add(self, pattern: str, pattern_id: int) -> None:
+        """Add a pattern; empty patterns are ignored."""
+        if self._built:
+            raise RuntimeError("Cannot add patterns after the matcher is built")
+
+        pattern = pattern.lower()
+        if not pattern:
+            return
+
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(pattern_id)
+
+    def build(self) -> 'PatternMatcher':
+        """Compute failure links breadth-first; returns self."""
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+        self._built = True
+        return self
+
+    def find(self, text: str) -> Set[int]:
+        """Return the IDs of all patterns occurring in text."""
+        if not self._built:
+            self.build()
+
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+
+        return found
+
+
+class Entity(NamedTuple):
+    """A known entity from the config."""
+    order: int  # Position in config order, used as priority
+    kind: str  # "property", "vendor" or "contact"
+    label: str
+    pattern: str
+
+
+class EntityTagger:
+    """
+    Finds known properties, vendors and contacts in email text.
+
+    Entities keep their config order (properties, then vendors, then
+    contacts, each in list order), and find() returns matches in that
+    order, so callers that take the first match keep their priority.
+    """
+
+    def __init__(self, entities: Iterable[tuple]):
+        """
+        Args:
+            entities: (kind, label, pattern) tuples in priority order
+        """
+        self.entities = [Entity(i, *entity) for i, entity in enumerate(entities)]
+        self._matcher = PatternMatcher()
+        for entity in self.entities:
+            self._matcher.add(entity.pattern, entity.order)
+        self._matcher.build()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'EntityTagger':
+        """Build a tagger from the "projects" section of config/settings.json."""
+        projects = config.get('projects') or {}
+        entities = [('property', p, p) for p in projects.get('known_properties', [])]
+        entities += [('vendor', v, v) for v in projects.get('known_vendors', [])]
+        entities += [
+            ('contact', name, identifier)
+            for name, identifier in projects.get('known_contacts', {}).items()
+        ]
+        return cls(entities)
+
+    def find(self, text: str, kinds: Optional[Iterable[str]] = None) -> List[Entity]:
+        """
+        Return the entities mentioned in text, in config order.
+
+        Args:
+            text: Text to search (case-insensitive)
+            kinds: Only return entities of these kinds
+        """
+        kinds = set(kinds) if kinds is not None else None
+        return [
+            self.entities[i] for i in sorted(self._matcher.find(text))
+            if kinds is None or self.entities[i].kind in kinds
+        ]
+
+
+class KeywordClassifier:
+    """Maps text to the categories whose keywords it contains, in category order."""
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        self.categories = list(keywords)
+        self._matcher = PatternMatcher()
+        for index, category in enumerate(self.categories):
+            for keyword in keywords[category]:
+                self._matcher.add(keyword, index)
+        self._matcher.build()
+
+    def classify(self, text: str) -> List[str]:
+        """Return the categories with at least one keyword in text."""
+        return [self.categories[i] for i in sorted(self._matcher.find(text))]
@@ -4,25 +4,54 @@ Daily Email Summary Generator
 
 Generates actionable markdown summaries from daily email exports.
 Extracts action items, questions, commitments, and deadlines.
+
+A date range (e.g. after a backfill) is summarized in one run: thread
+context is loaded once for all conversations in the range and the days
+are spread over a process pool.
+
+Usage:
+    python generate_summary.py                  # Today
+    python generate_summary.py 2025-06-03       # One day
+    python generate_summary.py --from 2025-06-01 --to 2025-06-30 [--workers 4]
 """
 
+import contextlib
+import io
 import json
 import os
 import sys
-import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 from collections import defaultdict
 
+# Add project root to path for lib imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from entity_matcher import EntityTagger
+from insight_extractor import InsightExtractor
+from lib.database import DEFAULT_DB_PATH, THREADS_SYNCED_KEY, WastewiseDB
+from warehouse_io import iter_daily_records, load_daily_records, with_bodies
+
+# Email fields kept in memory; bodies are streamed in process_emails()
+SUMMARY_FIELDS = (
+    'id', 'date', 'type', 'subject', 'from', 'to', 'conversation_id',
+    'body_preview', 'importance',
+)
+
 
 class SummaryGenerator:
     """Generates daily email summaries with action items and insights."""
 
-    def __init__(self, warehouse_path: str, config_path: str):
+    def __init__(self, warehouse_path: str, config_path: str, db_path: str = None):
         self.warehouse_path = Path(warehouse_path)
         self.config_path = Path(config_path)
+        self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
         self.config = self._load_config()
+        self.tagger = EntityTagger.from_config(self.config)
+        self.extractor = InsightExtractor()
         self.today_emails = []
         self.threads = {}
         self.action_items = []
@@ -51,17 +80,50 @@ class SummaryGenerator:
             return
 
         try:
-            with open(daily_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.today_emails = data.get('emails', [])
+            self.today_emails = load_daily_records(daily_file, fields=SUMMARY_FIELDS)
             print(f"Loaded {len(self.today_emails)} emails from {date}")
         except Exception as e:
             print(f"Error loading emails: {e}")
 
-    def load_threads(self) -> None:
-        """Load thread context for additional insights."""
+    def reset_day(self) -> None:
+        """Clear the per-day emails and results, keeping config and thread context."""
+        self.today_emails = []
+        self.action_items = []
+        self.questions = []
+        self.commitments = []
+        self.project_updates = defaultdict(list)
+
+    def load_threads(self, conversation_ids: Iterable[str] = None) -> None:
+        """
+        Load thread context for today's conversations.
+
+        Only the threads of the needed conversation IDs are read from the
+        thread index in the database. threads_current.json is parsed instead
+        when the index has not been populated yet or was last synced before
+        the file was written.
+
+        Args:
+            conversation_ids: Conversations to load (default: those of
+                today's emails)
+        """
+        if conversation_ids is not None:
+            conversation_ids = {c for c in conversation_ids if c}
+
         threads_file = self.warehouse_path / 'threads' / 'threads_current.json'
 
+        if self.db_path.exists():
+            try:
+                with WastewiseDB(self.db_path) as db:
+                    if db.has_threads() and not _newer_than_index(threads_file, db.get_metadata(THREADS_SYNCED_KEY)):
+                        conv_ids = conversation_ids
+                        if conv_ids is None:
+                            conv_ids = {e.get('conversation_id') for e in self.today_emails if e.get('conversation_id')}
+                        self.threads = db.get_threads(list(conv_ids))
+                        print(f"Loaded {len(self.threads)} threads for {len(conv_ids)} conversations")
+                        return
+            except Exception as e:
+                print(f"Warning: Could not query thread index, falling back to JSON: {e}")
+
         if not threads_file.exists():
             print("Warning: Thread aggregation not found. Run aggregate_threads.py first.")
             return
@@ -71,114 +133,58 @@ class SummaryGenerator:
                 data = json.load(f)
                 # Convert threads list to dict keyed by thread_id
                 for thread in data.get('threads', []):
-                    self.threads[thread['thread_id']] = thread
+                    if conversation_ids is None or thread['thread_id'] in conversation_ids:
+                        self.threads[thread['thread_id']] = thread
             print(f"Loaded {len(self.threads)} threads")
         except Exception as e:
             print(f"Error loading threads: {e}")
 
-    def _extract_action_items(self, email: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract action items from email content."""
-        body = email.get('body_text', '')
-        subject = email.get('subject', '')
-        items = []
-
-        # Action item patterns
-        patterns = [
-            r'can you\s+([^.?!]+)',
-            r'could you\s+([^.?!]+)',
-            r'please\s+([^.?!]+)',
-            r'need\s+(?:you\s+)?to\s+([^.?!]+)',
-            r'would you\s+([^.?!]+)',
-            r'action required:?\s*([^.?!]+)',
-            r'(?:please\s+)?(?:send|provide|share|forward)\s+([^.?!]+)',
-            r'(?:need|needed)\s+by\s+([^.?!]+)',
-            r'follow up\s+(?:on|with|about)\s+([^.?!]+)',
-        ]
-
-        for pattern in patterns:
-            matches = re.finditer(pattern, body, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                action_text = match.group(0).strip()
-                # Limit to reasonable length
-                if len(action_text) > 150:
-                    action_text = action_text[:147] + '...'
-
-                items.append({
-                    'text': action_text,
-                    'from': email.get('from', {}).get('email', ''),
-                    'from_name': email.get('from', {}).get('name', ''),
-                    'subject': subject,
-                    'date': email.get('date', ''),
-                    'priority': 'high' if email.get('importance') == 'high' else 'normal'
-                })
-
-        return items
-
-    def _extract_questions(self, email: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract questions from email content."""
-        body = email.get('body_text', '')
-        subject = email.get('subject', '')
-        questions = []
-
-        # Split into sentences and find questions
-        sentences = re.split(r'[.!]\s+', body)
-
-        for sentence in sentences:
-            if '?' in sentence:
-                # Clean up
-                question = sentence.strip()
-                if len(question) > 200:
-                    question = question[:197] + '...'
-
-                # Avoid email signatures and footers
-                if any(skip in question.lower() for skip in ['unsubscribe', 'privacy policy', 'opt out']):
-                    continue
-
-                questions.append({
-                    'text': question,
-                    'from': email.get('from', {}).get('email', ''),
-                    'from_name': email.get('from', {}).get('name', ''),
-                    'subject': subject,
-                    'date': email.get('date', '')
-                })
-
-        return questions
+    def _extract_insights(self, email: Dict[str, Any]) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """
+        Extract action items, questions and commitments with one scan of the body.
 
-    def _extract_commitments(self, email: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract commitments made in sent emails."""
-        # Only check sent emails
-        if email.get('type') != 'sent':
-            return []
+        Questions are only kept for received emails; commitments are only
+        extracted from sent emails.
 
-        body = email.get('body_text', '')
+        Returns:
+            (action items, questions, commitments)
+        """
+        sender = email.get('from', {})
         subject = email.get('subject', '')
-        commitments = []
-
-        # Commitment patterns
-        patterns = [
-            r"I(?:'ll| will)\s+([^.?!]+)",
-            r"I(?:'m| am)\s+going to\s+([^.?!]+)",
-            r"I(?:'ve| have)\s+committed to\s+([^.?!]+)",
-            r"will have\s+(?:this\s+)?(?:to you|ready)\s+by\s+([^.?!]+)",
-            r"I can\s+([^.?!]+)\s+by\s+([^.?!]+)",
-            r"(?:we|I)\s+(?:will|can)\s+provide\s+([^.?!]+)",
+        date = email.get('date', '')
+        insights = self.extractor.extract(email.get('body_text', ''), sent=email.get('type') == 'sent')
+
+        action_items = [
+            {
+                'text': text,
+                'from': sender.get('email', ''),
+                'from_name': sender.get('name', ''),
+                'subject': subject,
+                'date': date,
+                'priority': 'high' if email.get('importance') == 'high' else 'normal'
+            }
+            for text in insights.actions
         ]
 
-        for pattern in patterns:
-            matches = re.finditer(pattern, body, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                commitment_text = match.group(0).strip()
-                if len(commitment_text) > 150:
-                    commitment_text = commitment_text[:147] + '...'
-
-                commitments.append({
-                    'text': commitment_text,
-                    'to': email.get('to', []),
+        questions = []
+        if email.get('type') == 'received':
+            questions = [
+                {
+                    'text': text,
+                    'from': sender.get('email', ''),
+                    'from_name': sender.get('name', ''),
                     'subject': subject,
-                    'date': email.get('date', '')
-                })
+                    'date': date
+                }
+                for text in insights.questions
+            ]
+
+        commitments = [
+            {'text': text, 'to': email.get('to', []), 'subject': subject, 'date': date}
+            for text in insights.commitments
+        ]
 
-        return commitments
+        return action_items, questions, commitments
 
     def _detect_project(self, email: Dict[str, Any]) -> str:
         """Detect primary project/property from email."""
@@ -186,47 +192,36 @@ class SummaryGenerator:
             return 'General'
 
         text = f"{email.get('subject', '')} {email.get('body_preview', '')}"
-        text_lower = text.lower()
-
-        # Check properties first
-        for prop in self.config['projects'].get('known_properties', []):
-            if prop.lower() in text_lower:
-                return prop
 
-        # Then vendors
-        for vendor in self.config['projects'].get('known_vendors', []):
-            if vendor.lower() in text_lower:
-                return f"Vendor: {vendor}"
+        # Properties first, then vendors (find() returns config order)
+        for entity in self.tagger.find(text, kinds=('property', 'vendor')):
+            return entity.label if entity.kind == 'property' else f"Vendor: {entity.label}"
 
-        # Then contacts
-        sender_email = email.get('from', {}).get('email', '').lower()
-        for contact_name, identifier in self.config['projects'].get('known_contacts', {}).items():
-            if identifier.lower() in sender_email:
-                return f"Contact: {contact_name}"
+        # Then contacts, by sender address
+        sender_email = email.get('from', {}).get('email', '')
+        for entity in self.tagger.find(sender_email, kinds=('contact',)):
+            return f"Contact: {entity.label}"
 
         return 'General'
 
     def process_emails(self) -> None:
         """Process all emails and extract insights."""
-        for email in self.today_emails:
-            # Extract action items
-            self.action_items.extend(self._extract_action_items(email))
-
-            # Extract questions (from received emails)
-            if email.get('type') == 'received':
-                self.questions.extend(self._extract_questions(email))
-
-            # Extract commitments (from sent emails)
-            self.commitments.extend(self._extract_commitments(email))
+        # Bodies are read from the export one email at a time
+        for email in with_bodies(self.today_emails):
+            # Extract action items, questions (received) and commitments (sent)
+            action_items, questions, commitments = self._extract_insights(email)
+            self.action_items.extend(action_items)
+            self.questions.extend(questions)
+            self.commitments.extend(commitments)
 
             # Categorize by project
             project = self._detect_project(email)
-            self.project_updates[project].append(email)
+            self.project_updates[project].append(email.record)
 
         # Sort by priority
         self.action_items.sort(key=lambda x: (0 if x['priority'] == 'high' else 1, x['date']), reverse=True)
 
-        print(f"\nExtracted insights:")
+        print("\nExtracted insights:")
         print(f"  Action items: {len(self.action_items)}")
         print(f"  Questions: {len(self.questions)}")
         print(f"  Commitments: {len(self.commitments)}")
@@ -387,19 +382,174 @@ class SummaryGenerator:
         print(f"\nSummary saved to: {summary_file}")
 
 
+def _newer_than_index(threads_file: Path, synced_at: Optional[str]) -> bool:
+    """Whether threads_file was written after the thread index was last synced."""
+    if not threads_file.exists():
+        return False
+    return synced_at is None or threads_file.stat().st_mtime > float(synced_at)
+
+
+# Generator reused by a pool worker for all of its days
+_worker_generator = None
+
+
+def _init_worker(warehouse_path: Path, config_path: Path, db_path: Path, threads: Dict[str, Any]) -> None:
+    """Process pool initializer: build one generator with the shared thread context."""
+    global _worker_generator
+    _worker_generator = SummaryGenerator(warehouse_path, config_path, db_path)
+    _worker_generator.threads = threads
+
+
+def summarize_day(generator: SummaryGenerator, date: str) -> Tuple[str, int, float, Optional[str]]:
+    """
+    Generate and save one day's summary, reusing the generator's thread context.
+
+    The generator's progress output is suppressed; range runs print one line
+    per day instead.
+
+    Returns:
+        (date, email count, seconds, error message or None)
+    """
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.reset_day()
+            generator.load_today_emails(date)
+            if generator.today_emails:
+                generator.process_emails()
+                generator.save_summary(generator.generate_markdown(date), date)
+        return date, len(generator.today_emails), time.perf_counter() - start, None
+    except Exception as e:
+        return date, 0, time.perf_counter() - start, str(e)
+
+
+def _summarize_day_worker(date: str) -> Tuple[str, int, float, Optional[str]]:
+    """Process pool entry point."""
+    return summarize_day(_worker_generator, date)
+
+
+def summarize_range(
+    warehouse_path: Path,
+    config_path: Path,
+    start_date: str,
+    end_date: str,
+    workers: int = 0,
+    db_path: Path = None
+) -> int:
+    """
+    Generate summaries for every exported day in a date range.
+
+    Thread context is loaded once for all conversations in the range and
+    handed to each worker process when it starts.
+
+    Args:
+        warehouse_path: Warehouse root
+        config_path: settings.json path
+        start_date: First day (YYYY-MM-DD)
+        end_date: Last day, inclusive (YYYY-MM-DD)
+        workers: Worker processes (0: one per CPU, 1: no pool)
+        db_path: Database with the thread index (default: data/wastewise.db)
+
+    Returns:
+        Number of summaries written
+    """
+    first = datetime.strptime(start_date, '%Y-%m-%d')
+    last = datetime.strptime(end_date, '%Y-%m-%d')
+    daily_dir = Path(warehouse_path) / 'daily'
+
+    dates = []
+    day = first
+    while day <= last:
+        if (daily_dir / f"{day:%Y-%m-%d}.json").exists():
+            dates.append(f"{day:%Y-%m-%d}")
+        day += timedelta(days=1)
+
+    if not dates:
+        print(f"No exports found between {start_date} and {end_date}.")
+        return 0
+
+    print(f"Days with exports: {len(dates)}")
+
+    # Thread context for every conversation in the range, loaded once
+    generator = SummaryGenerator(warehouse_path, config_path, db_path)
+    conversation_ids = set()
+    for date in dates:
+        try:
+            for record in iter_daily_records(daily_dir / f"{date}.json", fields=('conversation_id',)):
+                conversation_ids.add(record.get('conversation_id'))
+        except Exception as e:
+            print(f"Warning: Could not read {date}: {e}")
+    generator.load_threads(conversation_ids)
+
+    workers = min(workers or os.cpu_count() or 1, len(dates))
+    print(f"Summarizing with {workers} worker(s)...\n")
+
+    started = time.perf_counter()
+    written = 0
+
+    def report(result):
+        nonlocal written
+        date, count, seconds, error = result
+        if error:
+            print(f"  {date}: failed after {seconds:.2f}s: {error}")
+        elif count:
+            written += 1
+            print(f"  {date}: {count} emails in {seconds:.2f}s")
+        else:
+            print(f"  {date}: no emails ({seconds:.2f}s)")
+
+    if workers <= 1:
+        for date in dates:
+            report(summarize_day(generator, date))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(generator.warehouse_path, generator.config_path, generator.db_path, generator.threads)
+        ) as executor:
+            futures = [executor.submit(_summarize_day_worker, date) for date in dates]
+            for future in as_completed(futures):
+                report(future.result())
+
+    print(f"\nSummaries written: {written}/{len(dates)} in {time.perf_counter() - started:.2f}s")
+    return written
+
+
 def main():
     """Main execution function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate daily email summaries")
+    parser.add_argument("date", nargs="?", help="Day to summarize (YYYY-MM-DD, default: today)")
+    parser.add_argument("--from", dest="start_date", help="First day of a range (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end_date", help="Last day of a range, inclusive (default: today)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Worker processes for a range (default: one per CPU)")
+    args = parser.parse_args()
+
+    if args.end_date and not args.start_date:
+        parser.error("--to requires --from")
+
     # Determine paths
     script_dir = Path(__file__).parent
     warehouse_path = script_dir.parent / 'warehouse'
     config_path = script_dir.parent / 'config' / 'settings.json'
 
+    if args.start_date:
+        end_date = args.end_date or datetime.now().strftime('%Y-%m-%d')
+
+        print("Daily Email Summary Generator")
+        print("="*60)
+        print(f"Dates: {args.start_date} to {end_date}")
+        print(f"Warehouse path: {warehouse_path}")
+        print("="*60 + "\n")
+
+        if not summarize_range(warehouse_path, config_path, args.start_date, end_date, args.workers):
+            sys.exit(1)
+        return
+
     # Support date argument
-    date = None
-    if len(sys.argv) > 1:
-        date = sys.argv[1]
-    else:
-        date = datetime.now().strftime('%Y-%m-%d')
+    date = args.date or datetime.now().strftime('%Y-%m-%d')
 
     print("Daily Email Summary Generator")
     print("="*60)
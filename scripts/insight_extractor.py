@@ -0,0 +1,152 @@
+"""
+Single-pass extraction of action items, questions and commitments.
+
+The daily summary used to run every action and commitment pattern as its
+own re.finditer over the body, plus a sentence split for questions. All
+patterns are now compiled into one alternation with named groups, so each
+body is scanned once and every match is classified by the group it hit.
+
+Extracted items end at sentence punctuation or the end of the line; a
+commitment also ends where a request to the reader starts, so "I'll review
+it, can you send the copy" yields both.
+Quoted reply text is skipped: lines starting with '>' are ignored, and the
+scan stops at the first reply header ("-----Original Message-----",
+"From: ... Sent:", "On ... wrote:"), so requests from earlier messages in
+the thread are not extracted again.
+
+Usage:
+    from insight_extractor import InsightExtractor
+
+    extractor = InsightExtractor()
+    insights = extractor.extract(body, sent=True)
+    insights.actions, insights.questions, insights.commitments
+"""
+
+import re
+from typing import List, NamedTuple
+
+# Rest of a clause; items end at sentence punctuation or the end of the line
+_CLAUSE = r"[^.?!\n]+"
+
+# Openings of requests addressed to the reader
+REQUEST_TRIGGERS = r"can you|could you|please|need\s+you\s+to|would you|action required"
+
+# Rest of a commitment clause, which also ends before a request
+_COMMITMENT_CLAUSE = rf"(?:(?!\b(?:{REQUEST_TRIGGERS})\b)[^.?!\n])+"
+
+# Requests addressed to the reader
+ACTION_PATTERNS = [
+    rf"can you\s+{_CLAUSE}",
+    rf"could you\s+{_CLAUSE}",
+    rf"please\s+{_CLAUSE}",
+    rf"need\s+(?:you\s+)?to\s+{_CLAUSE}",
+    rf"would you\s+{_CLAUSE}",
+    rf"action required:?\s*{_CLAUSE}",
+    rf"(?:send|provide|share|forward)\s+{_CLAUSE}",
+    rf"(?:need|needed)\s+by\s+{_CLAUSE}",
+    rf"follow up\s+(?:on|with|about)\s+{_CLAUSE}",
+]
+
+# Promises made by the sender (only extracted from sent emails)
+COMMITMENT_PATTERNS = [
+    rf"I(?:'ll| will)\s+{_COMMITMENT_CLAUSE}",
+    rf"I(?:'m| am)\s+going to\s+{_COMMITMENT_CLAUSE}",
+    rf"I(?:'ve| have)\s+committed to\s+{_COMMITMENT_CLAUSE}",
+    rf"will have\s+(?:this\s+)?(?:to you|ready)\s+by\s+{_COMMITMENT_CLAUSE}",
+    rf"I can\s+{_COMMITMENT_CLAUSE}\s+by\s+{_COMMITMENT_CLAUSE}",
+    rf"(?:we|I)\s+(?:will|can)\s+provide\s+{_COMMITMENT_CLAUSE}",
+]
+
+# Start of the quoted previous message in a reply or forward
+REPLY_HEADER = (
+    r"^-{2,}\s*Original Message\s*-{2,}"
+    r"|^_{10,}[ \t]*$"
+    r"|^From:[^\n]*\n(?:[^\n]*\n){0,3}?(?:Sent|Date):"
+    r"|^On\s[^\n]{1,200}\swrote:"
+)
+
+# Questions containing these are footer boilerplate
+QUESTION_SKIP = ('unsubscribe', 'privacy policy', 'opt out')
+
+MAX_ITEM_CHARS = 150
+MAX_QUESTION_CHARS = 200
+
+
+class Insights(NamedTuple):
+    """Texts extracted from one email body, in body order."""
+    actions: List[str]
+    questions: List[str]
+    commitments: List[str]
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Limit text to a reasonable length."""
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+def _compile(commitments: bool) -> 're.Pattern':
+    """Build the combined pattern; earlier alternatives win at the same position."""
+    groups = [
+        rf"(?P<reply_header>{REPLY_HEADER})",
+        r"(?P<quoted>^>[^\n]*)",
+    ]
+    if commitments:
+        groups.append(rf"(?P<commitment>\b(?:{'|'.join(COMMITMENT_PATTERNS)}))")
+    groups += [
+        rf"(?P<action>\b(?:{'|'.join(ACTION_PATTERNS)}))",
+        r"(?P<question>\?)",
+        r"(?P<boundary>[.!]\s+|\n[ \t]*\n)",
+    ]
+    return re.compile('|'.join(groups), re.IGNORECASE | re.MULTILINE)
+
+
+class InsightExtractor:
+    """
+    Extracts action items, questions and commitments with one scan per body.
+
+    A question is the text from the start of its sentence up to its '?'.
+    Sentences end at '.', '!' or '?' followed by whitespace, or at a blank
+    line. Overlapping matches are reported once (the leftmost wins).
+    """
+
+    _patterns = {}  # commitments enabled -> compiled pattern, shared by instances
+
+    def extract(self, body: str, sent: bool = False) -> Insights:
+        """
+        Extract insights from an email body.
+
+        Args:
+            body: Plain-text email body
+            sent: Whether the email was sent by the mailbox owner; only sent
+                emails yield commitments
+
+        Returns:
+            Insights with truncated texts
+        """
+        pattern = self._patterns.get(sent)
+        if pattern is None:
+            pattern = self._patterns[sent] = _compile(commitments=sent)
+
+        insights = Insights([], [], [])
+        if not body:
+            return insights
+
+        sentence_start = 0
+        for match in pattern.finditer(body):
+            kind = match.lastgroup
+
+            if kind == 'reply_header':
+                break
+            elif kind == 'action':
+                insights.actions.append(_truncate(match.group().strip(), MAX_ITEM_CHARS))
+            elif kind == 'commitment':
+                insights.commitments.append(_truncate(match.group().strip().rstrip(',;:-').rstrip(), MAX_ITEM_CHARS))
+            elif kind == 'question':
+                question = body[sentence_start:match.end()].strip()
+                if question and not any(skip in question.lower() for skip in QUESTION_SKIP):
+                    insights.questions.append(_truncate(question, MAX_QUESTION_CHARS))
+                sentence_start = match.end()
+            else:  # boundary or quoted line
+                sentence_start = match.end()
+
+        return insights
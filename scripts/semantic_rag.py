@@ -7,6 +7,7 @@ replacing the primitive keyword matching in the original setup_gemini_rag.py.
 Key Features:
 - Uses Gemini text-embedding-004 (768 dimensions)
 - Pre-computes and caches embeddings for fast queries
+- Incremental rebuilds: only re-reads batch files whose fingerprint changed
 - Cosine similarity for semantic matching
 - Falls back to keyword search if embeddings unavailable
 
@@ -16,25 +17,43 @@ Usage:
     python semantic_rag.py --query "What issues has Waste Management caused?" --keyword-only
 """
 
-import google.generativeai as genai
 import os
 import sys
 from pathlib import Path
 import json
 from datetime import datetime
 import argparse
-import hashlib
 import math
 
+from email_corpus import (
+    ChunkRecord, chunk_hash, dedupe_records, iter_batch_chunks, load_corpus, read_chunk, record_key
+)
+
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 GEMINI_DIR = SCRIPT_DIR.parent / "warehouse" / "gemini"
 CONFIG_FILE = SCRIPT_DIR.parent / "config" / "gemini_config.json"
 EMBEDDINGS_CACHE_FILE = SCRIPT_DIR.parent / "config" / "embeddings_cache.json"
+EMBEDDINGS_META_FILE = SCRIPT_DIR.parent / "config" / "embeddings_cache.meta.json"
+SOURCE_MANIFEST_FILE = SCRIPT_DIR.parent / "config" / "embeddings_manifest.json"
 
 # Configuration
 MODEL_NAME = "gemini-2.0-flash-exp"  # For text generation
 EMBEDDING_MODEL = "models/text-embedding-004"  # For semantic embeddings (768 dims)
+MIN_CHUNK_CHARS = 50  # Skip empty or tiny chunks when embedding
+
+# Gemini SDK module, imported on first use by _genai(). Importing it eagerly
+# costs more than everything else in a --help/--info run combined.
+genai = None
+
+
+def _genai():
+    """Import the Gemini SDK on first use and return the module."""
+    global genai
+    if genai is None:
+        import google.generativeai as sdk
+        genai = sdk
+    return genai
 
 
 def cosine_similarity(vec_a: list, vec_b: list) -> float:
@@ -72,16 +91,65 @@ class SemanticRAGManager:
     4. Falling back to keyword search when needed
     """
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str = None, load_index: bool = False):
         """
-        Initialize Gemini API and load caches.
+        Initialize the manager.
+
+        The Gemini SDK is configured and the embeddings cache is parsed on
+        first use, so short-lived commands (--info, health checks) stay fast.
 
         Args:
             api_key: Google AI API key
+            load_index: If True, parse the embeddings cache immediately
         """
-        genai.configure(api_key=api_key)
+        self.api_key = api_key
+        self._sdk_configured = False
         self.config = self._load_config()
-        self.embeddings_cache = self._load_embeddings_cache()
+        self._embeddings_cache = self._load_embeddings_cache() if load_index else None
+
+    @property
+    def embeddings_cache(self) -> dict:
+        """Embeddings cache, loaded from disk on first access."""
+        if self._embeddings_cache is None:
+            self._embeddings_cache = self._load_embeddings_cache()
+        return self._embeddings_cache
+
+    @property
+    def index_loaded(self) -> bool:
+        """Whether the embeddings cache has been parsed yet."""
+        return self._embeddings_cache is not None
+
+    def _client(self):
+        """Return the Gemini SDK, configuring it with the API key on first use."""
+        sdk = _genai()
+        if not self._sdk_configured:
+            if not self.api_key:
+                raise RuntimeError("Google AI API key required for Gemini calls")
+            sdk.configure(api_key=self.api_key)
+            self._sdk_configured = True
+        return sdk
+
+    def cached_chunk_count(self) -> int:
+        """
+        Number of cached embeddings without parsing the full cache.
+
+        Uses the loaded cache if available, otherwise the small metadata
+        file written alongside the cache on every save.
+        """
+        if self._embeddings_cache is not None:
+            return len(self._embeddings_cache.get('chunks', {}))
+
+        if EMBEDDINGS_META_FILE.exists() and EMBEDDINGS_CACHE_FILE.exists():
+            try:
+                with open(EMBEDDINGS_META_FILE, 'r') as f:
+                    meta = json.load(f)
+                # Only trust the metadata if it describes the current cache file
+                if meta.get('cache_mtime') == EMBEDDINGS_CACHE_FILE.stat().st_mtime:
+                    return meta.get('chunk_count', 0)
+            except (json.JSONDecodeError, OSError):
+                pass
+
+        return len(self.embeddings_cache.get('chunks', {}))
 
     def _load_config(self) -> dict:
         """Load Gemini configuration from file."""
@@ -106,8 +174,39 @@ class SemanticRAGManager:
         EMBEDDINGS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
         with open(EMBEDDINGS_CACHE_FILE, 'w') as f:
             json.dump(self.embeddings_cache, f)
+        with open(EMBEDDINGS_META_FILE, 'w') as f:
+            json.dump({
+                'chunk_count': len(self.embeddings_cache['chunks']),
+                'cache_mtime': EMBEDDINGS_CACHE_FILE.stat().st_mtime,
+                'saved_at': datetime.now().isoformat()
+            }, f)
         print(f"Embeddings cache saved ({len(self.embeddings_cache['chunks'])} chunks)")
 
+    def _load_source_manifest(self) -> dict:
+        """
+        Load the batch file fingerprint manifest.
+
+        Maps each markdown batch file name to its size, mtime, content
+        digest and the chunk hashes and email IDs it produced on the last
+        build.
+        """
+        if SOURCE_MANIFEST_FILE.exists():
+            try:
+                with open(SOURCE_MANIFEST_FILE, 'r') as f:
+                    manifest = json.load(f)
+                if manifest.get('version') == 1:
+                    return manifest
+            except json.JSONDecodeError:
+                print("Warning: Source manifest corrupted, rescanning all batch files")
+        return {"files": {}, "version": 1}
+
+    def _save_source_manifest(self, manifest: dict):
+        """Save the batch file fingerprint manifest."""
+        SOURCE_MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+        manifest['updated_at'] = datetime.now().isoformat()
+        with open(SOURCE_MANIFEST_FILE, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
     def _get_embedding(self, text: str, task_type: str = "retrieval_document") -> list:
         """
         Get embedding for text using Gemini embedding model.
@@ -125,7 +224,7 @@ class SemanticRAGManager:
             if len(text) > max_chars:
                 text = text[:max_chars]
 
-            result = genai.embed_content(
+            result = self._client().embed_content(
                 model=EMBEDDING_MODEL,
                 content=text,
                 task_type=task_type
@@ -141,14 +240,18 @@ class SemanticRAGManager:
 
     def _chunk_hash(self, text: str) -> str:
         """Generate hash for a text chunk (for cache keying)."""
-        return hashlib.md5(text.encode('utf-8')).hexdigest()[:16]
+        return chunk_hash(text)
 
     def build_embeddings(self, force_rebuild: bool = False):
         """
         Build embeddings for all email chunks in the warehouse.
 
         This pre-computes embeddings for semantic search, avoiding
-        the need to embed at query time.
+        the need to embed at query time. Batch files whose size and mtime
+        (or content digest) match the source manifest are not re-read, and
+        embeddings for chunks no longer present in any batch file are purged.
+        Emails that appear in several batch files (same email ID or chunk
+        hash) are embedded once, from the first file in name order.
 
         Args:
             force_rebuild: If True, rebuild all embeddings even if cached
@@ -164,53 +267,118 @@ class SemanticRAGManager:
             print("Run email conversion first: python convert_to_gemini_format.py")
             return
 
-        # Gather all chunks from markdown files
-        all_chunks = []
+        cached = self.embeddings_cache['chunks']
+        manifest = self._load_source_manifest()
+        previous_files = manifest['files']
+        current_files = {}
 
-        for md_file in GEMINI_DIR.glob("*.md"):
-            print(f"Reading: {md_file.name}... ", end="")
+        # Skip batch files whose size and mtime match the manifest
+        changed_files = []
+        unchanged_files = 0
 
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+        for md_file in sorted(GEMINI_DIR.glob("*.md")):
+            stat = md_file.stat()
+            entry = previous_files.get(md_file.name)
 
-            # Split into individual emails (separated by ==== dividers)
-            emails = content.split("=" * 80)
-            email_count = 0
-
-            for email in emails:
-                email = email.strip()
-                if not email or len(email) < 50:  # Skip empty or tiny chunks
+            if (not force_rebuild and entry and 'email_ids' in entry
+                    and entry['size'] == stat.st_size
+                    and entry['mtime'] == stat.st_mtime):
+                current_files[md_file.name] = entry
+                unchanged_files += 1
+            else:
+                changed_files.append(md_file)
+
+        # Parse the remaining files (in parallel for large corpora)
+        records = {}  # chunk hash -> (md_file, record) for chunks read this run
+        corpus = load_corpus(changed_files, min_chars=MIN_CHUNK_CHARS)
+
+        for md_file, parsed in corpus.items():
+            stat = md_file.stat()
+            entry = previous_files.get(md_file.name)
+            print(f"Read: {md_file.name}... ", end="")
+
+            for record in parsed.records:
+                records.setdefault(record.hash, (md_file, record))
+
+            if (not force_rebuild and entry and 'email_ids' in entry
+                    and entry['digest'] == parsed.digest):
+                # Touched but not modified: refresh the fingerprint only
+                current_files[md_file.name] = {**entry, 'size': stat.st_size, 'mtime': stat.st_mtime}
+                print("unchanged (content digest match)")
+                continue
+
+            current_files[md_file.name] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'digest': parsed.digest,
+                'chunks': [r.hash for r in parsed.records],
+                'email_ids': [r.email_id for r in parsed.records]
+            }
+            print(f"{len(parsed.records)} emails")
+
+        deleted_files = sorted(set(previous_files) - set(current_files))
+
+        # Keep one chunk per email: the first occurrence by email ID or hash
+        canonical = {}  # chunk hash -> batch file name
+        seen = set()
+        duplicates = 0
+        for name in sorted(current_files):
+            entry = current_files[name]
+            for chunk, email_id in zip(entry['chunks'], entry['email_ids']):
+                keys = {record_key(email_id, chunk), record_key('', chunk)}
+                if keys & seen:
+                    duplicates += 1
                     continue
+                seen.update(keys)
+                canonical[chunk] = name
 
-                chunk_hash = self._chunk_hash(email)
-                all_chunks.append({
-                    'hash': chunk_hash,
-                    'text': email,
-                    'source': md_file.name
-                })
-                email_count += 1
+        print(f"\nUnchanged files skipped: {unchanged_files}")
+        print(f"Deleted files: {len(deleted_files)}")
+        print(f"Chunks from changed files: {len(records)}")
+        print(f"Duplicate emails skipped: {duplicates}")
 
-            print(f"{email_count} emails")
+        # Purge vectors no longer produced by any batch file, or duplicates
+        orphaned = [h for h in cached if h not in canonical]
+        for digest in orphaned:
+            del cached[digest]
+        if orphaned:
+            print(f"Purged orphaned embeddings: {len(orphaned)}")
 
-        print(f"\nTotal chunks: {len(all_chunks)}")
+        manifest['files'] = current_files
 
-        if not all_chunks:
+        if not current_files:
             print("ERROR: No email chunks found!")
             return
 
         # Determine which chunks need embedding
         if force_rebuild:
-            chunks_to_embed = all_chunks
+            missing = list(canonical)
             print("Force rebuild: embedding ALL chunks")
         else:
-            chunks_to_embed = [
-                c for c in all_chunks
-                if c['hash'] not in self.embeddings_cache['chunks']
-            ]
+            missing = [h for h in canonical if h not in cached]
+
+        # Chunks missing from the cache in files that were not re-read
+        # (e.g. after embedding errors) need their offsets
+        unread = sorted({canonical[h] for h in missing if h not in records})
+        for md_file, parsed in load_corpus([GEMINI_DIR / n for n in unread], min_chars=MIN_CHUNK_CHARS).items():
+            for record in parsed.records:
+                records.setdefault(record.hash, (md_file, record))
+
+        # Chunks that moved within rewritten files keep their embedding
+        for digest, (md_file, record) in records.items():
+            if digest in cached and canonical.get(digest) == md_file.name:
+                cached[digest]['source'] = md_file.name
+                cached[digest]['offset'] = [record.start, record.end]
+
+        chunks_to_embed = [records[h] for h in missing if h in records]
+        if not force_rebuild:
             print(f"New chunks to embed: {len(chunks_to_embed)}")
-            print(f"Already cached: {len(all_chunks) - len(chunks_to_embed)}")
+            print(f"Already cached: {len(canonical) - len(chunks_to_embed)}")
 
         if not chunks_to_embed:
+            if orphaned or current_files != previous_files:
+                self._save_embeddings_cache()
+                self._save_source_manifest(manifest)
             print("\nAll embeddings are up to date!")
             return
 
@@ -220,19 +388,21 @@ class SemanticRAGManager:
         embedded_count = 0
         error_count = 0
 
-        for i, chunk in enumerate(chunks_to_embed):
+        for i, (md_file, record) in enumerate(chunks_to_embed):
             # Progress indicator
             if (i + 1) % 10 == 0 or i == 0:
                 pct = int((i + 1) / len(chunks_to_embed) * 100)
                 print(f"  Progress: {i + 1}/{len(chunks_to_embed)} ({pct}%)", end="\r")
 
-            embedding = self._get_embedding(chunk['text'])
+            text = read_chunk(md_file, record)
+            embedding = self._get_embedding(text)
 
             if embedding:
-                self.embeddings_cache['chunks'][chunk['hash']] = {
+                self.embeddings_cache['chunks'][record.hash] = {
                     'embedding': embedding,
-                    'source': chunk['source'],
-                    'text_preview': chunk['text'][:200]  # Store preview for debugging
+                    'source': md_file.name,
+                    'offset': [record.start, record.end],
+                    'text_preview': text[:200]  # Store preview for debugging
                 }
                 embedded_count += 1
             else:
@@ -248,6 +418,7 @@ class SemanticRAGManager:
 
         # Final save
         self._save_embeddings_cache()
+        self._save_source_manifest(manifest)
         print()
 
     def _semantic_search(self, query: str, max_chunks: int = 10) -> list:
@@ -277,27 +448,30 @@ class SemanticRAGManager:
 
         # Score all chunks by cosine similarity
         print(f"  Scoring {len(self.embeddings_cache['chunks'])} chunks...", end=" ")
-        scored_chunks = []
-
-        for chunk_hash, chunk_data in self.embeddings_cache['chunks'].items():
-            similarity = cosine_similarity(query_embedding, chunk_data['embedding'])
-
-            # Find full text from source files
-            full_text = self._get_chunk_text(chunk_hash)
-            if full_text:
-                scored_chunks.append((similarity, full_text))
-
+        scored_chunks = [
+            (cosine_similarity(query_embedding, chunk_data['embedding']), digest)
+            for digest, chunk_data in self.embeddings_cache['chunks'].items()
+        ]
         print("OK")
 
-        # Sort by similarity (highest first) and return top chunks
+        # Sort by similarity (highest first)
         scored_chunks.sort(reverse=True, key=lambda x: x[0])
 
         # Show top scores for debugging
         if scored_chunks:
             print(f"  Top similarity scores: {[round(s[0], 3) for s in scored_chunks[:5]]}")
 
+        # Fetch full text for the top chunks only
+        results = []
+        for similarity, digest in scored_chunks:
+            full_text = self._get_chunk_text(digest)
+            if full_text:
+                results.append(full_text)
+            if len(results) >= max_chunks:
+                break
+
         # Return just the text (without scores) for compatibility
-        return [chunk[1] for chunk in scored_chunks[:max_chunks]]
+        return results
 
     def _get_chunk_text(self, chunk_hash: str) -> str:
         """Retrieve full chunk text from source files."""
@@ -309,14 +483,18 @@ class SemanticRAGManager:
         if not source_file.exists():
             return chunk_data.get('text_preview', '')
 
-        # Read source file and find matching chunk
-        with open(source_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Read the chunk directly when its byte offsets are known
+        if chunk_data.get('offset'):
+            start, end = chunk_data['offset']
+            text = read_chunk(source_file, ChunkRecord(chunk_hash, start, end, '', '', '', 0))
+            if self._chunk_hash(text) == chunk_hash:
+                return text
 
-        for email in content.split("=" * 80):
-            email = email.strip()
-            if self._chunk_hash(email) == chunk_hash:
-                return email
+        # Offsets missing or stale: stream the file until the chunk turns up
+        for start, end, text in iter_batch_chunks(source_file):
+            if self._chunk_hash(text) == chunk_hash:
+                chunk_data['offset'] = [start, end]
+                return text
 
         return chunk_data.get('text_preview', '')
 
@@ -334,31 +512,17 @@ class SemanticRAGManager:
         # Extract keywords from query
         keywords = query.lower().split()
         keywords = [k for k in keywords if len(k) > 3]  # Filter short words
+        if not keywords:
+            return []
 
-        chunks = []
-
-        # Search through markdown files
-        for md_file in GEMINI_DIR.glob("*.md"):
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Split into individual emails (separated by ====)
-            emails = content.split("=" * 80)
-
-            for email in emails:
-                if not email.strip():
-                    continue
-
-                # Score based on keyword matches
-                email_lower = email.lower()
-                score = sum(1 for kw in keywords if kw in email_lower)
-
-                if score > 0:
-                    chunks.append((score, email.strip()))
+        # Score every email chunk across the batch files, once per email
+        corpus = load_corpus(GEMINI_DIR.glob("*.md"), keywords=keywords)
+        unique, _ = dedupe_records(corpus)
+        chunks = [(record.score, md_file, record) for md_file, record in unique]
 
-        # Sort by score and take top chunks
+        # Sort by score and read text for the top chunks
         chunks.sort(reverse=True, key=lambda x: x[0])
-        return [chunk[1] for chunk in chunks[:max_chunks]]
+        return [read_chunk(md_file, record) for _, md_file, record in chunks[:max_chunks]]
 
     def query(self, question: str, max_results: int = 5, keyword_only: bool = False):
         """
@@ -403,7 +567,7 @@ class SemanticRAGManager:
             context = "\n\n---\n\n".join(relevant_chunks[:max_results])
 
             # Configure model
-            model = genai.GenerativeModel(model_name=MODEL_NAME)
+            model = self._client().GenerativeModel(model_name=MODEL_NAME)
 
             # Create prompt with context
             prompt = f"""Based on the following email exchanges from our waste management correspondence, please answer this question:
@@ -455,7 +619,7 @@ Please provide a comprehensive answer based on the emails above. Include specifi
         print(f"Total Size: {total_size:.2f}MB")
 
         print(f"\nEmbeddings Cache:")
-        chunk_count = len(self.embeddings_cache.get('chunks', {}))
+        chunk_count = self.cached_chunk_count()
         print(f"  Cached Chunks: {chunk_count}")
 
         if chunk_count > 0:
@@ -499,9 +663,9 @@ Examples:
 
     args = parser.parse_args()
 
-    # Get API key
+    # Get API key (only needed for commands that call Gemini)
     api_key = args.api_key or os.environ.get('GOOGLE_API_KEY')
-    if not api_key:
+    if not api_key and (args.build_embeddings or args.query):
         print("ERROR: API key required.")
         print("  Use --api-key YOUR_KEY")
         print("  Or set GOOGLE_API_KEY environment variable")
@@ -13,7 +13,6 @@ Usage:
     python setup_gemini_rag.py --api-key YOUR_API_KEY --query "contamination issues"
 """
 
-import google.generativeai as genai
 import os
 import sys
 from pathlib import Path
@@ -21,6 +20,8 @@ import json
 from datetime import datetime
 import argparse
 
+from email_corpus import dedupe_records, load_corpus, read_chunk
+
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 GEMINI_DIR = SCRIPT_DIR.parent / "warehouse" / "gemini"
@@ -29,21 +30,42 @@ CONFIG_FILE = SCRIPT_DIR.parent / "config" / "gemini_config.json"
 # Configuration
 MODEL_NAME = "gemini-1.5-flash"  # Using stable model with better quota limits
 
+# Gemini SDK module, imported on first use by _genai()
+genai = None
+
+
+def _genai():
+    """Import the Gemini SDK on first use and return the module."""
+    global genai
+    if genai is None:
+        import google.generativeai as sdk
+        genai = sdk
+    return genai
+
 
 class GeminiRAGManager:
     """Manage Gemini File Search store for email RAG system."""
 
     def __init__(self, api_key: str):
         """
-        Initialize Gemini API.
+        Initialize the manager. The Gemini SDK is configured on first use.
 
         Args:
             api_key: Google AI API key
         """
-        genai.configure(api_key=api_key)
+        self.api_key = api_key
+        self._sdk_configured = False
         self.model = None
         self.config = self._load_config()
 
+    def _client(self):
+        """Return the Gemini SDK, configuring it with the API key on first use."""
+        sdk = _genai()
+        if not self._sdk_configured:
+            sdk.configure(api_key=self.api_key)
+            self._sdk_configured = True
+        return sdk
+
     def _load_config(self) -> dict:
         """Load Gemini configuration from file."""
         if CONFIG_FILE.exists():
@@ -97,7 +119,7 @@ class GeminiRAGManager:
         print("=" * 80)
 
         try:
-            for file in genai.list_files():
+            for file in self._client().list_files():
                 print(f"\nFile: {file.display_name}")
                 print(f"  URI: {file.uri}")
                 print(f"  Size: {file.size_bytes / (1024*1024):.2f}MB")
@@ -133,7 +155,7 @@ class GeminiRAGManager:
 
             try:
                 # Upload file using Files API
-                uploaded_file = genai.upload_file(
+                uploaded_file = self._client().upload_file(
                     path=str(file_path),
                     display_name=file_path.name
                 )
@@ -201,7 +223,7 @@ class GeminiRAGManager:
             context = "\n\n---\n\n".join(relevant_chunks)
 
             # Configure model
-            model = genai.GenerativeModel(model_name=MODEL_NAME)
+            model = self._client().GenerativeModel(model_name=MODEL_NAME)
 
             # Create prompt with context
             prompt = f"""Based on the following email exchanges, please answer this question:
@@ -255,30 +277,17 @@ Please provide a comprehensive answer based on the emails above."""
         keywords = query.lower().split()
         keywords = [k for k in keywords if len(k) > 3]  # Filter short words
 
-        chunks = []
-
-        # Search through markdown files
-        for md_file in GEMINI_DIR.glob("*.md"):
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Split into individual emails (separated by ====)
-            emails = content.split("=" * 80)
-
-            for email in emails:
-                if not email.strip():
-                    continue
-
-                # Score based on keyword matches
-                email_lower = email.lower()
-                score = sum(1 for kw in keywords if kw in email_lower)
+        if not keywords:
+            return []
 
-                if score > 0:
-                    chunks.append((score, email.strip()))
+        # Score every email chunk across the batch files, once per email
+        corpus = load_corpus(GEMINI_DIR.glob("*.md"), keywords=keywords)
+        unique, _ = dedupe_records(corpus)
+        chunks = [(record.score, md_file, record) for md_file, record in unique]
 
-        # Sort by score and take top chunks
+        # Sort by score and read text for the top chunks
         chunks.sort(reverse=True, key=lambda x: x[0])
-        return [chunk[1] for chunk in chunks[:max_chunks]]
+        return [read_chunk(md_file, record) for _, md_file, record in chunks[:max_chunks]]
 
     def get_store_info(self):
         """Display information about the configured store."""
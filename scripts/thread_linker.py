@@ -0,0 +1,147 @@
+"""
+Thread reconstruction for emails without an Outlook conversation_id.
+
+Such emails used to be grouped by their topic with a single RE:/FW: prefix
+removed, so "RE: FW: Pickup" and "Pickup" landed in different threads,
+while unrelated emails that happened to share a generic subject ("Invoice")
+were merged no matter who sent them or when.
+
+normalize_subject() strips any number of reply/forward prefixes and mail
+gateway tags. link_messages() then splits the emails of one normalized
+topic into threads: two emails are linked when they share a correspondent
+and are no more than a time window apart. Links are merged with a
+union-find keyed by message, and each participant only has to be compared
+with the last email it appeared on, so linking is near-linear in the
+number of emails.
+
+Usage:
+    from thread_linker import link_messages, normalize_subject
+
+    topic = normalize_subject("RE: Fwd: [EXTERNAL] Pickup schedule")  # "Pickup schedule"
+    for group in link_messages(messages, window_days=14):
+        thread = [messages[i] for i in group]
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set
+
+# Maximum gap between consecutive emails of one thread
+DEFAULT_LINK_WINDOW_DAYS = 14
+
+# Reply/forward markers (English, German, Nordic) with optional counters
+# ("RE[2]:"), and tags added by mail gateways
+_SUBJECT_PREFIX = re.compile(
+    r'^\s*(?:(?:re|fw|fwd|aw|wg|sv)\s*(?:\[\d+\]|\(\d+\))?\s*:|\[(?:external|ext)\]|external:)\s*',
+    re.IGNORECASE
+)
+
+
+def normalize_subject(subject: str) -> str:
+    """Strip all leading reply/forward prefixes and gateway tags from a subject."""
+    if not subject:
+        return ""
+
+    while True:
+        match = _SUBJECT_PREFIX.match(subject)
+        if not match:
+            break
+        subject = subject[match.end():]
+
+    return ' '.join(subject.split())
+
+
+class UnionFind:
+    """Disjoint sets over hashable keys (union by size, path halving)."""
+
+    def __init__(self):
+        self._parent = {}
+        self._size = {}
+
+    def find(self, key: Hashable) -> Hashable:
+        """Return the representative of key's set, adding key if it is new."""
+        parent = self._parent
+        if key not in parent:
+            parent[key] = key
+            self._size[key] = 1
+            return key
+
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    def union(self, a: Hashable, b: Hashable) -> Hashable:
+        """Merge the sets containing a and b; returns the new representative."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+        return root_a
+
+
+def _parse_date(value: str) -> Optional[datetime]:
+    """Parse an exported ISO date, or None."""
+    try:
+        return datetime.fromisoformat(value[:19]) if value else None
+    except ValueError:
+        return None
+
+
+def _correspondents(message: Dict[str, Any]) -> Set[str]:
+    """Addresses a message is linked through (lowercased)."""
+    participants = {p.lower() for p in message.get('participants', []) if p}
+    sender = message.get('from', '').lower()
+
+    if message.get('type') == 'received' and sender:
+        return {sender}
+    if message.get('type') == 'sent' and participants - {sender}:
+        return participants - {sender}
+    return participants
+
+
+def link_messages(messages: Sequence[Dict[str, Any]], window_days: int = DEFAULT_LINK_WINDOW_DAYS) -> List[List[int]]:
+    """
+    Split the messages of one normalized topic into threads.
+
+    A message is linked to the previous message of each of its
+    correspondents when the two are at most window_days apart (messages
+    without a date are always in the window). Correspondents are the sender
+    of a received message and the recipients of a sent one; the exported
+    mailbox is on every message, so it does not link messages by itself.
+    Messages of other types use all their participants.
+
+    Args:
+        messages: Dicts with 'date', 'participants', and optionally 'from'
+            and 'type', as stored in thread state
+        window_days: Maximum gap between linked messages
+
+    Returns:
+        Lists of message indexes, one per thread, each in date order;
+        threads are ordered by their first message
+    """
+    window = timedelta(days=window_days)
+    order = sorted(range(len(messages)), key=lambda i: (messages[i].get('date') or '', i))
+
+    sets = UnionFind()
+    last_seen = {}  # participant -> (message index, date)
+
+    for i in order:
+        sets.find(i)
+        when = _parse_date(messages[i].get('date', ''))
+
+        for participant in _correspondents(messages[i]):
+            previous = last_seen.get(participant)
+            if previous is not None:
+                j, then = previous
+                if when is None or then is None or when - then <= window:
+                    sets.union(i, j)
+            last_seen[participant] = (i, when)
+
+    groups = {}
+    for i in order:
+        groups.setdefault(sets.find(i), []).append(i)
+    return list(groups.values())
@@ -0,0 +1,401 @@
+"""
+Streaming reader for the daily email exports in warehouse/daily.
+
+Daily exports are a single JSON object with an "emails" array. Backfill
+runs can produce files with thousands of emails and full bodies, so
+iter_daily_emails() decodes the array one element at a time instead of
+loading the whole file. The ijson package is used when installed; otherwise
+a pure-Python fallback feeds the stdlib decoder from a small rolling buffer.
+Either way memory is bounded by the largest single email, not the file.
+
+The UTF-8 BOM written by PowerShell's Out-File is skipped.
+
+The same Outlook email can appear in several daily exports; email_keys()
+gives the hashed keys (email ID and content digest) used to spot repeats,
+and file_digest() the block-wise sha256 used to tell changed exports from
+touched ones.
+
+Consumers that keep many emails in memory load them as EmailRecord objects
+(load_daily_records), projecting only the fields they need. Fields that
+were not loaded, typically body_text, are read back from the export on
+access; with_bodies() attaches bodies one at a time in a single pass.
+
+Usage:
+    from warehouse_io import iter_daily_emails
+
+    for email in iter_daily_emails(DAILY_DIR / "2025-06-03.json"):
+        print(email['subject'])
+
+    records = load_daily_records(path, fields=('id', 'date', 'from', 'subject'))
+    records[0].get('from', {}).get('email')
+"""
+
+import codecs
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Characters decoded per read in the pure-Python reader
+READ_CHUNK_CHARS = 64 * 1024
+
+# Bytes hashed per read by file_digest()
+DIGEST_BLOCK_BYTES = 1024 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+# Exported email fields an EmailRecord can hold ('from' is split in two)
+RECORD_FIELDS = (
+    'id', 'date', 'type', 'subject', 'from_name', 'from_email', 'to', 'cc',
+    'conversation_id', 'conversation_topic', 'body_preview', 'body_text',
+    'importance', 'categories', 'is_reply', 'has_attachments',
+)
+
+# Short, highly repeated values shared between records
+_INTERNED_FIELDS = ('type', 'from_name', 'from_email', 'conversation_id', 'conversation_topic', 'importance')
+
+_MISSING = object()
+
+
+def iter_daily_emails(path: Path, use_ijson: bool = None) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate the emails in a daily export without loading the whole file.
+
+    Args:
+        path: Daily export JSON file
+        use_ijson: Force (True) or disable (False) the ijson backend
+            (default: use it when installed)
+
+    Yields:
+        Email dicts, in file order
+
+    Raises:
+        ValueError: If the file is not valid JSON (json.JSONDecodeError
+            from the fallback reader)
+    """
+    if use_ijson is None:
+        use_ijson = IJSON_AVAILABLE
+
+    with open(path, 'rb') as f:
+        if f.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+            f.seek(0)
+
+        if use_ijson:
+            try:
+                yield from ijson.items(f, 'emails.item', use_float=True)
+            except ijson.JSONError as e:
+                raise ValueError(f"Invalid JSON in {path}: {e}") from e
+        else:
+            yield from _StreamingArrayReader(f).items('emails')
+
+
+def email_keys(email: Dict[str, Any]) -> Tuple[str, ...]:
+    """
+    Deduplication keys for an exported email.
+
+    Two emails are the same if they share an Outlook ID or have the same
+    subject, date, sender and body. Keys are short hashes so they can be
+    persisted cheaply.
+
+    Returns:
+        (id_key, content_key), or (content_key,) for emails without an ID
+    """
+    content = json.dumps(
+        [email.get('subject', ''), email.get('date', ''), email.get('from', ''), email.get('body_text', '')],
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    keys = []
+    if email.get('id'):
+        keys.append(hashlib.sha1(f"id:{email['id']}".encode('utf-8')).hexdigest()[:16])
+    keys.append(hashlib.sha1(f"content:{content}".encode('utf-8')).hexdigest()[:16])
+    return tuple(keys)
+
+
+def file_digest(path: Path) -> str:
+    """sha256 digest of a file, read in blocks so memory stays bounded."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(DIGEST_BLOCK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EmailRecord:
+    """
+    Compact view of an exported email.
+
+    Only projected fields are stored; the rest are read back from the
+    source export on access (one scan of the file per access, so project
+    anything read for every email). get() and [] accept the export's keys,
+    including 'from' as a {'name', 'email'} dict, so code written against
+    the exported dicts works unchanged.
+    """
+
+    __slots__ = RECORD_FIELDS + ('source', 'index')
+
+    def __init__(self, email: Dict[str, Any], fields: Iterable[str], source: Path = None, index: int = -1):
+        self.source = source
+        self.index = index
+
+        wanted = set(fields)
+        sender = email.get('from') or {}
+        values = {
+            'from_name': sender.get('name', '') if isinstance(sender, dict) else '',
+            'from_email': sender.get('email', '') if isinstance(sender, dict) else str(sender),
+        }
+
+        for field in RECORD_FIELDS:
+            key = 'from' if field in ('from_name', 'from_email') else field
+            if key not in wanted:
+                value = _MISSING
+            elif field in values:
+                value = values[field]
+            else:
+                value = email.get(field, _MISSING)
+
+            if field in _INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            elif isinstance(value, list):
+                value = tuple(sys.intern(v) if isinstance(v, str) else v for v in value)
+            setattr(self, field, value)
+
+    def __repr__(self) -> str:
+        return f"EmailRecord(id={self.get('id')!r}, subject={self.get('subject')!r})"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict.get() over the exported keys, loading unprojected fields lazily."""
+        if key == 'from':
+            name, email = self._value('from_name'), self._value('from_email')
+            if name is _MISSING:
+                return default
+            return {'name': name, 'email': email}
+
+        if key not in RECORD_FIELDS:
+            return default
+
+        value = self._value(key)
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Exported-dict form of the projected fields."""
+        result = {}
+        for field in RECORD_FIELDS:
+            value = getattr(self, field)
+            if value is _MISSING or field in ('from_name', 'from_email'):
+                continue
+            result[field] = list(value) if isinstance(value, tuple) else value
+        if self.from_name is not _MISSING:
+            result['from'] = {'name': self.from_name, 'email': self.from_email}
+        return result
+
+    def _value(self, field: str) -> Any:
+        """A field's value, read back from the source export if it was not projected."""
+        value = getattr(self, field)
+        if value is not _MISSING or self.source is None:
+            return value
+
+        email = _email_at(self.source, self.index)
+        # The export was rewritten since loading; don't return another email's data
+        if email is None or (self.id is not _MISSING and email.get('id', '') != self.id):
+            return _MISSING
+        if field in ('from_name', 'from_email'):
+            sender = email.get('from') or {}
+            return sender.get(field[5:], '') if isinstance(sender, dict) else ''
+        return email.get(field, _MISSING)
+
+
+def _email_at(path: Path, index: int) -> Optional[Dict[str, Any]]:
+    """The email at a position in a daily export, or None."""
+    for position, email in enumerate(iter_daily_emails(path)):
+        if position == index:
+            return email
+    return None
+
+
+def iter_daily_records(path: Path, fields: Optional[Iterable[str]] = None) -> Iterator[EmailRecord]:
+    """
+    Iterate a daily export as EmailRecord objects.
+
+    Args:
+        path: Daily export JSON file
+        fields: Exported keys to keep in memory (default: all but body_text)
+
+    Yields:
+        EmailRecord per email, in file order
+    """
+    if fields is None:
+        fields = [f for f in RECORD_FIELDS if f not in ('from_name', 'from_email', 'body_text')] + ['from']
+    fields = tuple(fields)
+
+    for index, email in enumerate(iter_daily_emails(path)):
+        yield EmailRecord(email, fields, source=path, index=index)
+
+
+def load_daily_records(path: Path, fields: Optional[Iterable[str]] = None) -> List[EmailRecord]:
+    """Load a daily export as a list of EmailRecord objects (see iter_daily_records)."""
+    return list(iter_daily_records(path, fields))
+
+
+class _BodyView:
+    """An EmailRecord with body_text attached for the duration of one iteration."""
+
+    __slots__ = ('record', 'body_text')
+
+    def __init__(self, record: EmailRecord, body_text: str):
+        self.record = record
+        self.body_text = body_text
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == 'body_text':
+            return self.body_text
+        return self.record.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'body_text':
+            return self.body_text
+        return self.record[key]
+
+
+def with_bodies(records: Iterable[EmailRecord]) -> Iterator[Any]:
+    """
+    Yield records with body_text available, reading each source file once.
+
+    Records must be in file order within each source (as loaded). Only the
+    current body is held in memory.
+
+    Yields:
+        Views supporting get()/[] like the record plus body_text; the
+        record itself is view.record
+    """
+    emails = None
+    source = None
+    position = -1
+    email = None
+
+    for record in records:
+        if record.body_text is not _MISSING or record.source is None:
+            yield _BodyView(record, record.get('body_text', ''))
+            continue
+
+        if record.source != source or record.index < position:
+            emails = iter_daily_emails(record.source)
+            source = record.source
+            position = -1
+
+        while position < record.index:
+            email = next(emails, None)
+            position += 1
+            if email is None:
+                break
+
+        body = email.get('body_text', '') if email is not None and position == record.index else ''
+        yield _BodyView(record, body)
+
+
+class _StreamingArrayReader:
+    """
+    Incremental reader for one array-valued key of a top-level JSON object.
+
+    Values are decoded with json.JSONDecoder.raw_decode from a buffer that is
+    refilled as needed; consumed text is dropped so the buffer only ever
+    holds the current element plus one read.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def items(self, key: str) -> Iterator[Any]:
+        """Yield the elements of the array stored under key."""
+        self._expect('{')
+        if self._peek() == '}':
+            return
+
+        while True:
+            name = self._value()
+            self._expect(':')
+
+            if name == key and self._peek() == '[':
+                self._expect('[')
+                if self._peek() == ']':
+                    self.pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                self._value()  # Skip other members (export_date, count, ...)
+
+            if self._expect(',}') == '}':
+                return
+
+    def _fill(self, min_chars: int = READ_CHUNK_CHARS) -> bool:
+        """Read more input into the buffer; False at end of file."""
+        if self.eof:
+            return False
+
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+        data = self.f.read(max(min_chars, READ_CHUNK_CHARS))
+        self.buf += self.decoder.decode(data, final=not data)
+        if not data:
+            self.eof = True
+        return True
+
+    def _peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars: str) -> str:
+        """Consume one of chars (after whitespace) and return it."""
+        char = self._peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expected one of {chars!r}", self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed."""
+        self._peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Possibly truncated; grow the read so large values stay linear
+                if not self._fill(len(self.buf)):
+                    raise
+                continue
+
+            # A number at the end of the buffer may continue in the next read
+            if end == len(self.buf) and self._fill():
+                continue
+
+            self.pos = end
+            return value
@@ -0,0 +1,245 @@
+"""
+Unit tests for incremental thread aggregation.
+
+Run with: pytest tests/test_aggregate_threads.py -v
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from aggregate_threads import ThreadAggregator
+from lib.database import THREADS_SYNCED_KEY, WastewiseDB
+
+
+def _day(offset: int) -> str:
+    """Date string offset days before today."""
+    return (datetime.now() - timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+def _email(email_id: str, day: str, conversation_id: str, sender: str = "bob@wm.com") -> dict:
+    """Build a minimal exported email."""
+    return {
+        'id': email_id,
+        'date': f"{day}T10:00:00",
+        'type': 'received',
+        'from': {'name': 'Bob', 'email': sender},
+        'to': ['waste@example.com'],
+        'subject': f"RE: Pickup {conversation_id}",
+        'conversation_id': conversation_id,
+        'conversation_topic': f"Pickup {conversation_id}",
+        'body_preview': 'Pickup moves to Tuesday at Avana',
+    }
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    """Warehouse with a daily folder and a projects config."""
+    (tmp_path / 'daily').mkdir()
+    config = tmp_path / 'settings.json'
+    config.write_text(json.dumps({'projects': {'known_properties': ['Avana']}}), encoding='utf-8')
+    return tmp_path, config
+
+
+def _write_day(warehouse_path: Path, day: str, emails: list):
+    """Write a daily export with a PowerShell BOM."""
+    payload = json.dumps({'export_date': day, 'emails': emails}).encode('utf-8')
+    (warehouse_path / 'daily' / f"{day}.json").write_bytes(b'\xef\xbb\xbf' + payload)
+
+
+def _run(warehouse, days_back: int = 90, full: bool = False, db: WastewiseDB = None) -> ThreadAggregator:
+    """One aggregation run, persisting state like main() does."""
+    warehouse_path, config = warehouse
+    state = warehouse_path / 'threads' / 'thread_state.json'
+    aggregator = ThreadAggregator(warehouse_path, config)
+    if not full:
+        aggregator.load_state(state)
+    aggregator.update_threads(days_back=days_back)
+    aggregator.save_state(state)
+    aggregator.save_results(warehouse_path / 'threads' / 'threads_current.json')
+    if db is not None:
+        aggregator.save_to_database(db, full=full)
+    return aggregator
+
+
+def _output(warehouse) -> dict:
+    """threads_current.json keyed by thread ID, without timestamps."""
+    data = json.loads((warehouse[0] / 'threads' / 'threads_current.json').read_text(encoding='utf-8'))
+    return {t['thread_id']: t for t in data['threads']}
+
+
+class TestIncrementalAggregation:
+    """Tests for merging daily exports into persisted thread state."""
+
+    def test_incremental_matches_full_rebuild(self, warehouse):
+        """Test that merging day by day equals rebuilding from scratch."""
+        warehouse_path, _ = warehouse
+        _write_day(warehouse_path, _day(3), [_email('A', _day(3), 'C1'), _email('B', _day(3), 'C2')])
+        _run(warehouse)
+        _write_day(warehouse_path, _day(1), [_email('C', _day(1), 'C1', sender='amy@republic.com')])
+        _run(warehouse)
+        incremental = _output(warehouse)
+
+        _run(warehouse, full=True)
+        assert _output(warehouse) == incremental
+
+        c1 = incremental['C1']
+        assert c1['message_count'] == 2
+        assert c1['participants'] == ['amy@republic.com', 'bob@wm.com', 'waste@example.com']
+        assert c1['projects_detected'] == ['Property: Avana']
+        assert c1['status'] == 'active'
+        assert 'day' not in c1['messages'][0]
+
+    def test_unchanged_days_not_reread(self, warehouse, capsys):
+        """Test that a second run merges nothing."""
+        warehouse_path, _ = warehouse
+        _write_day(warehouse_path, _day(1), [_email('A', _day(1), 'C1')])
+        _run(warehouse)
+
+        capsys.readouterr()
+        aggregator = _run(warehouse)
+
+        assert "New or changed: 0" in capsys.readouterr().out
+        assert aggregator.threads['C1']['message_count'] == 1
+
+    def test_changed_day_replaces_messages(self, warehouse):
+        """Test that re-exporting a day replaces its messages instead of adding them."""
+        warehouse_path, _ = warehouse
+        _write_day(warehouse_path, _day(1), [_email('A', _day(1), 'C1'), _email('B', _day(1), 'C2')])
+        _run(warehouse)
+
+        _write_day(warehouse_path, _day(1), [_email('A', _day(1), 'C1')])
+        aggregator = _run(warehouse)
+
+        assert set(aggregator.threads) == {'C1'}
+        assert aggregator.threads['C1']['message_count'] == 1
+
+    def test_expired_days_evicted(self, warehouse):
+        """Test that threads older than the retention window are dropped."""
+        warehouse_path, _ = warehouse
+        _write_day(warehouse_path, _day(20), [_email('A', _day(20), 'OLD'), _email('B', _day(20), 'C1')])
+        _write_day(warehouse_path, _day(1), [_email('C', _day(1), 'C1')])
+        _run(warehouse, days_back=30)
+
+        aggregator = _run(warehouse, days_back=10)
+
+        assert set(aggregator.threads) == {'C1'}
+        assert aggregator.threads['C1']['message_count'] == 1
+        assert aggregator.projects['Property: Avana'] == ['C1']
+
+    def test_threads_without_conversation_id_linked(self, warehouse):
+        """Test that prefixed subjects from the same correspondent form one thread."""
+        warehouse_path, _ = warehouse
+        first = {**_email('A', _day(3), ''), 'subject': 'Pickup', 'conversation_topic': ''}
+        reply = {**_email('B', _day(2), ''), 'subject': 'RE: FW: Pickup', 'conversation_topic': ''}
+        other = {**_email('C', _day(1), '', sender='amy@republic.com'), 'subject': 'Re: Pickup',
+                 'conversation_topic': ''}
+        _write_day(warehouse_path, _day(3), [first])
+        _run(warehouse)
+        _write_day(warehouse_path, _day(2), [reply])
+        _write_day(warehouse_path, _day(1), [other])
+        aggregator = _run(warehouse)
+
+        assert aggregator.threads['Pickup']['message_count'] == 2
+        assert aggregator.threads['Pickup (2)']['participants'] == ['amy@republic.com', 'waste@example.com']
+
+        _run(warehouse, full=True)
+        assert set(_output(warehouse)) == {'Pickup', 'Pickup (2)'}
+
+    def test_relinked_when_day_removed(self, warehouse):
+        """Test that deleting a day's emails relinks the rest of the topic."""
+        warehouse_path, _ = warehouse
+        _write_day(warehouse_path, _day(3), [{**_email('A', _day(3), ''), 'conversation_topic': 'Pickup'}])
+        _write_day(warehouse_path, _day(1), [{**_email('B', _day(1), ''), 'conversation_topic': 'RE: Pickup'}])
+        _run(warehouse)
+
+        (warehouse_path / 'daily' / f"{_day(3)}.json").unlink()
+        aggregator = _run(warehouse)
+
+        assert set(aggregator.threads) == {'Pickup'}
+        assert aggregator.threads['Pickup']['message_count'] == 1
+
+
+class TestThreadIndex:
+    """Tests for syncing threads into the database."""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        """Empty database using the project schema."""
+        return WastewiseDB(tmp_path / 'wastewise.db')
+
+    def test_threads_and_emails_indexed(self, warehouse, db):
+        """Test that threads and their messages are written to the database."""
+        warehouse_path, _ = warehouse
+        _write_day(warehouse_path, _day(1), [_email('A', _day(1), 'C1'), _email('B', _day(1), 'C2')])
+        _run(warehouse, db=db)
+
+        threads = db.get_threads(['C1', 'C2', 'MISSING'])
+        assert set(threads) == {'C1', 'C2'}
+        assert threads['C1']['message_count'] == 1
+        assert threads['C1']['status'] == 'active'
+        assert threads['C1']['projects_detected'] == ['Property: Avana']
+
+        with db._connect() as conn:
+            row = conn.execute("SELECT * FROM email_index WHERE email_id = 'A'").fetchone()
+        assert row['thread_id'] == 'C1'
+        assert row['sender'] == 'bob@wm.com'
+        assert json.loads(row['properties_mentioned']) == ['Avana']
+        assert db.get_metadata(THREADS_SYNCED_KEY) is not None
+
+    def test_only_changed_threads_written(self, warehouse, db, capsys):
+        """Test that an incremental run writes only the threads it touched."""
+        warehouse_path, _ = warehouse
+        _write_day(warehouse_path, _day(2), [_email('A', _day(2), 'C1')])
+        _run(warehouse, db=db)
+
+        _write_day(warehouse_path, _day(1), [_email('B', _day(1), 'C2')])
+        capsys.readouterr()
+        _run(warehouse, db=db)
+
+        assert "1 threads and 1 emails written" in capsys.readouterr().out
+        assert set(db.get_thread_ids()) == {'C1', 'C2'}
+
+    def test_removed_threads_deleted(self, warehouse, db):
+        """Test that threads and emails of a re-exported day are removed."""
+        warehouse_path, _ = warehouse
+        _write_day(warehouse_path, _day(1), [_email('A', _day(1), 'C1'), _email('B', _day(1), 'C2')])
+        _run(warehouse, db=db)
+
+        _write_day(warehouse_path, _day(1), [_email('A', _day(1), 'C1')])
+        _run(warehouse, db=db)
+
+        assert db.get_thread_ids() == ['C1']
+        with db._connect() as conn:
+            ids = [r[0] for r in conn.execute("SELECT email_id FROM email_index").fetchall()]
+        assert ids == ['A']
+
+    def test_full_rebuild_prunes_stale_threads(self, warehouse, db):
+        """Test that a full rebuild deletes threads no longer in the exports."""
+        warehouse_path, _ = warehouse
+        db.upsert_threads([{'thread_id': 'GONE', 'message_count': 1}])
+        _write_day(warehouse_path, _day(1), [_email('A', _day(1), 'C1')])
+
+        _run(warehouse, full=True, db=db)
+
+        assert db.get_thread_ids() == ['C1']
+
+    def test_failed_sync_leaves_tables_consistent(self, warehouse, db, monkeypatch):
+        """Test that an error partway through the sync writes neither table."""
+        warehouse_path, _ = warehouse
+        _write_day(warehouse_path, _day(1), [_email('A', _day(1), 'C1')])
+
+        def fail(emails):
+            raise RuntimeError("disk full")
+        monkeypatch.setattr(db, 'upsert_email_index', fail)
+
+        with pytest.raises(RuntimeError):
+            _run(warehouse, db=db)
+
+        assert db.get_thread_ids() == []
+        assert db.get_metadata(THREADS_SYNCED_KEY) is None
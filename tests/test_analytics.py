@@ -0,0 +1,257 @@
+"""
+Unit tests for the analytics_cache rollups.
+
+Run with: pytest tests/test_analytics.py -v
+"""
+
+import random
+import pytest
+import sqlite3
+import tempfile
+from pathlib import Path
+import sys
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.analytics import dimension_key, parse_dimension
+from lib.database import WastewiseDB
+
+
+@pytest.fixture
+def db():
+    """Create a temporary database for testing."""
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+        db_path = f.name
+
+    db = WastewiseDB(db_path)
+    yield db
+
+    db.close()
+    for suffix in ('', '-wal', '-shm'):
+        Path(db_path + suffix).unlink(missing_ok=True)
+
+
+def _rates(rng: random.Random, count: int) -> list:
+    """Random rate records for add_rates_bulk()."""
+    return [
+        {
+            'vendor': rng.choice(['WM', 'Republic', 'GFL']),
+            'service_type': rng.choice(['compactor', 'dumpster']),
+            'rate_type': rng.choice(['haul_fee', 'rental']),
+            'rate_value': round(rng.uniform(20, 400), 2),
+            'effective_date': f"2025-{rng.randint(1, 6):02d}-{rng.randint(1, 28):02d}",
+            'region': rng.choice(['Sacramento', 'Austin', None]),
+        }
+        for _ in range(count)
+    ]
+
+
+FILTERS = [
+    {},
+    {'vendor': 'WM'},
+    {'vendor': 'WM', 'service_type': 'compactor', 'rate_type': 'haul_fee', 'region': 'Austin'},
+    {'service_type': 'dumpster', 'region': 'Sacramento'},
+    {'rate_type': 'rental'},
+]
+
+
+def _live(db: WastewiseDB, **filters) -> dict:
+    """Benchmark computed from rate_history, without percentiles."""
+    benchmark = db.get_rate_benchmarks(**filters)
+    benchmark.pop('percentiles')
+    return benchmark
+
+
+def _trend_key(trend: dict) -> tuple:
+    """Period, service type and rate type of a get_rate_trends() row."""
+    return trend['period'], trend['service_type'], trend['rate_type']
+
+
+def _rollup_cells(db: WastewiseDB) -> list:
+    """All rate and KPI cells, rounded for comparison."""
+    with db._connect() as conn:
+        return sorted(
+            tuple(row) for row in conn.execute("""
+                SELECT metric_type, dimension, period, ROUND(value, 6) FROM analytics_cache
+                WHERE metric_type NOT LIKE '\\_%' ESCAPE '\\'
+            """)
+        )
+
+
+class TestDimensionKey:
+    """Tests for dimension strings."""
+
+    def test_field_order_and_empty_filters(self):
+        """Test that filters are written in a fixed order without empty ones."""
+        assert dimension_key(region='Austin', vendor='WM', rate_type=None) == 'vendor:WM|region:Austin'
+        assert dimension_key() == 'all'
+        assert dimension_key(property_type='garden') == 'property_type:garden'
+
+    def test_separators_in_values(self):
+        """Test that values containing separators round-trip."""
+        filters = {'vendor': 'A|B 100%', 'region': 'Zone:1|North'}
+
+        assert dimension_key(**filters).count('|') == 1
+        assert parse_dimension(dimension_key(**filters)) == filters
+        assert parse_dimension('all') == {}
+
+
+class TestRateRollups:
+    """Tests for rate rollups."""
+
+    def test_matches_live_benchmarks(self, db):
+        """Test that rollups equal the aggregate queries for every filter shape."""
+        db.add_rates_bulk(_rates(random.Random(1), 500))
+
+        for filters in FILTERS:
+            assert db.get_rate_rollup(**filters) == _live(db, **filters)
+
+    def test_updated_after_inserts(self, db):
+        """Test that later inserts, including lower minimums, are rolled up."""
+        db.add_rates_bulk(_rates(random.Random(2), 200))
+        db.get_rate_rollup()
+
+        db.add_rate_history('WM', 'compactor', 'haul_fee', 1.0, '2025-03-15', region='Austin')
+        db.add_rates_bulk(_rates(random.Random(3), 50))
+
+        for filters in FILTERS:
+            assert db.get_rate_rollup(**filters) == _live(db, **filters)
+        assert db.get_rate_rollup(vendor='WM')['min_rate'] == 1.0
+
+    def test_sees_writes_from_other_connections(self, db):
+        """Test that rates inserted outside WastewiseDB are rolled up."""
+        db.add_rates_bulk(_rates(random.Random(4), 20))
+        db.get_rate_rollup()
+
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("""
+            INSERT INTO rate_history (vendor, service_type, rate_type, rate_value, effective_date)
+            VALUES ('Newco', 'compactor', 'haul_fee', 99, '2025-07-01')
+        """)
+        conn.commit()
+        conn.close()
+
+        assert db.get_rate_rollup(vendor='Newco')['sample_count'] == 1
+        assert db.get_rate_rollup() == _live(db)
+
+    def test_incremental_matches_rebuild(self, db):
+        """Test that incremental refreshes leave the same cells as a rebuild."""
+        rng = random.Random(5)
+        for _ in range(4):
+            db.add_rates_bulk(_rates(rng, rng.randint(1, 80)))
+            db.refresh_analytics()
+
+        incremental = _rollup_cells(db)
+        db.rebuild_analytics()
+        assert _rollup_cells(db) == incremental
+
+    def test_trend(self, db):
+        """Test that the monthly trend matches per-month aggregates, newest first."""
+        db.add_rates_bulk(_rates(random.Random(6), 300))
+
+        trend = db.get_rate_rollup_trend(vendor='GFL', months=3)
+
+        assert [t['period'] for t in trend] == ['2025-06', '2025-05', '2025-04']
+        with db._connect() as conn:
+            row = conn.execute("""
+                SELECT COUNT(*), MAX(rate_value) FROM rate_history
+                WHERE vendor = 'GFL' AND effective_date LIKE '2025-05%'
+            """).fetchone()
+        assert (trend[1]['sample_count'], trend[1]['max_rate']) == tuple(row)
+
+    def test_precomputed_benchmarks_and_trends(self, db):
+        """Test that precomputed benchmarks and trends match the live queries."""
+        db.add_rates_bulk(_rates(random.Random(8), 400))
+
+        for filters in FILTERS:
+            assert db.get_rate_benchmarks(**filters, precomputed=True) == db.get_rate_benchmarks(**filters)
+
+        for service_type in (None, 'dumpster'):
+            live = db.get_rate_trends('WM', service_type=service_type, months=40)
+            rolled = db.get_rate_trends('WM', service_type=service_type, months=40, precomputed=True)
+            assert sorted(map(_trend_key, rolled)) == sorted(map(_trend_key, live))
+            live_avgs = {_trend_key(t): t['avg_rate'] for t in live}
+            assert all(t['avg_rate'] == pytest.approx(live_avgs[_trend_key(t)]) for t in rolled)
+            assert [t['period'] for t in rolled] == sorted((t['period'] for t in rolled), reverse=True)
+
+    def test_breakdown_with_separators_in_values(self, db):
+        """Test that the precomputed breakdown handles vendors containing '|' and ':'."""
+        db.add_rate_history('Hauler|Co: West', 'compactor', 'haul_fee', 100.0, '2025-03-15')
+        db.add_rate_history('Hauler|Co: West', 'compactor', 'haul_fee', 200.0, '2025-03-20')
+
+        trends = db.get_rate_trends('Hauler|Co: West', months=40, precomputed=True)
+
+        assert [(t['period'], t['avg_rate']) for t in trends] == [('2025-03', 150.0)]
+
+    def test_empty(self, db):
+        """Test rollups without data."""
+        assert db.get_rate_rollup(vendor='Nobody') == {
+            'avg_rate': None, 'min_rate': None, 'max_rate': None, 'sample_count': 0
+        }
+        assert db.get_rate_rollup_trend() == []
+
+    def test_refresh_is_noop_when_clean(self, db):
+        """Test that a refresh without changes recomputes nothing."""
+        db.add_rates_bulk(_rates(random.Random(7), 10))
+        assert db.refresh_analytics() > 0
+        assert db.refresh_analytics() == 0
+
+    def test_clean_reads_skip_write_lock(self, db):
+        """Test that reads of up-to-date rollups succeed while another writer holds the lock."""
+        db.add_rates_bulk(_rates(random.Random(7), 10))
+        expected = db.get_rate_rollup(vendor='WM')
+
+        writer = sqlite3.connect(str(db.db_path), timeout=0)
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            with db._connect() as conn:
+                conn.execute("PRAGMA busy_timeout = 0")
+            assert db.get_rate_rollup(vendor='WM') == expected
+        finally:
+            writer.rollback()
+            writer.close()
+
+
+class TestKPIRollups:
+    """Tests for KPI rollups."""
+
+    @pytest.fixture
+    def portfolio(self, db):
+        """Three properties with two months of KPIs."""
+        db.add_property("Avana", property_type="garden", unit_count=200, region="Sacramento")
+        db.add_property("Oaks", property_type="garden", unit_count=100, region="Austin")
+        db.add_property("Tower", property_type="high-rise", unit_count=300, region="Austin")
+        db.add_kpis_bulk([
+            {'property_name': 'Avana', 'period': '2025-01', 'cost_per_door': 20.0, 'total_cost': 4000},
+            {'property_name': 'Oaks', 'period': '2025-01', 'cost_per_door': 30.0, 'total_cost': 3000},
+            {'property_name': 'Tower', 'period': '2025-01', 'total_cost': 9000},
+            {'property_name': 'Avana', 'period': '2025-02', 'cost_per_door': 22.0, 'total_cost': 4400},
+        ])
+        return db
+
+    def test_portfolio_and_dimensions(self, portfolio):
+        """Test portfolio, region and property type rollups."""
+        january = portfolio.get_kpi_rollups()[1]
+        assert january['period'] == '2025-01'
+        assert january['properties'] == 3
+        assert january['total_cost'] == 16000
+        assert january['cost_per_door'] == 25.0  # Tower has no cost_per_door
+
+        austin = portfolio.get_kpi_rollups(region='Austin')
+        assert [p['period'] for p in austin] == ['2025-01']
+        assert austin[0]['total_cost'] == 12000
+
+        assert portfolio.get_kpi_rollups(property_type='garden', months=1)[0]['total_cost'] == 4400
+
+    def test_updates_and_property_changes(self, portfolio):
+        """Test that KPI updates and property moves refresh the affected periods."""
+        portfolio.get_kpi_rollups()
+
+        portfolio.add_kpis_bulk([{'property_name': 'Oaks', 'period': '2025-01', 'total_cost': 5000}])
+        assert portfolio.get_kpi_rollups(region='Austin')[0]['total_cost'] == 14000
+
+        with portfolio._connect() as conn:
+            conn.execute("UPDATE properties SET region = 'Sacramento' WHERE name = 'Oaks'")
+        assert portfolio.get_kpi_rollups(region='Austin')[0]['total_cost'] == 9000
+        assert portfolio.get_kpi_rollups(region='Sacramento')[1]['total_cost'] == 9000
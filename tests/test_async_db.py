@@ -0,0 +1,181 @@
+"""
+Unit tests for the asyncio database facade.
+
+Run with: pytest tests/test_async_db.py -v
+"""
+
+import asyncio
+import importlib.util
+import threading
+import time
+import pytest
+import tempfile
+from pathlib import Path
+import sys
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.async_db import AsyncRateDatabaseRAG, AsyncWastewiseDB
+from lib.database import WastewiseDB
+from lib.rate_rag import RateDatabaseRAG
+
+SERVER_PATH = Path(__file__).parent.parent / "mcp-server" / "server.py"
+
+
+@pytest.fixture
+def db_path():
+    """Path of a temporary database with a few rates."""
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+        path = f.name
+
+    with WastewiseDB(path) as db:
+        db.add_rates_bulk([
+            {'vendor': 'WM', 'service_type': 'compactor', 'rate_type': 'haul_fee',
+             'rate_value': value, 'effective_date': '2025-01-01'}
+            for value in (100, 110, 120, 130)
+        ])
+    yield path
+
+    for suffix in ('', '-wal', '-shm'):
+        Path(path + suffix).unlink(missing_ok=True)
+
+
+@pytest.fixture
+def adb(db_path):
+    """Async facade over the temporary database."""
+    adb = AsyncWastewiseDB(WastewiseDB(db_path), max_workers=2)
+    yield adb
+    adb.close()
+
+
+class TestAsyncWastewiseDB:
+    """Tests for AsyncWastewiseDB."""
+
+    def test_methods_match_sync_results(self, adb):
+        """Test that wrapped methods return what the blocking ones do."""
+        result = asyncio.run(adb.get_rate_benchmarks(vendor='WM'))
+
+        assert result == adb.db.get_rate_benchmarks(vendor='WM')
+        assert result['sample_count'] == 4
+
+    def test_private_members_not_exposed(self, adb):
+        """Test that only public methods are wrapped."""
+        with pytest.raises(AttributeError):
+            adb._connect
+        with pytest.raises(AttributeError):
+            adb.transaction
+        with pytest.raises(AttributeError):
+            adb.db_path  # Not callable
+
+    def test_errors_propagate(self, adb):
+        """Test that exceptions raised on the pool reach the awaiting caller."""
+        with pytest.raises(KeyError):
+            asyncio.run(adb.add_rates_bulk([{'vendor': 'WM'}]))
+
+    def test_calls_overlap(self, adb):
+        """Test that concurrent calls run in parallel and leave the loop free."""
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            tick_task = asyncio.create_task(ticker())
+            start = time.perf_counter()
+            await asyncio.gather(adb.run(time.sleep, 0.2), adb.run(time.sleep, 0.2))
+            elapsed = time.perf_counter() - start
+            tick_task.cancel()
+            return elapsed
+
+        assert asyncio.run(main()) < 0.35
+        assert len(ticks) > 5
+
+    def test_pool_is_bounded_and_reuses_connections(self, adb):
+        """Test that at most max_workers threads, each with one connection, are used."""
+        threads = set()
+
+        def work():
+            threads.add(threading.get_ident())
+            return adb.db.get_stats()
+
+        async def main():
+            await asyncio.gather(*(adb.run(work) for _ in range(20)))
+
+        asyncio.run(main())
+
+        assert len(threads) <= 2
+        assert threads <= set(adb.db._connections)
+
+    def test_run_in_transaction_rolls_back(self, adb):
+        """Test that a failing transaction function leaves no rows behind."""
+        def add_then_fail():
+            adb.db.add_property("Avana")
+            raise RuntimeError("abort")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(adb.run_in_transaction(add_then_fail))
+
+        assert adb.db.get_property("Avana") is None
+
+    def test_async_context_manager_closes(self, db_path):
+        """Test that leaving the async context shuts the pool down."""
+        async def main():
+            async with AsyncWastewiseDB(WastewiseDB(db_path)) as adb:
+                await adb.get_stats()
+            return adb
+
+        adb = asyncio.run(main())
+
+        assert adb.db._connections == {}
+        with pytest.raises(RuntimeError):
+            asyncio.run(adb.get_stats())
+
+
+class TestAsyncRateDatabaseRAG:
+    """Tests for the async RAG variants."""
+
+    def test_compare_rate(self, db_path):
+        """Test that async compare_rate matches the blocking call."""
+        rag = AsyncRateDatabaseRAG(RateDatabaseRAG(db_path, api_key=''))
+
+        result = asyncio.run(rag.compare_rate(125, 'WM', 'compactor', 'haul_fee'))
+
+        assert result == rag.rag.compare_rate(125, 'WM', 'compactor', 'haul_fee')
+        assert result['percentile'] == 75.0
+        rag.close()
+
+
+class TestServerConnections:
+    """Tests for the MCP server's per-thread connections."""
+
+    @pytest.fixture
+    def server(self, db_path):
+        """Load the MCP server module against the test database."""
+        spec = importlib.util.spec_from_file_location("mcp_server_under_test", SERVER_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        instance = module.WasteMasterBrainServer()
+        instance.db_path = db_path
+        return instance
+
+    def test_connection_per_thread(self, server):
+        """Test that a thread reuses its connection and other threads get their own."""
+        conn = server._get_connection()
+        assert server._get_connection() is conn
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(server._get_connection()))
+        thread.start()
+        thread.join()
+
+        assert other[0] is not conn
+
+    def test_handlers_on_pool(self, server, adb):
+        """Test that tool handlers give the same result when run on the pool."""
+        result = asyncio.run(adb.run(server.query_rates, vendor='WM'))
+
+        assert result == server.query_rates(vendor='WM')
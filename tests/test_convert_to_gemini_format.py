@@ -0,0 +1,348 @@
+"""
+Unit tests for the daily JSON to Gemini markdown converter.
+
+Run with: pytest tests/test_convert_to_gemini_format.py -v
+"""
+
+import json
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import convert_to_gemini_format as converter
+from convert_to_gemini_format import BatchWriter
+
+
+def _make_email(email_id: str, date: str, body: str = "Please send the invoice.") -> dict:
+    """Build a minimal exported email."""
+    return {
+        'id': email_id,
+        'date': date,
+        'type': 'received',
+        'from': {'name': 'Hauler', 'email': 'hauler@example.com'},
+        'to': ['waste@example.com'],
+        'subject': f'Subject {email_id}',
+        'body_text': body,
+    }
+
+
+def _write_daily(daily_dir: Path, day: str, emails: list, bom: bool = True):
+    """Write a daily export the way Export-DailyEmails.ps1 does."""
+    payload = json.dumps({'export_date': day, 'emails': emails}).encode('utf-8')
+    (daily_dir / f"{day}.json").write_bytes((b'\xef\xbb\xbf' if bom else b'') + payload)
+
+
+def _header_count(path: Path) -> int:
+    """Read the patched email count from a batch header."""
+    for line in path.read_text(encoding='utf-8').splitlines():
+        if line.startswith("Total Emails:"):
+            return int(line.split(":", 1)[1])
+    raise AssertionError("No Total Emails header")
+
+
+def _without_timestamp(text: str) -> list:
+    """Batch lines other than the Generated timestamp."""
+    return [line for line in text.splitlines() if not line.startswith("Generated:")]
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    """Point the converter at temporary daily/output directories."""
+    daily_dir = tmp_path / "daily"
+    output_dir = tmp_path / "gemini"
+    daily_dir.mkdir()
+    output_dir.mkdir()
+    monkeypatch.setattr(converter, 'DAILY_JSON_DIR', daily_dir)
+    monkeypatch.setattr(converter, 'GEMINI_OUTPUT_DIR', output_dir)
+    return daily_dir, output_dir
+
+
+class TestBatchWriter:
+    """Tests for incremental batch writing."""
+
+    def test_header_count_patched(self, tmp_path):
+        """Test that the email count is patched into the header on close."""
+        writer = BatchWriter(tmp_path, max_size_bytes=10 * 1024 * 1024)
+        for i in range(3):
+            writer.add("2025-06", f"email {i}\n")
+        batches = writer.close()
+
+        assert [b.path.name for b in batches] == ["batch_2025-06_001.md"]
+        assert _header_count(batches[0].path) == 3
+
+    def test_rollover_by_size(self, tmp_path):
+        """Test that a new numbered file starts when the size limit is hit."""
+        writer = BatchWriter(tmp_path, max_size_bytes=25)
+        for i in range(5):
+            writer.add("2025-06", f"email number {i}\n")  # 15 bytes each
+        batches = writer.close()
+
+        assert [b.path.name for b in batches] == [f"batch_2025-06_00{n}.md" for n in range(1, 6)]
+        assert all(_header_count(b.path) == 1 for b in batches)
+
+    def test_evicted_writers_reopen_for_append(self, tmp_path):
+        """Test that closing least recently used handles loses nothing."""
+        writer = BatchWriter(tmp_path, max_size_bytes=10 * 1024 * 1024, max_open=1)
+        for i in range(4):
+            writer.add("2025-06", f"june {i}\n")
+            writer.add("2025-07", f"july {i}\n")
+        batches = writer.close()
+
+        june = (tmp_path / "batch_2025-06_001.md").read_text(encoding='utf-8')
+        assert [line for line in june.splitlines() if line.startswith("june")] == [f"june {i}" for i in range(4)]
+        assert {b.path.name: _header_count(b.path) for b in batches} == {
+            "batch_2025-06_001.md": 4,
+            "batch_2025-07_001.md": 4,
+        }
+
+
+class TestProcessJsonFiles:
+    """Tests for end-to-end conversion."""
+
+    def test_month_batches(self, dirs):
+        """Test that emails land in their month batches."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-30", [_make_email("A", "2025-06-30T10:00:00")])
+        _write_daily(daily_dir, "2025-07-01", [
+            _make_email("B", "2025-07-01T09:00:00"),
+            _make_email("C", "2025-07-01T11:00:00"),
+        ])
+
+        converter.process_json_files(batch_by="month")
+
+        june = output_dir / "batch_2025-06_001.md"
+        july = output_dir / "batch_2025-07_001.md"
+        assert _header_count(june) == 1
+        assert _header_count(july) == 2
+        assert "# Email ID: C" in july.read_text(encoding='utf-8')
+
+
+class TestIncrementalConversion:
+    """Tests for manifest-driven incremental conversion."""
+
+    def test_second_run_is_noop(self, dirs, capsys):
+        """Test that an unchanged export directory rewrites nothing."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        converter.process_json_files(batch_by="month")
+        june = output_dir / "batch_2025-06_001.md"
+        before = june.read_bytes()
+
+        capsys.readouterr()
+        converter.process_json_files(batch_by="month")
+
+        assert "up to date" in capsys.readouterr().out
+        assert june.read_bytes() == before
+
+    def test_new_day_appends(self, dirs):
+        """Test that a new day is appended to the existing month batch."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        converter.process_json_files(batch_by="month")
+
+        _write_daily(daily_dir, "2025-06-03", [
+            _make_email("B", "2025-06-03T10:00:00"),
+            _make_email("C", "2025-06-03T11:00:00"),
+        ])
+        converter.process_json_files(batch_by="month")
+
+        june = output_dir / "batch_2025-06_001.md"
+        text = june.read_text(encoding='utf-8')
+        assert _header_count(june) == 3
+        assert text.count("# Email Batch:") == 1
+        assert text.index("# Email ID: A") < text.index("# Email ID: B")
+
+    def test_changed_day_rewrites_month(self, dirs):
+        """Test that editing a day rewrites its batch without duplicates."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        _write_daily(daily_dir, "2025-06-03", [_make_email("B", "2025-06-03T10:00:00")])
+        _write_daily(daily_dir, "2025-07-01", [_make_email("C", "2025-07-01T10:00:00")])
+        converter.process_json_files(batch_by="month")
+        july_before = (output_dir / "batch_2025-07_001.md").read_bytes()
+
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A2", "2025-06-02T10:00:00")])
+        converter.process_json_files(batch_by="month")
+
+        june = (output_dir / "batch_2025-06_001.md").read_text(encoding='utf-8')
+        assert "# Email ID: A\n" not in june
+        assert june.index("# Email ID: A2") < june.index("# Email ID: B")
+        assert _header_count(output_dir / "batch_2025-06_001.md") == 2
+        assert (output_dir / "batch_2025-07_001.md").read_bytes() == july_before
+
+    def test_removed_day_rewrites_month(self, dirs):
+        """Test that deleting a day drops its emails from the batch."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        _write_daily(daily_dir, "2025-06-03", [_make_email("B", "2025-06-03T10:00:00")])
+        converter.process_json_files(batch_by="month")
+
+        (daily_dir / "2025-06-02.json").unlink()
+        converter.process_json_files(batch_by="month")
+
+        june = output_dir / "batch_2025-06_001.md"
+        assert "# Email ID: A\n" not in june.read_text(encoding='utf-8')
+        assert _header_count(june) == 1
+
+    def test_strategy_change_resets_manifest(self, dirs):
+        """Test that switching batch strategy reconverts every day."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        converter.process_json_files(batch_by="month")
+        converter.process_json_files(batch_by="all")
+
+        assert _header_count(output_dir / "batch_all-emails_001.md") == 1
+        assert not (output_dir / "batch_2025-06_001.md").exists()
+
+    def test_full_run_removes_stale_batches(self, dirs):
+        """Test that --full deletes batch files no day feeds any more."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        _write_daily(daily_dir, "2025-07-01", [_make_email("B", "2025-07-01T10:00:00")])
+        converter.process_json_files(batch_by="month")
+
+        (daily_dir / "2025-07-01.json").unlink()
+        converter.process_json_files(batch_by="month", full=True)
+
+        assert sorted(p.name for p in output_dir.glob("batch_*.md")) == ["batch_2025-06_001.md"]
+        assert _header_count(output_dir / "batch_2025-06_001.md") == 1
+
+    def test_corrupt_manifest_removes_batches(self, dirs):
+        """Test that an unreadable manifest rebuilds the batches from scratch."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        converter.process_json_files(batch_by="month")
+        (output_dir / "batch_2025-06_002.md").write_text("left over", encoding='utf-8')
+
+        (output_dir / converter.MANIFEST_NAME).write_text("{not json", encoding='utf-8')
+        converter.process_json_files(batch_by="month")
+
+        assert sorted(p.name for p in output_dir.glob("batch_*.md")) == ["batch_2025-06_001.md"]
+        assert _header_count(output_dir / "batch_2025-06_001.md") == 1
+
+    def test_interrupted_run_does_not_duplicate(self, dirs, monkeypatch):
+        """Test that a run interrupted mid-day leaves a manifest the next run can resume from."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        converter.process_json_files(batch_by="month")
+
+        _write_daily(daily_dir, "2025-06-03", [_make_email("B", "2025-06-03T10:00:00")])
+        _write_daily(daily_dir, "2025-06-04", [
+            _make_email("C", "2025-06-04T10:00:00"),
+            _make_email("D", "2025-06-04T11:00:00"),
+        ])
+        format_email = converter.format_email_as_markdown
+
+        def interrupt_at_d(email, file_date):
+            if email['id'] == "D":
+                raise KeyboardInterrupt
+            return format_email(email, file_date)
+
+        monkeypatch.setattr(converter, 'format_email_as_markdown', interrupt_at_d)
+        with pytest.raises(KeyboardInterrupt):
+            converter.process_json_files(batch_by="month")
+        monkeypatch.setattr(converter, 'format_email_as_markdown', format_email)
+        converter.process_json_files(batch_by="month")
+
+        june = output_dir / "batch_2025-06_001.md"
+        text = june.read_text(encoding='utf-8')
+        assert [text.count(f"# Email ID: {email_id}\n") for email_id in "ABCD"] == [1, 1, 1, 1]
+        assert _header_count(june) == 4
+
+
+class TestParallelConversion:
+    """Tests for converting daily files in worker processes."""
+
+    def test_parallel_matches_serial(self, dirs, tmp_path, monkeypatch):
+        """Test that worker processes produce byte-identical batches."""
+        daily_dir, output_dir = dirs
+        for day in range(1, 8):
+            _write_daily(daily_dir, f"2025-06-{day:02d}", [
+                _make_email(f"E{day}-{n}", f"2025-06-{day:02d}T{n:02d}:00:00") for n in range(3)
+            ])
+
+        converter.process_json_files(batch_by="month", workers=1)
+        serial = (output_dir / "batch_2025-06_001.md").read_text(encoding='utf-8')
+
+        parallel_dir = tmp_path / "parallel"
+        parallel_dir.mkdir()
+        monkeypatch.setattr(converter, 'GEMINI_OUTPUT_DIR', parallel_dir)
+        converter.process_json_files(batch_by="month", workers=3)
+        parallel = (parallel_dir / "batch_2025-06_001.md").read_text(encoding='utf-8')
+
+        # Only the Generated timestamp may differ
+        assert _without_timestamp(parallel) == _without_timestamp(serial)
+
+    def test_worker_error_skips_file(self, dirs):
+        """Test that a malformed file in a worker is reported and skipped."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-01", [_make_email("A", "2025-06-01T10:00:00")])
+        (daily_dir / "2025-06-02.json").write_text("{not json", encoding='utf-8')
+        _write_daily(daily_dir, "2025-06-03", [_make_email("C", "2025-06-03T10:00:00")])
+
+        converter.process_json_files(batch_by="month", workers=2)
+
+        assert _header_count(output_dir / "batch_2025-06_001.md") == 2
+
+
+class TestDeduplication:
+    """Tests for skipping emails repeated across daily exports."""
+
+    def test_repeated_id_written_once(self, dirs, capsys):
+        """Test that an email exported on two days is written once."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        _write_daily(daily_dir, "2025-06-03", [
+            _make_email("A", "2025-06-02T10:00:00"),
+            _make_email("B", "2025-06-03T10:00:00"),
+        ])
+
+        converter.process_json_files(batch_by="month")
+
+        june = output_dir / "batch_2025-06_001.md"
+        assert june.read_text(encoding='utf-8').count("# Email ID: A\n") == 1
+        assert _header_count(june) == 2
+        assert "Duplicate emails skipped: 1" in capsys.readouterr().out
+
+    def test_same_content_without_id(self, dirs):
+        """Test that emails without IDs are deduplicated by content."""
+        daily_dir, output_dir = dirs
+        email = _make_email("", "2025-06-02T10:00:00")
+        _write_daily(daily_dir, "2025-06-02", [email, email])
+
+        converter.process_json_files(batch_by="month")
+
+        assert _header_count(output_dir / "batch_2025-06_001.md") == 1
+
+    def test_repeat_in_new_day_is_skipped(self, dirs):
+        """Test that an appended day does not repeat an already written email."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        converter.process_json_files(batch_by="month")
+
+        _write_daily(daily_dir, "2025-06-03", [_make_email("A", "2025-06-02T10:00:00")])
+        converter.process_json_files(batch_by="month")
+
+        assert _header_count(output_dir / "batch_2025-06_001.md") == 1
+
+    def test_removing_first_copy_keeps_email(self, dirs):
+        """Test that deleting the day that wrote an email falls back to its repeat."""
+        daily_dir, output_dir = dirs
+        _write_daily(daily_dir, "2025-06-02", [_make_email("A", "2025-06-02T10:00:00")])
+        _write_daily(daily_dir, "2025-06-03", [
+            _make_email("A", "2025-06-02T10:00:00"),
+            _make_email("B", "2025-06-03T10:00:00"),
+        ])
+        converter.process_json_files(batch_by="month")
+
+        (daily_dir / "2025-06-02.json").unlink()
+        converter.process_json_files(batch_by="month")
+
+        june = output_dir / "batch_2025-06_001.md"
+        text = june.read_text(encoding='utf-8')
+        assert text.count("# Email ID: A\n") == 1
+        assert "# Email ID: B\n" in text
+        assert _header_count(june) == 2
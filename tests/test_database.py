@@ -7,13 +7,14 @@ Run with: pytest tests/test_database.py -v
 import pytest
 import sqlite3
 import tempfile
+import threading
 from pathlib import Path
 import sys
 
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from lib.database import WastewiseDB
+from lib.database import SCHEMA_VERSION, WastewiseDB
 
 
 @pytest.fixture
@@ -34,7 +35,9 @@ def db():
     yield db
 
     # Cleanup
-    Path(db_path).unlink(missing_ok=True)
+    db.close()
+    for suffix in ('', '-wal', '-shm'):
+        Path(db_path + suffix).unlink(missing_ok=True)
 
 
 class TestProperties:
@@ -165,6 +168,31 @@ class TestKPIHistory:
         # Most recent first
         assert kpis[0]['period'] == "2025-02"
 
+    def test_get_properties_with_latest_kpis(self, db):
+        """Test that each property carries only its most recent KPI row."""
+        a_id = db.add_property("Property A", unit_count=100)
+        db.add_property("Property B", unit_count=200)
+        db.add_kpi_history(a_id, "2025-02", cost_per_door=11.00, total_cost=1100.00)
+        db.add_kpi_history(a_id, "2025-01", cost_per_door=10.00)
+
+        properties = db.get_properties_with_latest_kpis()
+
+        assert [p['name'] for p in properties] == ["Property A", "Property B"]
+        assert properties[0]['period'] == "2025-02"
+        assert properties[0]['cost_per_door'] == 11.00
+        assert properties[0]['total_cost'] == 1100.00
+        assert properties[1]['period'] is None
+
+    def test_get_properties_with_latest_kpis_paginated(self, db):
+        """Test limit and offset over properties ordered by name."""
+        for name in ("C", "A", "D", "B"):
+            db.add_property(f"Property {name}")
+
+        page = db.get_properties_with_latest_kpis(limit=2, offset=1)
+
+        assert [p['name'] for p in page] == ["Property B", "Property C"]
+        assert db.get_properties_with_latest_kpis(limit=2, offset=4) == []
+
 
 class TestStatistics:
     """Tests for database statistics."""
@@ -210,3 +238,205 @@ class TestInputValidation:
 
         # Should return no results (parameterized query prevents injection)
         assert benchmarks['sample_count'] == 0
+
+
+class TestBulkInserts:
+    """Tests for the bulk insert APIs."""
+
+    def test_add_rates_bulk(self, db):
+        """Test that bulk rates get consecutive IDs and resolve property names."""
+        db.add_rate_history("WM", "compactor", "haul_fee", 90.00, "2024-12-01")
+        ids = db.add_rates_bulk([
+            {'vendor': "WM", 'service_type': "compactor", 'rate_type': "haul_fee",
+             'rate_value': 100.00 + i, 'effective_date': "2025-01-01", 'property_name': "Avana"}
+            for i in range(5)
+        ])
+
+        assert ids == list(range(ids[0], ids[0] + 5))
+        with db._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, rate_value, property_id FROM rate_history WHERE id IN ({','.join('?' * 5)}) ORDER BY id",
+                ids
+            ).fetchall()
+        assert [r['rate_value'] for r in rows] == [100.0, 101.0, 102.0, 103.0, 104.0]
+        assert {r['property_id'] for r in rows} == {db.get_property("Avana")['id']}
+
+    def test_add_rates_bulk_is_atomic(self, db):
+        """Test that one invalid rate rejects the whole batch."""
+        with pytest.raises(sqlite3.IntegrityError):
+            db.add_rates_bulk([
+                {'vendor': "WM", 'service_type': "compactor", 'rate_type': "haul_fee",
+                 'rate_value': 100.00, 'effective_date': "2025-01-01", 'property_name': "New Property"},
+                {'vendor': "WM", 'service_type': "spaceship", 'rate_type': "haul_fee",
+                 'rate_value': 100.00, 'effective_date': "2025-01-01"},
+            ])
+
+        assert db.get_stats()['rate_history'] == 0
+        assert db.get_property("New Property") is None
+        # The rolled back property must not be served from the cache
+        assert db.get_property_id("New Property") == db.get_property("New Property")['id']
+
+    def test_add_invoices_bulk(self, db):
+        """Test bulk invoice insert with JSON fields."""
+        ids = db.add_invoices_bulk([
+            {'property_name': "Avana", 'vendor': "WM", 'invoice_date': "2025-01-31",
+             'total_amount': 1500.00, 'fees_breakdown': {'fuel': 25.0}},
+            {'property_name': "Jones Grant", 'vendor': "Republic", 'invoice_date': "2025-01-31",
+             'total_amount': 900.00},
+        ])
+
+        assert len(ids) == 2
+        invoices = db.get_property_invoices("Avana")
+        assert invoices[0]['id'] == ids[0]
+        assert invoices[0]['fees_breakdown'] == '{"fuel": 25.0}'
+
+    def test_add_kpis_bulk_merges(self, db):
+        """Test that bulk KPIs upsert per property and period."""
+        prop_id = db.add_property("Avana", unit_count=240)
+        db.add_kpi_history(prop_id, "2025-01", cost_per_door=10.00, yards_per_door=2.0)
+
+        written = db.add_kpis_bulk([
+            {'property_name': "Avana", 'period': "2025-01", 'cost_per_door': 12.00},
+            {'property_id': prop_id, 'period': "2025-02", 'cost_per_door': 11.00},
+        ])
+
+        assert written == 2
+        kpis = {k['period']: k for k in db.get_property_kpis("Avana")}
+        assert kpis['2025-01']['cost_per_door'] == 12.00
+        assert kpis['2025-01']['yards_per_door'] == 2.0
+        assert kpis['2025-02']['cost_per_door'] == 11.00
+
+    def test_property_ids_cached(self, db):
+        """Test that resolved names are served without queries."""
+        ids = db.resolve_property_ids(["A", "B", "A"])
+        assert set(ids) == {"A", "B"}
+
+        with db._connect() as conn:
+            queries = []
+            conn.set_trace_callback(queries.append)
+            try:
+                assert db.get_property_id("B") == ids["B"]
+            finally:
+                conn.set_trace_callback(None)
+        assert queries == []
+
+
+class TestConnections:
+    """Tests for per-thread connections and explicit transactions."""
+
+    def test_connection_reused_and_tuned(self, db):
+        """Test that calls share one tuned connection per thread."""
+        with db._connect() as first, db._connect() as second:
+            assert first is second
+            assert first.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+            assert first.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    def test_threads_get_own_connections(self, db):
+        """Test that each thread uses its own connection."""
+        connections = []
+
+        def worker():
+            with db._connect() as conn:
+                connections.append(conn)
+            db.add_property(f"Thread {threading.get_ident()}")
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len({id(c) for c in connections}) == 3
+        assert len(db.list_properties()) == 3
+
+    def test_transaction_commits_together(self, db):
+        """Test that operations in a transaction are committed at the end."""
+        with db.transaction():
+            db.add_property("Property A")
+            db.add_rate_history("WM", "compactor", "haul_fee", 100.00, "2025-01-01")
+
+        assert db.get_stats()['rate_history'] == 1
+        assert db.get_property("Property A") is not None
+
+    def test_transaction_rolls_back(self, db):
+        """Test that an error undoes every operation in the transaction."""
+        with pytest.raises(ValueError):
+            with db.transaction():
+                db.add_property("Property A")
+                raise ValueError("boom")
+
+        assert db.get_property("Property A") is None
+
+    def test_nested_transaction_uses_savepoint(self, db):
+        """Test that a failed nested transaction only undoes its own work."""
+        with db.transaction():
+            db.add_property("Outer")
+            with pytest.raises(sqlite3.IntegrityError):
+                with db.transaction():
+                    db.add_property("Inner")
+                    db.add_rate_history(None, "compactor", "haul_fee", 1.0, "2025-01-01")
+
+        assert db.get_property("Outer") is not None
+        assert db.get_property("Inner") is None
+
+    def test_close_and_reopen(self, db):
+        """Test that the instance is usable after close()."""
+        db.add_property("Property A")
+        db.close()
+        db.close()
+        assert db.get_property("Property A") is not None
+
+
+class TestThreads:
+    """Tests for the email thread index."""
+
+    def test_upsert_and_get_threads(self, db):
+        """Test that threads round-trip with JSON fields parsed."""
+        db.upsert_threads([
+            {'thread_id': 'C1', 'topic': 'pickup', 'participants': ['a@x.com'],
+             'message_count': 2, 'status': 'active', 'projects_detected': ['Vendor: WM']},
+            {'thread_id': 'C2', 'message_count': 1},
+        ])
+        db.upsert_threads([{'thread_id': 'C1', 'message_count': 3, 'status': 'recent'}])
+
+        threads = db.get_threads(['C1', 'C3'])
+        assert list(threads) == ['C1']
+        assert threads['C1']['message_count'] == 3
+        assert threads['C1']['status'] == 'recent'
+        assert threads['C1']['participants'] == []
+
+    def test_get_threads_many_ids(self, db):
+        """Test lookups with more IDs than one query can bind."""
+        db.upsert_threads([{'thread_id': f"T{i}"} for i in range(1200)])
+        assert len(db.get_threads([f"T{i}" for i in range(0, 2400)])) == 1200
+
+    def test_delete_threads_removes_emails(self, db):
+        """Test that deleting a thread deletes its email index rows."""
+        db.upsert_threads([{'thread_id': 'C1'}, {'thread_id': 'C2'}])
+        db.upsert_email_index([
+            {'email_id': 'A', 'thread_id': 'C1', 'recipients': ['b@x.com']},
+            {'email_id': 'B', 'thread_id': 'C2'},
+        ])
+
+        assert db.delete_threads(['C1']) == 1
+        assert db.get_thread_ids() == ['C2']
+        assert db.get_stats()['email_index'] == 1
+
+    def test_existing_database_upgraded(self, tmp_path):
+        """Test that a database from an older schema gains the threads table."""
+        db_path = tmp_path / "old.db"
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE _metadata (key TEXT PRIMARY KEY, value TEXT);
+            INSERT INTO _metadata VALUES ('schema_version', '1.0.0');
+            CREATE TABLE properties (id INTEGER PRIMARY KEY, name TEXT);
+            INSERT INTO properties (name) VALUES ('Kept');
+        """)
+        conn.close()
+
+        db = WastewiseDB(db_path)
+
+        assert not db.has_threads()
+        assert db._schema_version() == SCHEMA_VERSION
+        with db._connect() as conn:
+            assert conn.execute("SELECT name FROM properties").fetchone()[0] == 'Kept'
@@ -0,0 +1,193 @@
+"""
+Unit tests for the markdown batch corpus loader.
+
+Run with: pytest tests/test_email_corpus.py -v
+"""
+
+import hashlib
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import email_corpus
+from email_corpus import chunk_hash, dedupe_records, load_corpus, parse_batch_file, read_chunk, SEPARATOR
+
+
+def _email(email_id: str, subject: str, body: str) -> str:
+    """Format an email the way convert_to_gemini_format writes it."""
+    return (
+        f"---\n# Email ID: {email_id}\n**Date**: 2025-06-03T15:54:05\n"
+        f"**Subject**: {subject}\n---\n\n## Email Content\n\n{body}\n\n{SEPARATOR}\n\n"
+    )
+
+
+@pytest.fixture
+def batch_dir(tmp_path):
+    """Create a directory with two small batch files."""
+    header = f"# Email Batch: 2025-06_001\nGenerated: now\nTotal Emails: 2\n\n{SEPARATOR}\n\n"
+    (tmp_path / "batch_2025-06_001.md").write_text(
+        header
+        + _email("AAA", "Contamination at Avana", "Bins were contaminated again.")
+        + _email("BBB", "Invoice question", "Can you resend the invoice? Café total looks off."),
+        encoding='utf-8'
+    )
+    (tmp_path / "batch_2025-07_001.md").write_text(
+        header + _email("CCC", "Pickup schedule", "Pickup moves to Tuesdays."),
+        encoding='utf-8'
+    )
+    return tmp_path
+
+
+def _split_reference(path: Path) -> list:
+    """Chunks as produced by the original text-mode read + split."""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return [e.strip() for e in content.split(SEPARATOR) if e.strip()]
+
+
+class TestParseBatchFile:
+    """Tests for single-file parsing."""
+
+    def test_records_match_text_split(self, batch_dir):
+        """Test that chunk hashes and text match the original split."""
+        path = batch_dir / "batch_2025-06_001.md"
+        parsed = parse_batch_file(path)
+        expected = _split_reference(path)
+
+        assert [r.hash for r in parsed.records] == [chunk_hash(t) for t in expected]
+        assert [read_chunk(path, r) for r in parsed.records] == expected
+
+    def test_header_fields(self, batch_dir):
+        """Test that email ID and subject are parsed from the header."""
+        parsed = parse_batch_file(batch_dir / "batch_2025-06_001.md")
+        # The batch header chunk carries no email metadata
+        assert [r.email_id for r in parsed.records] == ["", "AAA", "BBB"]
+        assert parsed.records[2].subject == "Invoice question"
+        assert parsed.records[1].date == "2025-06-03T15:54:05"
+
+    def test_crlf_files_hash_like_text_mode(self, tmp_path):
+        """Test that CRLF files hash the same as text-mode reads."""
+        path = tmp_path / "batch_crlf.md"
+        path.write_bytes(_email("DDD", "Windows export", "Line one.\nLine two.").replace('\n', '\r\n').encode('utf-8'))
+
+        parsed = parse_batch_file(path)
+        expected = _split_reference(path)
+        assert [r.hash for r in parsed.records] == [chunk_hash(t) for t in expected]
+        assert read_chunk(path, parsed.records[0]) == expected[0]
+
+    def test_keyword_scoring(self, batch_dir):
+        """Test that only chunks with keyword hits are kept when searching."""
+        parsed = parse_batch_file(batch_dir / "batch_2025-06_001.md", keywords=["invoice", "resend"])
+        assert [r.email_id for r in parsed.records] == ["BBB"]
+        assert parsed.records[0].score == 2
+
+    def test_digest(self, batch_dir):
+        """Test that the file digest covers the raw bytes."""
+        path = batch_dir / "batch_2025-07_001.md"
+        assert parse_batch_file(path).digest == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class TestLoadCorpus:
+    """Tests for multi-file loading."""
+
+    def test_parallel_matches_serial(self, batch_dir, monkeypatch):
+        """Test that the process pool returns the same records as serial parsing."""
+        serial = load_corpus(batch_dir.glob("*.md"), workers=1)
+
+        email_corpus.clear_parse_cache()
+        monkeypatch.setattr(email_corpus, 'PARALLEL_MIN_BYTES', 0)
+        parallel = load_corpus(batch_dir.glob("*.md"), workers=2)
+
+        assert parallel == serial
+        assert list(serial) == sorted(batch_dir.glob("*.md"))
+
+    def test_pool_reused(self, batch_dir, monkeypatch):
+        """Test that parallel loads share one pool that does not fork."""
+        monkeypatch.setattr(email_corpus, 'PARALLEL_MIN_BYTES', 0)
+        load_corpus(batch_dir.glob("*.md"), workers=2)
+        pool = email_corpus._pool
+
+        email_corpus.clear_parse_cache()
+        load_corpus(batch_dir.glob("*.md"), workers=2)
+
+        assert email_corpus._pool is pool
+        assert pool._mp_context.get_start_method() != 'fork'
+
+    def test_unchanged_files_not_reparsed(self, batch_dir, monkeypatch):
+        """Test that repeated loads only re-parse files that changed."""
+        parsed = []
+        parse = email_corpus.parse_batch_file
+        monkeypatch.setattr(email_corpus, 'parse_batch_file', lambda path, *args: parsed.append(path) or parse(path, *args))
+
+        first = load_corpus(batch_dir.glob("*.md"), keywords=["pickup"], workers=1)
+        assert load_corpus(batch_dir.glob("*.md"), keywords=["pickup"], workers=1) == first
+        assert len(parsed) == 2
+
+        changed = batch_dir / "batch_2025-07_001.md"
+        changed.write_text(changed.read_text(encoding='utf-8') + _email("DDD", "Pickup", "Pickup moved."), encoding='utf-8')
+        corpus = load_corpus(batch_dir.glob("*.md"), keywords=["pickup"], workers=1)
+
+        assert parsed[2:] == [changed]
+        assert len(corpus[changed].records) == 2
+
+    def test_empty(self):
+        """Test loading no files."""
+        assert load_corpus([]) == {}
+
+
+class TestDedupeRecords:
+    """Tests for dropping emails repeated across batch files."""
+
+    def test_overlapping_batches(self, batch_dir):
+        """Test that an all-emails batch overlapping a monthly batch is dropped."""
+        monthly = (batch_dir / "batch_2025-06_001.md").read_text(encoding='utf-8')
+        (batch_dir / "batch_all-emails_001.md").write_text(monthly, encoding='utf-8')
+
+        unique, duplicates = dedupe_records(load_corpus(batch_dir.glob("*.md"), min_chars=60))
+
+        assert [r.email_id for _, r in unique] == ["AAA", "BBB", "CCC"]
+        assert {p.name for p, _ in unique} == {"batch_2025-06_001.md", "batch_2025-07_001.md"}
+        assert duplicates == 2
+
+    def test_same_id_different_text(self, batch_dir):
+        """Test that a re-exported email with changed text is kept once."""
+        (batch_dir / "batch_2025-08_001.md").write_text(
+            _email("AAA", "Contamination at Avana", "Bins were contaminated again (updated)."),
+            encoding='utf-8'
+        )
+
+        unique, duplicates = dedupe_records(load_corpus(batch_dir.glob("*.md"), min_chars=60))
+
+        assert [r.email_id for _, r in unique].count("AAA") == 1
+        assert duplicates == 1
+
+
+class TestIterBatchChunks:
+    """Tests for the streaming chunk reader."""
+
+    def test_offsets_locate_chunks(self, batch_dir):
+        """Test that yielded offsets point at the yielded text."""
+        path = batch_dir / "batch_2025-06_001.md"
+        raw = path.read_bytes()
+
+        chunks = list(email_corpus.iter_batch_chunks(path))
+        assert [text for _, _, text in chunks] == _split_reference(path)
+        for start, end, text in chunks:
+            assert raw[start:end].decode('utf-8') == text
+
+    def test_updates_digest(self, batch_dir):
+        """Test that streaming updates the digest with every byte."""
+        path = batch_dir / "batch_2025-06_001.md"
+        digest = hashlib.sha256()
+        list(email_corpus.iter_batch_chunks(path, digest))
+        assert digest.hexdigest() == hashlib.sha256(path.read_bytes()).hexdigest()
+
+    def test_empty_file(self, tmp_path):
+        """Test that an empty batch file yields nothing."""
+        path = tmp_path / "batch_empty.md"
+        path.write_bytes(b"")
+        assert list(email_corpus.iter_batch_chunks(path)) == []
+        assert parse_batch_file(path).digest == hashlib.sha256(b"").hexdigest()
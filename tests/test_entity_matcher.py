@@ -0,0 +1,100 @@
+"""
+Unit tests for the multi-pattern entity matcher.
+
+Run with: pytest tests/test_entity_matcher.py -v
+"""
+
+import random
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from entity_matcher import EntityTagger, KeywordClassifier, PatternMatcher
+
+
+@pytest.fixture
+def config():
+    """Projects section as found in config/settings.json."""
+    return {
+        'projects': {
+            'known_properties': ['Avana', 'Avana South', 'Café Lofts'],
+            'known_vendors': ['WM', 'Republic'],
+            'known_contacts': {'Bob Smith': 'bob@wm.com', 'Amy': 'amy@'},
+        }
+    }
+
+
+class TestPatternMatcher:
+    """Tests for the Aho-Corasick automaton."""
+
+    def test_overlapping_patterns(self):
+        """Test the classic he/she/his/hers example."""
+        matcher = PatternMatcher()
+        for i, pattern in enumerate(['he', 'she', 'his', 'hers']):
+            matcher.add(pattern, i)
+        assert matcher.find("ushers") == {0, 1, 3}
+
+    def test_matches_substring_semantics(self):
+        """Test that results equal `pattern in text` for random inputs."""
+        rng = random.Random(7)
+        patterns = [''.join(rng.choice('abcé') for _ in range(rng.randint(1, 5))) for _ in range(200)]
+        matcher = PatternMatcher()
+        for i, pattern in enumerate(patterns):
+            matcher.add(pattern, i)
+
+        for _ in range(200):
+            text = ''.join(rng.choice('abcdÉ ') for _ in range(rng.randint(0, 60)))
+            expected = {i for i, p in enumerate(patterns) if p in text.lower()}
+            assert matcher.find(text) == expected
+
+    def test_empty_pattern_ignored(self):
+        """Test that an empty pattern never matches."""
+        matcher = PatternMatcher()
+        matcher.add('', 0)
+        assert matcher.find("anything") == set()
+
+    def test_no_adds_after_build(self):
+        """Test that the automaton is immutable once built."""
+        matcher = PatternMatcher().build()
+        with pytest.raises(RuntimeError):
+            matcher.add('late', 0)
+
+
+class TestEntityTagger:
+    """Tests for config-driven entity detection."""
+
+    def test_config_order(self, config):
+        """Test that matches come back in config priority order."""
+        tagger = EntityTagger.from_config(config)
+        found = tagger.find("Republic pickup at AVANA SOUTH")
+        assert [(e.kind, e.label) for e in found] == [
+            ('property', 'Avana'),
+            ('property', 'Avana South'),
+            ('vendor', 'Republic'),
+        ]
+
+    def test_kinds_filter(self, config):
+        """Test restricting matches to contacts."""
+        tagger = EntityTagger.from_config(config)
+        assert [e.label for e in tagger.find("bob@wm.com", kinds=('contact',))] == ['Bob Smith']
+
+    def test_missing_projects(self):
+        """Test a config without a projects section."""
+        assert EntityTagger.from_config({}).find("Avana") == []
+
+
+class TestKeywordClassifier:
+    """Tests for keyword-based topic detection."""
+
+    def test_categories_in_order(self):
+        """Test that each category appears once, in definition order."""
+        classifier = KeywordClassifier({
+            'billing': ['invoice', 'rate'],
+            'urgent': ['asap'],
+            'maintenance': ['repair'],
+        })
+        assert classifier.classify("ASAP: repair and invoice, new rate") == ['billing', 'urgent', 'maintenance']
+        assert classifier.classify("hello") == []
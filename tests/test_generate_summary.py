@@ -0,0 +1,127 @@
+"""
+Unit tests for date-range summary generation.
+
+Run with: pytest tests/test_generate_summary.py -v
+"""
+
+import json
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from generate_summary import SummaryGenerator, summarize_range
+from lib.database import THREADS_SYNCED_KEY, WastewiseDB
+
+
+def _email(email_id: str, day: str, body: str, type: str = 'received') -> dict:
+    """Build a minimal exported email."""
+    return {
+        'id': email_id,
+        'date': f"{day}T10:00:00",
+        'type': type,
+        'from': {'name': 'Bob', 'email': 'bob@wm.com'},
+        'to': ['waste@example.com'],
+        'subject': 'Pickup',
+        'conversation_id': f"CONV-{email_id}",
+        'body_preview': body[:50],
+        'body_text': body,
+    }
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    """Warehouse with three days of exports (one day missing) and a thread file."""
+    daily = tmp_path / 'daily'
+    daily.mkdir()
+    for day, emails in {
+        '2025-06-01': [_email('A', '2025-06-01', "Can you send the invoice?")],
+        '2025-06-02': [_email('B', '2025-06-02', "I'll call WM tomorrow.", type='sent')],
+        '2025-06-04': [_email('C', '2025-06-04', "Pickup is done.")],
+    }.items():
+        (daily / f"{day}.json").write_text(json.dumps({'emails': emails}), encoding='utf-8')
+
+    threads = tmp_path / 'threads'
+    threads.mkdir()
+    (threads / 'threads_current.json').write_text(json.dumps({'threads': [
+        {'thread_id': 'CONV-A', 'message_count': 4, 'status': 'active'},
+        {'thread_id': 'CONV-OTHER', 'message_count': 1, 'status': 'stale'},
+    ]}), encoding='utf-8')
+    return tmp_path
+
+
+def _summaries(warehouse: Path) -> dict:
+    """Written summaries without the generation timestamp."""
+    return {
+        path.name: '\n'.join(line for line in path.read_text(encoding='utf-8').splitlines() if 'Generated on' not in line)
+        for path in sorted((warehouse / 'summaries').glob('*.md'))
+    }
+
+
+class TestSummarizeRange:
+    """Tests for summarizing many days in one run."""
+
+    def test_writes_each_exported_day(self, warehouse, tmp_path):
+        """Test that every exported day in the range gets a summary."""
+        written = summarize_range(warehouse, tmp_path / 'none.json', '2025-06-01', '2025-06-05',
+                                  workers=1, db_path=tmp_path / 'none.db')
+
+        assert written == 3
+        summaries = _summaries(warehouse)
+        assert list(summaries) == ['2025-06-01.md', '2025-06-02.md', '2025-06-04.md']
+        assert "Active Threads:** 1" in summaries['2025-06-01.md']
+
+    def test_parallel_matches_single_day_runs(self, warehouse, tmp_path):
+        """Test that pooled range output equals generating each day on its own."""
+        for day in ('2025-06-01', '2025-06-02', '2025-06-04'):
+            generator = SummaryGenerator(warehouse, tmp_path / 'none.json', tmp_path / 'none.db')
+            generator.load_today_emails(day)
+            generator.load_threads()
+            generator.process_emails()
+            generator.save_summary(generator.generate_markdown(day), day)
+        expected = _summaries(warehouse)
+
+        summarize_range(warehouse, tmp_path / 'none.json', '2025-06-01', '2025-06-04',
+                        workers=2, db_path=tmp_path / 'none.db')
+
+        assert _summaries(warehouse) == expected
+
+    def test_no_exports_in_range(self, warehouse, tmp_path):
+        """Test an empty range."""
+        assert summarize_range(warehouse, tmp_path / 'none.json', '2024-01-01', '2024-01-31') == 0
+
+    def test_threads_loaded_for_range_only(self, warehouse, tmp_path):
+        """Test that only threads of conversations in the range are kept."""
+        generator = SummaryGenerator(warehouse, tmp_path / 'none.json', tmp_path / 'none.db')
+        generator.load_threads({'CONV-A', 'CONV-B'})
+        assert set(generator.threads) == {'CONV-A'}
+
+
+class TestThreadSource:
+    """Tests for choosing between the thread index and threads_current.json."""
+
+    def _load(self, warehouse: Path, db_path: Path, synced_offset: float = None) -> dict:
+        """Load CONV-A with an index synced synced_offset seconds after the JSON was written."""
+        with WastewiseDB(db_path) as db:
+            db.upsert_threads([{'thread_id': 'CONV-A', 'message_count': 9}])
+            if synced_offset is not None:
+                written = (warehouse / 'threads' / 'threads_current.json').stat().st_mtime
+                db.set_metadata(THREADS_SYNCED_KEY, str(written + synced_offset))
+
+        generator = SummaryGenerator(warehouse, warehouse / 'none.json', db_path)
+        generator.load_threads({'CONV-A'})
+        return generator.threads['CONV-A']
+
+    def test_synced_index_used(self, warehouse, tmp_path):
+        """Test that an index synced after the JSON was written is read."""
+        assert self._load(warehouse, tmp_path / 'index.db', synced_offset=1)['message_count'] == 9
+
+    def test_newer_json_preferred(self, warehouse, tmp_path):
+        """Test that a JSON file written after the last sync wins."""
+        assert self._load(warehouse, tmp_path / 'index.db', synced_offset=-1)['message_count'] == 4
+
+    def test_unsynced_index_ignored(self, warehouse, tmp_path):
+        """Test that an index without a recorded sync falls back to the JSON."""
+        assert self._load(warehouse, tmp_path / 'index.db')['message_count'] == 4
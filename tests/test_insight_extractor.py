@@ -0,0 +1,103 @@
+"""
+Unit tests for single-pass action item, question and commitment extraction.
+
+Run with: pytest tests/test_insight_extractor.py -v
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from insight_extractor import InsightExtractor
+
+
+@pytest.fixture
+def extractor():
+    """Extractor shared by the tests."""
+    return InsightExtractor()
+
+
+class TestExtract:
+    """Tests for classifying matches in one scan."""
+
+    def test_actions_and_questions(self, extractor):
+        """Test that a request is both an action item and a question."""
+        insights = extractor.extract("Hi Bob,\n\nCan you send the updated invoice? Thanks.")
+
+        assert insights.actions == ["Can you send the updated invoice"]
+        assert insights.questions == ["Can you send the updated invoice?"]
+        assert insights.commitments == []
+
+    def test_questions_anchored_at_sentence_start(self, extractor):
+        """Test that each question starts at its own sentence."""
+        body = "Pickup moved to Tuesday. Is that OK? What about bulk trash? See you."
+        assert extractor.extract(body).questions == ["Is that OK?", "What about bulk trash?"]
+
+    def test_commitments_only_when_sent(self, extractor):
+        """Test that commitments are extracted from sent emails only."""
+        body = "I'll review the contract tomorrow. Please confirm the rate."
+
+        assert extractor.extract(body, sent=True).commitments == ["I'll review the contract tomorrow"]
+        assert extractor.extract(body, sent=False).commitments == []
+        assert extractor.extract(body, sent=False).actions == ["Please confirm the rate"]
+
+    def test_commitment_ends_at_request(self, extractor):
+        """Test that a request later in a commitment's sentence is still an action item."""
+        insights = extractor.extract("I'll review the contract, can you send the signed copy to Dana", sent=True)
+
+        assert insights.commitments == ["I'll review the contract"]
+        assert insights.actions == ["can you send the signed copy to Dana"]
+
+    def test_commitment_keeps_own_verbs(self, extractor):
+        """Test that a promise to send something is not reported as a request."""
+        insights = extractor.extract("I'll send the signed copy to Dana.", sent=True)
+
+        assert insights.commitments == ["I'll send the signed copy to Dana"]
+        assert insights.actions == []
+
+    def test_overlapping_patterns_reported_once(self, extractor):
+        """Test that 'please send' is one action item, not two."""
+        assert extractor.extract("Please send the W-9.").actions == ["Please send the W-9"]
+
+    def test_words_containing_patterns_ignored(self, extractor):
+        """Test that patterns only match whole words."""
+        assert extractor.extract("We will resend nothing.").actions == []
+
+    def test_long_items_truncated(self, extractor):
+        """Test that items are limited to 150 characters."""
+        action = extractor.extract("Please " + "x" * 300).actions[0]
+        assert len(action) == 150
+        assert action.endswith('...')
+
+    def test_footer_questions_skipped(self, extractor):
+        """Test that boilerplate questions are dropped."""
+        assert extractor.extract("Want fewer emails? Unsubscribe here?").questions == ["Want fewer emails?"]
+
+
+class TestQuotedText:
+    """Tests for skipping quoted replies."""
+
+    def test_quoted_lines_skipped(self, extractor):
+        """Test that '>' lines are not extracted."""
+        body = "Done, see attached.\n> Can you send the manifest?\n> Please hurry."
+        insights = extractor.extract(body)
+
+        assert insights.actions == []
+        assert insights.questions == []
+
+    @pytest.mark.parametrize("header", [
+        "-----Original Message-----\nFrom: Amy",
+        "From: Amy Lee <amy@republic.com>\nSent: Monday, June 2, 2025 9:00 AM\nTo: Waste",
+        "On Mon, Jun 2, 2025 at 9:00 AM Amy Lee <amy@republic.com> wrote:",
+        "________________________________\nFrom: Amy",
+    ])
+    def test_scan_stops_at_reply_header(self, extractor, header):
+        """Test that nothing after the first reply header is extracted."""
+        body = f"Could you confirm Tuesday?\n\n{header}\n\nPlease send the invoice. Is it paid?"
+        insights = extractor.extract(body)
+
+        assert insights.actions == ["Could you confirm Tuesday"]
+        assert insights.questions == ["Could you confirm Tuesday?"]
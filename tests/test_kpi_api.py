@@ -4,14 +4,29 @@ Integration tests for KPI API endpoints.
 Run with: pytest tests/test_kpi_api.py -v
 """
 
+import os
 import pytest
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from api.kpi_api import app, sanitize_string, validate_positive_int
+# The API opens (and migrates) its database on import, so point it at a
+# copy of the tracked database rather than data/wastewise.db itself
+os.environ['DB_PATH'] = shutil.copy(Path(__file__).parent.parent / "data" / "wastewise.db", tempfile.mkdtemp())
+
+from api.kpi_api import app, db, sanitize_string, validate_positive_int
+
+
+@pytest.fixture(scope='module', autouse=True)
+def db_copy():
+    """Remove the API's database copy once the tests are done."""
+    yield
+    db.close()
+    shutil.rmtree(Path(db.db_path).parent)
 
 
 @pytest.fixture
@@ -110,6 +125,70 @@ class TestRatesEndpoint:
         assert 'Invalid service_type' in data['error']
 
 
+class TestPropertiesEndpoint:
+    """Tests for properties endpoint."""
+
+    def test_properties_returns_list(self, client):
+        """Test properties endpoint returns properties with KPI fields."""
+        response = client.get('/api/properties')
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert isinstance(data, list)
+        for prop in data:
+            assert {'id', 'name', 'cost_per_door', 'period'} <= set(prop)
+
+    def test_properties_paginated(self, client):
+        """Test properties endpoint honours limit and offset."""
+        everything = client.get('/api/properties').get_json()
+
+        response = client.get('/api/properties?limit=1&offset=1')
+        assert response.status_code == 200
+        assert response.get_json() == everything[1:2]
+
+
+class TestAnalyticsEndpoints:
+    """Tests for the precomputed analytics endpoints."""
+
+    def test_rate_analytics(self, client):
+        """Test rate analytics returns a summary and trend."""
+        response = client.get('/api/analytics/rates?vendor=WM&months=6')
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert 'sample_count' in data['summary']
+        assert len(data['trend']) <= 6
+
+    def test_rate_analytics_invalid_rate_type(self, client):
+        """Test rate analytics with invalid rate_type."""
+        response = client.get('/api/analytics/rates?rate_type=invalid')
+        assert response.status_code == 400
+
+    def test_kpi_analytics(self, client):
+        """Test KPI analytics returns periods."""
+        response = client.get('/api/analytics/kpis')
+        assert response.status_code == 200
+        assert isinstance(response.get_json()['periods'], list)
+
+
+class TestDbMetricsEndpoint:
+    """Tests for the query profiling endpoint."""
+
+    def test_db_metrics(self, client):
+        """Test db-metrics reports whether profiling is on."""
+        response = client.get('/api/db-metrics')
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert isinstance(data['enabled'], bool)
+        assert isinstance(data['queries'], list)
+
+    def test_db_metrics_invalid_order(self, client):
+        """Test db-metrics with invalid order_by."""
+        response = client.get('/api/db-metrics?order_by=query')
+        assert response.status_code == 400
+
+
 class TestCompareEndpoint:
     """Tests for rate comparison endpoint."""
 
@@ -0,0 +1,248 @@
+"""
+Query plan tests for the rate_history access paths.
+
+Captures the SQL that WastewiseDB and the MCP server actually run and
+asserts, via EXPLAIN QUERY PLAN, that each filter combination is answered
+from a covering index without reading table rows.
+
+Run with: pytest tests/test_query_plans.py -v
+"""
+
+import importlib.util
+import itertools
+import random
+import pytest
+import sqlite3
+import tempfile
+from pathlib import Path
+import sys
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.database import SCHEMA_VERSION, WastewiseDB
+
+SERVER_PATH = Path(__file__).parent.parent / "mcp-server" / "server.py"
+
+FILTERS = {
+    'vendor': 'Waste Management',
+    'service_type': 'compactor',
+    'rate_type': 'haul_fee',
+    'region': 'Texas',
+}
+
+
+@pytest.fixture
+def db():
+    """Create a temporary database with a spread of rate rows."""
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+        db_path = f.name
+
+    db = WastewiseDB(db_path)
+    rng = random.Random(7)
+    db.add_rates_bulk([
+        {
+            'vendor': rng.choice(['Waste Management', 'Republic Services', 'Waste Connections', 'GFL']),
+            'service_type': rng.choice(['compactor', 'dumpster', 'recycling']),
+            'rate_type': rng.choice(['haul_fee', 'rental', 'fuel_surcharge']),
+            'rate_value': round(rng.uniform(50, 500), 2),
+            'effective_date': f"2024-{rng.randint(1, 12):02d}-01",
+            'region': rng.choice(['Texas', 'Georgia', None]),
+        }
+        for _ in range(2000)
+    ])
+    yield db
+
+    db.close()
+    for suffix in ('', '-wal', '-shm'):
+        Path(db_path + suffix).unlink(missing_ok=True)
+
+
+@pytest.fixture
+def server(db, monkeypatch):
+    """Load the MCP server module against the test database."""
+    spec = importlib.util.spec_from_file_location("mcp_server_under_test", SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    instance = module.WasteMasterBrainServer()
+    instance.db_path = str(db.db_path)
+    return instance
+
+
+def _filter_combinations():
+    """All subsets of the benchmark filters, as keyword dicts."""
+    keys = list(FILTERS)
+    for size in range(len(keys) + 1):
+        for combo in itertools.combinations(keys, size):
+            yield {key: FILTERS[key] for key in combo}
+
+
+def _rate_queries(conn: sqlite3.Connection, call, marker: str = 'AVG(rate_value)') -> list:
+    """Run call() and return the rate_history statements it executed (parameters expanded).
+
+    Only statements containing marker are returned; by default the
+    aggregate queries, not the percentile engine's.
+    """
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements if 'FROM rate_history' in sql and marker in sql]
+
+
+def _traced_connections(server, monkeypatch) -> list:
+    """Make the server's connections record their statements into the returned list."""
+    statements = []
+    original = server._get_connection
+
+    def traced():
+        conn = original()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(server, '_get_connection', traced)
+    return statements
+
+
+def assert_covering(db: WastewiseDB, sql: str, index: str = None) -> None:
+    """Assert that every rate_history access in the plan is index-only."""
+    plan = [line for line in db.explain(sql) if 'rate_history' in line]
+    assert plan, f"No rate_history access in plan for: {sql}"
+    for line in plan:
+        assert 'USING COVERING INDEX' in line, f"{line!r} for: {sql}"
+        if index:
+            assert index in line, f"{line!r} for: {sql}"
+
+
+class TestRateIndexes:
+    """Tests for the rate_history covering indexes."""
+
+    def test_indexes_exist(self, db):
+        """Test that the composite indexes replace the single-column vendor index."""
+        with db._connect() as conn:
+            names = {
+                row['name'] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'rate_history'"
+                )
+            }
+        assert {'idx_rate_history_vendor_service', 'idx_rate_history_service_rate'} <= names
+        assert 'idx_rate_history_vendor' not in names
+
+    def test_upgrade_from_previous_schema(self, tmp_path):
+        """Test that opening a 1.1.0 database adds the indexes."""
+        db_path = tmp_path / "old.db"
+        conn = sqlite3.connect(db_path)
+        conn.executescript((Path(__file__).parent.parent / "data" / "schema.sql").read_text())
+        conn.executescript("""
+            DROP INDEX idx_rate_history_vendor_service;
+            DROP INDEX idx_rate_history_service_rate;
+            CREATE INDEX idx_rate_history_vendor ON rate_history(vendor);
+            UPDATE _metadata SET value = '1.1.0' WHERE key = 'schema_version';
+        """)
+        conn.close()
+
+        with WastewiseDB(str(db_path)) as db:
+            plan = db.explain("SELECT AVG(rate_value) FROM rate_history WHERE vendor = 'GFL'")
+            assert db.get_stats()['schema_version'] == SCHEMA_VERSION
+        assert 'idx_rate_history_vendor_service' in plan[0]
+
+
+class TestBenchmarkPlans:
+    """Tests for get_rate_benchmarks and get_rate_trends plans."""
+
+    @pytest.mark.parametrize('filters', list(_filter_combinations()), ids=lambda f: '+'.join(f) or 'none')
+    def test_benchmarks_index_only(self, db, filters):
+        """Test that every benchmark filter combination is index-only."""
+        queries = _rate_queries(db._get_connection(), lambda: db.get_rate_benchmarks(**filters))
+        assert len(queries) == 1
+        assert_covering(db, queries[0])
+
+    def test_vendor_prefix_uses_vendor_index(self, db):
+        """Test that vendor-scoped benchmarks seek on the vendor index."""
+        queries = _rate_queries(
+            db._get_connection(),
+            lambda: db.get_rate_benchmarks(vendor='GFL', service_type='compactor', rate_type='haul_fee')
+        )
+        assert_covering(db, queries[0], 'idx_rate_history_vendor_service')
+        assert 'vendor=? AND service_type=? AND rate_type=?' in db.explain(queries[0])[0]
+
+    def test_market_benchmark_uses_service_index(self, db):
+        """Test that benchmarks without a vendor seek on the service index."""
+        queries = _rate_queries(
+            db._get_connection(),
+            lambda: db.get_rate_benchmarks(service_type='compactor', rate_type='haul_fee', region='Texas')
+        )
+        assert_covering(db, queries[0], 'idx_rate_history_service_rate')
+        assert 'service_type=? AND rate_type=? AND region=?' in db.explain(queries[0])[0]
+
+    @pytest.mark.parametrize('service_type', [None, 'compactor'])
+    def test_trends_index_only(self, db, service_type):
+        """Test that rate trends are index-only with and without a service type."""
+        queries = _rate_queries(
+            db._get_connection(),
+            lambda: db.get_rate_trends('Waste Management', service_type=service_type)
+        )
+        assert_covering(db, queries[0], 'idx_rate_history_vendor_service')
+
+    def test_percentile_segments_index_only(self, db):
+        """Test that percentile segments load from an index and sync by rowid."""
+        conn = db._get_connection()
+        filters = {'vendor': 'GFL', 'rate_type': 'rental'}
+        loads = _rate_queries(conn, lambda: db.get_rate_benchmarks(**filters), marker='SELECT rate_value')
+        assert_covering(db, loads[0], 'idx_rate_history_vendor_service')
+
+        db.add_rates_bulk([{
+            'vendor': 'GFL', 'service_type': 'compactor', 'rate_type': 'rental',
+            'rate_value': 99.0, 'effective_date': '2025-01-01',
+        }])
+        syncs = _rate_queries(conn, lambda: db.get_rate_benchmarks(**filters), marker='id > ')
+        assert 'USING INTEGER PRIMARY KEY' in db.explain(syncs[0])[0]
+
+    def test_plans_hold_after_analyze(self, db):
+        """Test that the planner keeps the covering indexes once statistics exist."""
+        with db._connect() as conn:
+            conn.execute("ANALYZE")
+
+        for filters in _filter_combinations():
+            queries = _rate_queries(db._get_connection(), lambda: db.get_rate_benchmarks(**filters))
+            assert_covering(db, queries[0])
+
+    def test_results_unchanged(self, db):
+        """Test that indexed results match a full table scan."""
+        benchmarks = db.get_rate_benchmarks(vendor='GFL', rate_type='rental')
+        with db._connect() as conn:
+            row = conn.execute("""
+                SELECT AVG(rate_value) as avg_rate, COUNT(*) as sample_count
+                FROM rate_history NOT INDEXED
+                WHERE vendor = 'GFL' AND rate_type = 'rental'
+            """).fetchone()
+        assert benchmarks['sample_count'] == row['sample_count']
+        assert benchmarks['avg_rate'] == round(row['avg_rate'], 2)
+
+
+class TestServerPlans:
+    """Tests for the MCP server's rate queries."""
+
+    @pytest.mark.parametrize('filters', list(_filter_combinations()), ids=lambda f: '+'.join(f) or 'none')
+    def test_query_rates_index_only(self, db, server, monkeypatch, filters):
+        """Test that query_rates stats and trends are index-only."""
+        statements = _traced_connections(server, monkeypatch)
+        server.query_rates(**filters)
+
+        queries = [sql for sql in statements if 'FROM rate_history' in sql]
+        assert len(queries) == 2
+        for sql in queries:
+            assert_covering(db, sql)
+
+    @pytest.mark.parametrize('vendor_filter', [None, 'Republic Services'])
+    def test_pricing_trends_index_only(self, db, server, monkeypatch, vendor_filter):
+        """Test that the pricing_trends chart is index-only."""
+        statements = _traced_connections(server, monkeypatch)
+        server.generate_kpi_chart('line', 'pricing_trends', 'Pricing', vendor_filter=vendor_filter)
+
+        queries = [sql for sql in statements if 'FROM rate_history' in sql]
+        assert len(queries) == 1
+        assert_covering(db, queries[0], 'idx_rate_history_vendor_service')
@@ -0,0 +1,188 @@
+"""
+Unit tests for statement profiling.
+
+Run with: pytest tests/test_query_profiler.py -v
+"""
+
+import importlib.util
+import pytest
+import tempfile
+from pathlib import Path
+import sys
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.database import WastewiseDB
+from lib.query_profiler import OTHER_QUERIES, QueryProfiler, normalize_query
+
+SERVER_PATH = Path(__file__).parent.parent / "mcp-server" / "server.py"
+
+
+@pytest.fixture
+def db_path():
+    """Path of a temporary database file."""
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+        path = f.name
+    yield path
+
+    for suffix in ('', '-wal', '-shm'):
+        Path(path + suffix).unlink(missing_ok=True)
+
+
+@pytest.fixture
+def db(db_path):
+    """Profiled database with a few properties."""
+    db = WastewiseDB(db_path, profile=True)
+    for name in ("Avana", "Oaks", "Tower"):
+        db.add_property(name, unit_count=100)
+    db.reset_query_stats()
+    yield db
+    db.close()
+
+
+def _entry(stats: list, prefix: str) -> dict:
+    """The stats entry whose query starts with prefix."""
+    matches = [entry for entry in stats if entry['query'].startswith(prefix)]
+    assert len(matches) == 1, [entry['query'] for entry in stats]
+    return matches[0]
+
+
+class TestNormalizeQuery:
+    """Tests for query normalization."""
+
+    def test_literals_and_lists(self):
+        """Test that literals and placeholder lists collapse to one shape."""
+        assert normalize_query(
+            "SELECT * FROM t\n  WHERE a = 'it''s' AND b > 12.5 AND c IN (?, ?, ?) -- note"
+        ) == "SELECT * FROM t WHERE a = ? AND b > ? AND c IN (?, ...)"
+
+    def test_multi_row_values(self):
+        """Test that multi-row VALUES lists share one entry."""
+        assert normalize_query("INSERT INTO t (a, b) VALUES (?, ?), (?, ?)") == \
+            normalize_query("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)")
+
+    def test_identifiers_kept(self):
+        """Test that digits inside identifiers are not treated as literals."""
+        assert normalize_query("SAVEPOINT sp_1") == "SAVEPOINT sp_1"
+
+
+class TestWastewiseDBProfiling:
+    """Tests for profiling through WastewiseDB."""
+
+    def test_calls_and_rows_per_query(self, db):
+        """Test that calls with different values are grouped and their rows counted."""
+        db.get_property("Avana")
+        db.get_property("Nobody")
+        db.list_properties()
+
+        stats = db.get_query_stats()
+
+        lookup = _entry(stats, "SELECT * FROM properties WHERE name = ?")
+        assert (lookup['calls'], lookup['rows']) == (2, 1)
+        assert _entry(stats, "SELECT * FROM properties ORDER BY name")['rows'] == 3
+        assert all(entry['total_ms'] >= entry['max_ms'] >= 0 for entry in stats)
+
+    def test_iteration_and_changes(self, db):
+        """Test that iterated rows and changed rows are counted."""
+        with db._connect() as conn:
+            assert len(list(conn.execute("SELECT name FROM properties"))) == 3
+            conn.execute("UPDATE properties SET unit_count = 200")
+
+        stats = db.get_query_stats()
+
+        assert _entry(stats, "SELECT name FROM properties")['rows'] == 3
+        assert _entry(stats, "UPDATE properties")['rows_changed'] == 3
+
+    def test_slow_query_plan_captured(self, db_path):
+        """Test that statements over the threshold get their plan captured once."""
+        db = WastewiseDB(db_path, profile=True, slow_query_ms=0)
+        db.add_property("Avana")
+        db.get_property("Avana")
+        db.get_property("Avana")
+
+        lookup = _entry(db.get_query_stats(), "SELECT * FROM properties WHERE name = ?")
+
+        assert lookup['slow_calls'] == 2
+        assert any('USING INDEX' in line for line in lookup['plan'])
+        db.close()
+
+    def test_slow_ddl_has_no_plan(self, db_path):
+        """Test that slow statements other than queries and DML are recorded without a plan."""
+        profiler = QueryProfiler(slow_ms=0)
+        conn = profiler.connect(db_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS t (x)")
+        conn.execute("CREATE TABLE IF NOT EXISTS t (x)")
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.close()
+
+        create = _entry(profiler.stats(), "CREATE TABLE")
+        assert (create['calls'], create['slow_calls'], create['plan']) == (2, 2, None)
+        assert _entry(profiler.stats(), "INSERT INTO t")['plan'] is not None
+
+    def test_fast_queries_have_no_plan(self, db):
+        """Test that queries under the threshold are not explained."""
+        db.get_property("Avana")
+
+        assert _entry(db.get_query_stats(), "SELECT * FROM properties WHERE name = ?")['plan'] is None
+
+    def test_ordering_and_limit(self, db):
+        """Test sorting by calls and limiting the result."""
+        for _ in range(3):
+            db.get_property("Avana")
+        db.list_properties()
+
+        stats = db.get_query_stats(limit=1, order_by='calls')
+
+        assert len(stats) == 1
+        assert stats[0]['query'] == "SELECT * FROM properties WHERE name = ?"
+        with pytest.raises(ValueError):
+            db.get_query_stats(order_by='query')
+
+    def test_snapshot_reads_profiled(self, db_path):
+        """Test that reads served from a snapshot are recorded too."""
+        db = WastewiseDB(db_path, snapshot=True, snapshot_interval=3600, profile=True)
+        db.list_properties()
+
+        assert _entry(db.get_query_stats(), "SELECT * FROM properties ORDER BY name")['calls'] == 1
+        db.close()
+
+    def test_off_by_default(self, db_path):
+        """Test that unprofiled databases report no statistics."""
+        with WastewiseDB(db_path) as db:
+            db.list_properties()
+            assert db.profiler is None
+            assert db.get_query_stats() == []
+            with pytest.raises(ValueError):
+                db.get_query_stats(order_by='query')
+
+
+class TestQueryProfiler:
+    """Tests for QueryProfiler limits and the MCP server hook."""
+
+    def test_query_limit(self, db_path):
+        """Test that queries beyond max_queries share one entry."""
+        profiler = QueryProfiler(max_queries=2)
+        conn = profiler.connect(db_path)
+        for table in ('a', 'b', 'c', 'd'):
+            conn.execute(f"CREATE TABLE {table} (x)")
+        conn.close()
+
+        stats = profiler.stats(order_by='calls')
+
+        assert len(stats) == 3
+        assert (stats[0]['query'], stats[0]['calls']) == (OTHER_QUERIES, 2)
+
+    def test_mcp_server_connections(self, db_path):
+        """Test that the MCP server's connections report to its profiler."""
+        WastewiseDB(db_path).close()
+        spec = importlib.util.spec_from_file_location("mcp_server_under_test", SERVER_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        server = module.WasteMasterBrainServer()
+        server.db_path = db_path
+        server.profiler = QueryProfiler()
+
+        server.query_rates(vendor='WM')
+
+        assert any('FROM rate_history' in entry['query'] for entry in server.profiler.stats())
@@ -0,0 +1,185 @@
+"""
+Unit tests for the rate benchmark percentile engine.
+
+Run with: pytest tests/test_rate_stats.py -v
+"""
+
+import random
+import statistics
+import pytest
+import sqlite3
+import tempfile
+from pathlib import Path
+import sys
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.database import WastewiseDB
+from lib.rate_rag import RateDatabaseRAG
+from lib.rate_stats import RatePercentiles, percentile, percentile_rank
+
+
+@pytest.fixture
+def db():
+    """Create a temporary database for testing."""
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+        db_path = f.name
+
+    db = WastewiseDB(db_path)
+    yield db
+
+    db.close()
+    for suffix in ('', '-wal', '-shm'):
+        Path(db_path + suffix).unlink(missing_ok=True)
+
+
+def _rate(vendor: str, value: float, rate_type: str = 'haul_fee', region: str = None) -> dict:
+    """A rate record for add_rates_bulk()."""
+    return {
+        'vendor': vendor, 'service_type': 'compactor', 'rate_type': rate_type,
+        'rate_value': value, 'effective_date': '2025-01-01', 'region': region,
+    }
+
+
+class TestPercentileFunctions:
+    """Tests for the pure percentile helpers."""
+
+    def test_matches_statistics_quantiles(self):
+        """Test that quartiles match statistics.quantiles(method='inclusive')."""
+        rng = random.Random(3)
+        for size in (2, 3, 10, 101):
+            values = sorted(rng.uniform(0, 500) for _ in range(size))
+            expected = statistics.quantiles(values, n=4, method='inclusive')
+            assert [percentile(values, q) for q in (25, 50, 75)] == pytest.approx(expected)
+
+    def test_edges(self):
+        """Test empty input, a single value and the extreme percentiles."""
+        assert percentile([], 50) is None
+        assert percentile([7.0], 25) == 7.0
+        assert percentile([1.0, 2.0, 3.0], 0) == 1.0
+        assert percentile([1.0, 2.0, 3.0], 100) == 3.0
+
+    def test_rank(self):
+        """Test that ranks count lower values fully and ties as half."""
+        values = [100.0, 110.0, 110.0, 120.0]
+        assert percentile_rank(values, 90.0) == 0
+        assert percentile_rank(values, 110.0) == 50.0
+        assert percentile_rank(values, 115.0) == 75.0
+        assert percentile_rank(values, 130.0) == 100.0
+        assert percentile_rank([], 1.0) is None
+
+
+class TestRatePercentiles:
+    """Tests for incrementally maintained segments."""
+
+    def test_segments_filter(self, db):
+        """Test that segment values respect the filters."""
+        db.add_rates_bulk([_rate('WM', 120), _rate('WM', 100), _rate('GFL', 90), _rate('WM', 15, 'rental')])
+
+        assert db._rate_stats.values(vendor='WM', rate_type='haul_fee') == [100, 120]
+        assert db._rate_stats.values(rate_type='haul_fee') == [90, 100, 120]
+        assert db._rate_stats.values() == [15, 90, 100, 120]
+
+    def test_new_rows_inserted_in_place(self, db):
+        """Test that rows added after loading are merged into loaded segments."""
+        db.add_rates_bulk([_rate('WM', 120), _rate('WM', 100)])
+        assert db._rate_stats.values(vendor='WM') == [100, 120]
+
+        db.add_rate_history('WM', 'compactor', 'haul_fee', 110, '2025-02-01')
+        db.add_rates_bulk([_rate('WM', v) for v in range(200, 240)] + [_rate('GFL', 1)])
+
+        assert db._rate_stats.values(vendor='WM') == [100, 110, 120] + list(range(200, 240))
+
+    def test_sees_writes_from_other_connections(self, db):
+        """Test that rows written by another process's connection are picked up."""
+        db.add_rates_bulk([_rate('WM', 120)])
+        assert db._rate_stats.values(vendor='WM') == [120]
+
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("""
+            INSERT INTO rate_history (vendor, service_type, rate_type, rate_value, effective_date)
+            VALUES ('WM', 'compactor', 'haul_fee', 80, '2025-03-01')
+        """)
+        conn.commit()
+        conn.close()
+
+        assert db._rate_stats.values(vendor='WM') == [80, 120]
+
+    def test_rollback_discards_rows(self, db):
+        """Test that rows read inside a rolled back transaction are forgotten."""
+        db.add_rates_bulk([_rate('WM', 120)])
+
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.add_rate_history('WM', 'compactor', 'haul_fee', 50, '2025-01-01')
+                assert db._rate_stats.values(vendor='WM') == [50, 120]
+                raise RuntimeError("abort")
+
+        db.add_rate_history('WM', 'compactor', 'haul_fee', 130, '2025-01-01')
+        assert db._rate_stats.values(vendor='WM') == [120, 130]
+
+    def test_matches_full_recompute(self, db):
+        """Test that incremental updates match reloading from scratch."""
+        rng = random.Random(11)
+        for _ in range(5):
+            db.add_rates_bulk([
+                _rate(rng.choice(['WM', 'GFL']), round(rng.uniform(50, 200), 2),
+                      rng.choice(['haul_fee', 'rental']), rng.choice(['Texas', None]))
+                for _ in range(rng.randint(1, 60))
+            ])
+            for filters in ({'vendor': 'WM'}, {'rate_type': 'rental', 'region': 'Texas'}, {}):
+                fresh = RatePercentiles(db._connect).values(**filters)
+                assert db._rate_stats.values(**filters) == fresh
+
+    def test_segment_limit(self, db):
+        """Test that the least recently used segment is dropped."""
+        db.add_rates_bulk([_rate('WM', 1), _rate('GFL', 2), _rate('Republic', 3)])
+        stats = RatePercentiles(db._connect, max_segments=2)
+
+        stats.values(vendor='WM')
+        stats.values(vendor='GFL')
+        stats.values(vendor='WM')
+        stats.values(vendor='Republic')
+
+        assert set(stats._segments) == {('WM', None, None, None), ('Republic', None, None, None)}
+
+
+class TestBenchmarkPercentiles:
+    """Tests for percentiles in benchmarks and rate comparisons."""
+
+    def test_benchmark_quartiles(self, db):
+        """Test that benchmarks report interpolated quartiles."""
+        db.add_rates_bulk([_rate('WM', v) for v in (100, 110, 120, 130, 140)])
+
+        benchmarks = db.get_rate_benchmarks(vendor='WM')
+
+        assert benchmarks['percentiles'] == {'p25': 110, 'p50': 120, 'p75': 130}
+        assert benchmarks['sample_count'] == 5
+
+    def test_benchmark_without_data(self, db):
+        """Test that an empty segment has no percentiles."""
+        assert db.get_rate_benchmarks(vendor='Nobody')['percentiles'] is None
+        assert db.get_rate_percentile_rank(100, vendor='Nobody') is None
+
+    def test_compare_rate_exact_rank(self, db):
+        """Test that compare_rate reports the exact percentile rank."""
+        db.add_rates_bulk([_rate('WM', v) for v in (100, 110, 120, 130)])
+        rag = RateDatabaseRAG(str(db.db_path))
+
+        comparison = rag.compare_rate(125, 'WM', 'compactor', 'haul_fee')
+
+        assert comparison['percentile'] == 75.0
+        assert comparison['position'] == 'average'  # Within 10% of the 115 average
+        rag.db.close()
+
+    def test_compare_rate_fallback_ranks_market(self, db):
+        """Test that without vendor data the rank is taken among all vendors."""
+        db.add_rates_bulk([_rate('GFL', v) for v in (100, 200)])
+        rag = RateDatabaseRAG(str(db.db_path))
+
+        comparison = rag.compare_rate(150, 'WM', 'compactor', 'haul_fee')
+
+        assert comparison['percentile'] == 50.0
+        assert comparison['benchmark']['filters']['vendor'] is None
+        rag.db.close()
@@ -0,0 +1,159 @@
+"""
+Unit tests for snapshot mode (reads from an in-memory copy).
+
+Run with: pytest tests/test_snapshot.py -v
+"""
+
+import threading
+import time
+import pytest
+import sqlite3
+import tempfile
+from pathlib import Path
+import sys
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.database import WastewiseDB
+from lib.snapshot import DatabaseSnapshot
+
+
+@pytest.fixture
+def db_path():
+    """Path of a temporary database with one property."""
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+        path = f.name
+
+    with WastewiseDB(path) as db:
+        db.add_property("Avana", unit_count=200)
+    yield path
+
+    for suffix in ('', '-wal', '-shm'):
+        Path(path + suffix).unlink(missing_ok=True)
+
+
+@pytest.fixture
+def db(db_path):
+    """Database in snapshot mode whose background refresh never fires on its own."""
+    db = WastewiseDB(db_path, snapshot=True, snapshot_interval=3600)
+    yield db
+    db.close()
+
+
+def _write_externally(db_path: str, name: str) -> None:
+    """Add a property through a separate connection, as another process would."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO properties (name) VALUES (?)", (name,))
+    conn.commit()
+    conn.close()
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    """Poll condition() until it is true or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestSnapshotReads:
+    """Tests for reads served from the in-memory copy."""
+
+    def test_reads_from_copy_until_refreshed(self, db, db_path):
+        """Test that external commits appear only once the copy is refreshed."""
+        assert db.get_property("Avana")['unit_count'] == 200
+
+        _write_externally(db_path, "Oaks")
+        assert db.get_property("Oaks") is None
+
+        assert db.refresh_snapshot() is True
+        assert db.get_property("Oaks") is not None
+        assert db.refresh_snapshot() is False  # Unchanged since
+
+    def test_background_refresh_on_data_version(self, db_path):
+        """Test that the timer picks up commits from other connections."""
+        db = WastewiseDB(db_path, snapshot=True, snapshot_interval=0.05)
+        db.list_properties()
+
+        _write_externally(db_path, "Oaks")
+
+        assert _wait_for(lambda: db.get_property("Oaks") is not None)
+        db.close()
+
+    def test_own_writes_refresh_promptly(self, db):
+        """Test that commits through the instance wake the refresher."""
+        db.list_properties()
+
+        db.add_property("Tower")
+
+        assert _wait_for(lambda: db.get_property("Tower") is not None)
+
+    def test_transaction_reads_own_writes(self, db):
+        """Test that reads inside transaction() see its uncommitted rows."""
+        with db.transaction():
+            db.add_property("Tower")
+            assert db.get_property("Tower") is not None
+
+    def test_copy_is_read_only(self, db):
+        """Test that the snapshot connection refuses writes."""
+        db.list_properties()
+
+        with pytest.raises(sqlite3.OperationalError):
+            with db._read() as conn:
+                conn.execute("DELETE FROM properties")
+
+        assert db.refresh_snapshot() is False
+        assert db.get_property("Avana") is not None
+
+    def test_snapshot_off_by_default(self, db_path):
+        """Test that without snapshot mode reads see commits immediately."""
+        with WastewiseDB(db_path) as db:
+            _write_externally(db_path, "Oaks")
+            assert db.get_property("Oaks") is not None
+            assert db.refresh_snapshot() is False
+
+
+class TestDatabaseSnapshot:
+    """Tests for DatabaseSnapshot itself."""
+
+    def test_readers_survive_swaps(self, db_path):
+        """Test that concurrent readers always see a complete copy during refreshes."""
+        snapshot = DatabaseSnapshot(db_path, interval=3600)
+        errors = []
+
+        def read():
+            try:
+                for _ in range(200):
+                    row = snapshot.connection().execute("SELECT COUNT(*) FROM properties").fetchone()
+                    assert row[0] >= 1
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        for i in range(20):
+            _write_externally(db_path, f"Property {i}")
+            snapshot.refresh()
+        for thread in readers:
+            thread.join()
+
+        assert errors == []
+        snapshot.close()
+
+    def test_close_and_reopen(self, db_path):
+        """Test that close() stops the refresher and a later read restarts it."""
+        before = set(threading.enumerate())
+        snapshot = DatabaseSnapshot(db_path, interval=3600)
+        snapshot.connection()
+        refresher, = [t for t in threading.enumerate() if t not in before and t.name == 'wastewise-snapshot']
+
+        snapshot.close()
+        refresher.join(timeout=5)
+
+        assert not refresher.is_alive()
+        assert snapshot.connection().execute("SELECT name FROM properties").fetchone()[0] == "Avana"
+        snapshot.close()
@@ -0,0 +1,103 @@
+"""
+Unit tests for subject normalization and participant/time thread linking.
+
+Run with: pytest tests/test_thread_linker.py -v
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from thread_linker import UnionFind, link_messages, normalize_subject
+
+
+def _message(date: str, *participants: str, sender: str = '', type: str = '') -> dict:
+    """Build a thread-state message."""
+    return {'date': f"{date}T10:00:00", 'participants': list(participants), 'from': sender, 'type': type}
+
+
+class TestNormalizeSubject:
+    """Tests for prefix stripping."""
+
+    @pytest.mark.parametrize("subject", [
+        "Pickup schedule",
+        "RE: Pickup schedule",
+        "RE: FW: Pickup schedule",
+        "Re: re: Fwd:  Pickup   schedule",
+        "[EXTERNAL] RE: Pickup schedule",
+        "AW: WG: Pickup schedule",
+        "RE[2]: Pickup schedule",
+    ])
+    def test_prefixes_stripped(self, subject):
+        """Test that stacked reply/forward prefixes and tags are removed."""
+        assert normalize_subject(subject) == "Pickup schedule"
+
+    def test_prefix_words_in_subject_kept(self):
+        """Test that words starting like prefixes are not stripped."""
+        assert normalize_subject("Review: Q3 rates") == "Review: Q3 rates"
+        assert normalize_subject("Fwding address") == "Fwding address"
+
+    def test_empty(self):
+        """Test empty subjects."""
+        assert normalize_subject("") == ""
+        assert normalize_subject("RE:") == ""
+
+
+class TestUnionFind:
+    """Tests for the disjoint-set structure."""
+
+    def test_union_and_find(self):
+        """Test that unions are transitive and other keys stay apart."""
+        sets = UnionFind()
+        sets.union('a', 'b')
+        sets.union('c', 'b')
+        sets.find('d')
+
+        assert sets.find('a') == sets.find('c')
+        assert sets.find('d') != sets.find('a')
+
+
+class TestLinkMessages:
+    """Tests for splitting one topic into threads."""
+
+    def test_shared_participant_within_window(self):
+        """Test that messages sharing a participant close in time are linked."""
+        messages = [
+            _message('2025-06-01', 'bob@wm.com', 'me@co.com', sender='bob@wm.com', type='received'),
+            _message('2025-06-05', 'me@co.com', 'bob@wm.com', sender='me@co.com', type='sent'),
+        ]
+        assert link_messages(messages, window_days=14) == [[0, 1]]
+
+    def test_gap_beyond_window_splits(self):
+        """Test that a long gap starts a new thread."""
+        messages = [
+            _message('2025-06-01', 'bob@wm.com'),
+            _message('2025-08-01', 'bob@wm.com'),
+        ]
+        assert link_messages(messages, window_days=14) == [[0], [1]]
+
+    def test_window_chains_through_messages(self):
+        """Test that the window applies between consecutive messages, not the whole thread."""
+        messages = [_message(f"2025-06-{day:02d}", 'bob@wm.com') for day in (1, 10, 19, 28)]
+        assert link_messages(messages, window_days=10) == [[0, 1, 2, 3]]
+
+    def test_mailbox_address_does_not_link(self):
+        """Test that the exported mailbox alone does not link different correspondents."""
+        messages = [
+            _message('2025-06-01', 'bob@wm.com', 'me@co.com', sender='bob@wm.com', type='received'),
+            _message('2025-06-02', 'me@co.com', 'amy@republic.com', sender='me@co.com', type='sent'),
+            _message('2025-06-03', 'me@co.com', 'bob@wm.com', sender='me@co.com', type='sent'),
+        ]
+        assert link_messages(messages) == [[0, 2], [1]]
+
+    def test_groups_ordered_by_date(self):
+        """Test that groups and their members are in date order regardless of input order."""
+        messages = [
+            _message('2025-06-03', 'amy@republic.com'),
+            _message('2025-06-02', 'bob@wm.com'),
+            _message('2025-06-01', 'amy@republic.com'),
+        ]
+        assert link_messages(messages) == [[2, 0], [1]]
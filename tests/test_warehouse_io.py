@@ -0,0 +1,165 @@
+"""
+Unit tests for the streaming daily export reader.
+
+Run with: pytest tests/test_warehouse_io.py -v
+"""
+
+import hashlib
+import json
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import warehouse_io
+from warehouse_io import file_digest, iter_daily_emails, load_daily_records, with_bodies
+
+BACKENDS = [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(not warehouse_io.IJSON_AVAILABLE, reason="ijson not installed")),
+]
+
+
+def _export(emails: list, **extra) -> dict:
+    """Build a daily export payload."""
+    return {'export_date': '2025-06-03', **extra, 'emails': emails, 'count': len(emails)}
+
+
+def _write(path: Path, payload, bom: bool = True, indent: int = 2) -> Path:
+    """Write a payload the way Export-DailyEmails.ps1 does."""
+    text = json.dumps(payload, indent=indent, ensure_ascii=False)
+    path.write_bytes((b'\xef\xbb\xbf' if bom else b'') + text.encode('utf-8'))
+    return path
+
+
+@pytest.mark.parametrize("use_ijson", BACKENDS)
+class TestIterDailyEmails:
+    """Tests for streaming the emails array."""
+
+    def test_matches_json_load(self, tmp_path, use_ijson):
+        """Test that streamed emails equal a full json.load."""
+        emails = [
+            {'id': f'ID{i}', 'subject': f'Café {i}', 'score': 1.5, 'cc': [], 'nested': {'a': [1, {'b': None}]}}
+            for i in range(50)
+        ]
+        path = _write(tmp_path / "2025-06-03.json", _export(emails))
+        assert list(iter_daily_emails(path, use_ijson=use_ijson)) == emails
+
+    def test_without_bom(self, tmp_path, use_ijson):
+        """Test files without a BOM."""
+        path = _write(tmp_path / "day.json", _export([{'id': 'A'}]), bom=False, indent=None)
+        assert list(iter_daily_emails(path, use_ijson=use_ijson)) == [{'id': 'A'}]
+
+    def test_empty_and_missing_array(self, tmp_path, use_ijson):
+        """Test exports with no emails."""
+        empty = _write(tmp_path / "empty.json", _export([]))
+        missing = _write(tmp_path / "missing.json", {'export_date': '2025-06-03'})
+        assert list(iter_daily_emails(empty, use_ijson=use_ijson)) == []
+        assert list(iter_daily_emails(missing, use_ijson=use_ijson)) == []
+
+    def test_truncated_file_raises(self, tmp_path, use_ijson):
+        """Test that a truncated export raises after the complete emails."""
+        path = _write(tmp_path / "day.json", _export([{'id': 'A'}, {'id': 'B'}]), indent=None)
+        raw = path.read_bytes()
+        path.write_bytes(raw[:raw.index(b'"B"')])
+
+        streamed = []
+        with pytest.raises(ValueError):
+            for email in iter_daily_emails(path, use_ijson=use_ijson):
+                streamed.append(email)
+        assert streamed == [{'id': 'A'}]
+
+
+class TestFallbackReader:
+    """Tests specific to the pure-Python reader."""
+
+    def test_values_split_across_reads(self, tmp_path, monkeypatch):
+        """Test that elements, numbers and multibyte characters spanning reads decode."""
+        monkeypatch.setattr(warehouse_io, 'READ_CHUNK_CHARS', 7)
+        emails = [{'id': i, 'count': 123456789, 'body': 'é€' * 20} for i in range(5)]
+        path = _write(tmp_path / "day.json", _export(emails, count=987654321), indent=None)
+        assert list(iter_daily_emails(path, use_ijson=False)) == emails
+
+    def test_large_element(self, tmp_path):
+        """Test an email body much larger than the read size."""
+        emails = [{'id': 'A', 'body_text': 'x' * (1024 * 1024)}, {'id': 'B'}]
+        path = _write(tmp_path / "day.json", _export(emails))
+        assert [e['id'] for e in iter_daily_emails(path, use_ijson=False)] == ['A', 'B']
+
+
+class TestFileDigest:
+    """Tests for block-wise file hashing."""
+
+    def test_matches_whole_file_hash(self, tmp_path, monkeypatch):
+        """Test that hashing in blocks gives the digest of the whole file."""
+        monkeypatch.setattr(warehouse_io, 'DIGEST_BLOCK_BYTES', 7)
+        path = tmp_path / "day.json"
+        path.write_bytes(b'{"emails": []}' * 10)
+        assert file_digest(path) == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@pytest.fixture
+def export(tmp_path):
+    """A daily export with full email bodies."""
+    emails = [
+        {
+            'id': f'ID{i}',
+            'date': f'2025-06-03T0{i}:00:00',
+            'type': 'received',
+            'from': {'name': 'Bob', 'email': 'bob@wm.com'},
+            'to': ['waste@example.com'],
+            'subject': f'Subject {i}',
+            'body_text': f'Body {i} ' * 100,
+            'attachments': [{'name': 'invoice.pdf'}],
+        }
+        for i in range(3)
+    ]
+    return _write(tmp_path / "2025-06-03.json", _export(emails)), emails
+
+
+class TestEmailRecord:
+    """Tests for projected email records."""
+
+    def test_dict_compatible_access(self, export):
+        """Test that get() and [] behave like the exported dict."""
+        path, emails = export
+        record = load_daily_records(path, fields=('id', 'subject', 'from', 'to'))[1]
+
+        assert record['subject'] == 'Subject 1'
+        assert record.get('from', {}).get('email', '') == 'bob@wm.com'
+        assert list(record.get('to', [])) == ['waste@example.com']
+        assert record.get('attachments', 'n/a') == 'n/a'
+        assert record.to_dict() == {
+            'id': 'ID1', 'subject': 'Subject 1', 'to': ['waste@example.com'],
+            'from': {'name': 'Bob', 'email': 'bob@wm.com'},
+        }
+
+    def test_lazy_body(self, export):
+        """Test that unprojected fields are read back from the export."""
+        path, emails = export
+        record = load_daily_records(path, fields=('id', 'subject'))[2]
+
+        assert record.body_text is warehouse_io._MISSING
+        assert record.get('body_text') == emails[2]['body_text']
+        assert record.get('date') == emails[2]['date']
+
+    def test_lazy_body_after_rewrite(self, export):
+        """Test that a rewritten export does not return another email's body."""
+        path, emails = export
+        record = load_daily_records(path, fields=('id',))[0]
+        _write(path, _export(emails[1:]))
+
+        assert record.get('body_text', '') == ''
+
+    def test_with_bodies(self, export):
+        """Test attaching bodies in one pass over the export."""
+        path, emails = export
+        records = load_daily_records(path, fields=('id', 'subject'))
+
+        views = [(view.record, view.get('body_text')) for view in with_bodies(records)]
+
+        assert [r for r, _ in views] == records
+        assert [body for _, body in views] == [e['body_text'] for e in emails]
+        assert all(r.body_text is warehouse_io._MISSING for r in records)